@@ -1,3 +1,4 @@
 from .hitl import run_hitl_session
 from .autonomous import run_autonomous_session
-__all__ = ["run_hitl_session", "run_autonomous_session"]
+from .history import ConversationHistory
+__all__ = ["run_hitl_session", "run_autonomous_session", "ConversationHistory"]
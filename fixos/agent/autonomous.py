@@ -6,6 +6,7 @@ Posiada mechanizmy bezpieczeństwa i limity.
 
 from __future__ import annotations
 
+import json
 import re
 import signal
 import subprocess
@@ -14,9 +15,11 @@ from dataclasses import dataclass, field
 from typing import Optional
 
 from ..providers.llm import LLMClient, LLMError
-from ..utils.anonymizer import anonymize, display_anonymized_preview
+from ..providers.prompt import PromptPacker, condense, context_budget, excerpt
+from ..utils.anonymizer import anonymize, anonymize_tree, display_anonymized_preview
 from ..utils.web_search import search_all, format_results_for_llm
 from ..config import FixOsConfig
+from .history import ConversationHistory, llm_summarizer
 
 
 # Komendy NIGDY nie wykonywane automatycznie (bez względu na wszystko)
@@ -130,7 +133,7 @@ def _execute(cmd: str) -> tuple[bool, str]:
             cmd, shell=True, capture_output=True, text=True, timeout=90
         )
         out = proc.stdout.strip() or proc.stderr.strip() or "(brak outputu)"
-        return proc.returncode == 0, out[:1000]
+        return proc.returncode == 0, condense(out, 1000)
     except subprocess.TimeoutExpired:
         return False, "[TIMEOUT 90s]"
     except Exception as e:
@@ -162,8 +165,12 @@ def run_autonomous_session(
     llm = LLMClient(config)
     report = AgentReport()
 
-    # Anonimizacja
-    anon_str, anon_report = anonymize(str(diagnostics))
+    # Anonimizacja całości, potem najcenniejsze pola w budżecie modelu
+    # (skracanie przed anonimizacją mogłoby przeciąć sekret lub adres)
+    budget = context_budget(config)
+    tree, anon_report = anonymize_tree(diagnostics)
+    tree = PromptPacker(budget).pack(tree)
+    anon_str = json.dumps(tree, ensure_ascii=False)
     if show_data:
         display_anonymized_preview(anon_str, anon_report)
 
@@ -172,16 +179,22 @@ def run_autonomous_session(
     signal.alarm(config.session_timeout)
     start_ts = time.time()
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT_AUTONOMOUS},
-        {
-            "role": "user",
-            "content": (
-                f"Dane diagnostyczne system:\n```\n{anon_str}\n```\n\n"
-                f"Rozpocznij analizę i naprawę. Odpowiadaj TYLKO w formacie JSON."
-            ),
-        },
-    ]
+    # Diagnostyka (w budżecie) tylko w pierwszej turze, potem skrót + podsumowanie
+    digest = PromptPacker(budget // 2).pack_json(tree)
+    history = ConversationHistory(
+        SYSTEM_PROMPT_AUTONOMOUS,
+        context=(
+            f"Dane diagnostyczne system:\n```\n{anon_str}\n```\n\n"
+            f"Rozpocznij analizę i naprawę. Odpowiadaj TYLKO w formacie JSON."
+        ),
+        digest=(
+            f"Skrót danych diagnostycznych (pełne dane były w pierwszej turze):\n"
+            f"```\n{digest}\n```\n\n"
+            f"Odpowiadaj TYLKO w formacie JSON."
+        ),
+        keep_turns=config.history_turns,
+        summarizer=llm_summarizer(llm) if config.history_summary == "llm" else None,
+    )
 
     fix_count = 0
     search_count = 0
@@ -199,17 +212,14 @@ def run_autonomous_session(
 
             # Zapytaj LLM
             try:
-                reply = llm.chat(messages, max_tokens=1000, temperature=0.1)
-                messages.append({"role": "assistant", "content": reply})
+                reply = llm.chat(history.messages, max_tokens=1000, temperature=0.1)
+                history.add_assistant(reply)
             except LLMError as e:
                 print(f"  ❌ LLM błąd: {e}")
                 if config.enable_web_search and search_count < MAX_SEARCHES:
                     results = search_all("fedora repair diagnostics", config.serpapi_key)
                     if results:
-                        messages.append({
-                            "role": "user",
-                            "content": format_results_for_llm(results)
-                        })
+                        history.add_user(format_results_for_llm(results))
                         search_count += 1
                         continue
                 break
@@ -218,10 +228,7 @@ def run_autonomous_session(
             action_data = _parse_agent_json(reply)
             if not action_data:
                 print(f"  ⚠️  Nieprawidłowy format JSON, kontynuuję...")
-                messages.append({
-                    "role": "user",
-                    "content": "Odpowiedz TYLKO w formacie JSON jak w instrukcji."
-                })
+                history.add_user("Odpowiedz TYLKO w formacie JSON jak w instrukcji.")
                 continue
 
             action = action_data.get("action", "SKIP")
@@ -239,10 +246,7 @@ def run_autonomous_session(
             # SKIP
             if action == "SKIP":
                 print(f"  ⏭️  Pomijam: {reason}")
-                messages.append({
-                    "role": "user",
-                    "content": f"Pominięto: {reason}. Co dalej?"
-                })
+                history.add_user(f"Pominięto: {reason}. Co dalej?")
                 fix_count += 1
                 continue
 
@@ -255,35 +259,26 @@ def run_autonomous_session(
                     report.searches_done.append(query)
                     if results:
                         web_ctx = format_results_for_llm(results)
-                        messages.append({
-                            "role": "user",
-                            "content": f"Wyniki dla '{query}':\n{web_ctx}\nKontynuuj naprawę."
-                        })
+                        history.add_user(f"Wyniki dla '{query}':\n{web_ctx}\nKontynuuj naprawę.")
                     else:
-                        messages.append({
-                            "role": "user",
-                            "content": f"Brak wyników dla '{query}'. Co innego możemy zrobić?"
-                        })
+                        history.add_user(f"Brak wyników dla '{query}'. Co innego możemy zrobić?")
                 else:
                     print("  ⚠️  Limit wyszukiwań osiągnięty.")
-                    messages.append({"role": "user", "content": "Brak więcej wyszukiwań. Co możemy zrobić bez zewnętrznych źródeł?"})
+                    history.add_user("Brak więcej wyszukiwań. Co możemy zrobić bez zewnętrznych źródeł?")
                 continue
 
             # EXEC
             if action == "EXEC":
                 cmd_raw = action_data.get("command", "").strip()
                 if not cmd_raw:
-                    messages.append({"role": "user", "content": "Brak komendy. Podaj konkretną komendę."})
+                    history.add_user("Brak komendy. Podaj konkretną komendę.")
                     continue
 
                 # Sprawdzenie bezpieczeństwa
                 danger = _is_forbidden(cmd_raw)
                 if danger:
                     print(f"  🚫 ZABLOKOWANO: {danger}")
-                    messages.append({
-                        "role": "user",
-                        "content": f"Komenda `{cmd_raw}` jest zabroniona: {danger}. Zaproponuj bezpieczniejszą alternatywę."
-                    })
+                    history.add_user(f"Komenda `{cmd_raw}` jest zabroniona: {danger}. Zaproponuj bezpieczniejszą alternatywę.")
                     continue
 
                 cmd = _add_sudo(cmd_raw)
@@ -298,18 +293,15 @@ def run_autonomous_session(
                 print(f"  {icon} Wynik: {out[:200]}")
 
                 # Anonimizuj komendę i output przed wysłaniem do LLM
-                anon_out, _ = anonymize(out)
+                anon_out = excerpt(out, 125)
                 anon_cmd, _ = anonymize(cmd)
 
-                messages.append({
-                    "role": "user",
-                    "content": (
-                        f"Wykonano: `{anon_cmd}`\n"
-                        f"Sukces: {ok}\n"
-                        f"Output: {anon_out[:500]}\n"
-                        f"Zweryfikuj wynik i zaproponuj następną akcję."
-                    ),
-                })
+                history.add_user(
+                    f"Wykonano: `{anon_cmd}`\n"
+                    f"Sukces: {ok}\n"
+                    f"Output: {anon_out}\n"
+                    f"Zweryfikuj wynik i zaproponuj następną akcję."
+                )
 
             time.sleep(1)  # Krótka pauza między akcjami
 
@@ -324,6 +316,7 @@ def run_autonomous_session(
     print("  📊 RAPORT SESJI AUTONOMICZNEJ")
     print("═" * 65)
     print(report.summary())
+    print(f"  LLM: {llm.usage_summary()}")
     print("═" * 65 + "\n")
     return report
 
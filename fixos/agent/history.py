@@ -0,0 +1,204 @@
+"""
+Historia rozmowy sesji HITL/autonomicznej z kompakcją.
+
+Bez kompakcji każda tura wysyła ponownie cały zrzut diagnostyki i wszystkie
+wcześniejsze odpowiedzi oraz wyniki komend – koszt zapytania rośnie liniowo
+z długością sesji. ConversationHistory trzyma dosłownie prompt systemowy
+i ostatnie `keep_turns` tur, starsze zastępuje zwięzłym podsumowaniem
+(lokalnym albo z jednego taniego wywołania LLM), a pełną diagnostykę –
+po pierwszej odpowiedzi modelu – jej skrótem. Rozmiar promptu w turze
+pozostaje dzięki temu w przybliżeniu stały.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Callable, Optional
+
+from ..providers.llm import LLMClient, LLMError
+from ..providers.prompt import CHARS_PER_TOKEN, count_tokens
+
+# (dotychczasowe podsumowanie, usuwane wiadomości) -> nowe podsumowanie
+Summarizer = Callable[[str, list[dict]], str]
+
+SUMMARY_HEADER = "Podsumowanie wcześniejszej części sesji:"
+_LINE_CHARS = 200
+
+SUMMARY_PROMPT = """Streść przebieg sesji naprawczej w maksymalnie {max_lines} punktach.
+Zachowaj: wykonane komendy i ich wynik (sukces/błąd), zdiagnozowane problemy,
+decyzje użytkownika, otwarte kwestie. Pomiń powtórzenia i uprzejmości.
+Odpowiedz samą listą punktów zaczynających się od "- ".
+
+Dotychczasowe podsumowanie:
+{summary}
+
+Nowe wiadomości:
+{messages}
+"""
+
+
+def _line(message: dict) -> str:
+    """Jedna linia podsumowania wiadomości (bez LLM)."""
+    content = str(message.get("content", ""))
+    role = message.get("role")
+    if role == "assistant":
+        data = _agent_json(content)
+        if data:
+            parts = [data.get("action", ""), data.get("command") or data.get("search_query") or "",
+                     data.get("analysis", "")]
+            text = " | ".join(p for p in parts if p)
+        else:
+            # Pierwsze treściwe linie (bez nagłówków ━━━ i pustych)
+            lines = [ln.strip(" *#") for ln in content.splitlines()
+                     if ln.strip() and not ln.lstrip().startswith("━")]
+            text = " / ".join(lines[:3])
+        prefix = "asystent"
+    else:
+        text = content
+        prefix = "użytkownik"
+    text = re.sub(r"`{3}\w*", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) > _LINE_CHARS:
+        text = text[: _LINE_CHARS - 1] + "…"
+    return f"- {prefix}: {text}"
+
+
+def _agent_json(text: str) -> Optional[dict]:
+    m = re.search(r"\{.*\}", text, re.DOTALL)
+    if not m:
+        return None
+    try:
+        data = json.loads(m.group(0))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def local_summary(summary: str, dropped: list[dict], max_tokens: int = 400) -> str:
+    """
+    Podsumowanie bez LLM: po jednej linii na wiadomość. Przy przekroczeniu
+    `max_tokens` odpadają najstarsze linie.
+    """
+    lines = [ln for ln in summary.splitlines() if ln.startswith("- ")]
+    lines += [_line(m) for m in dropped if m.get("content")]
+    budget = max_tokens * CHARS_PER_TOKEN
+    kept: list[str] = []
+    for line in reversed(lines):
+        budget -= len(line) + 1
+        if budget < 0:
+            break
+        kept.append(line)
+    kept.reverse()
+    if len(kept) < len(lines):
+        kept.insert(0, f"- … ({len(lines) - len(kept)} starszych wpisów pominięto)")
+    return "\n".join(kept)
+
+
+def llm_summarizer(llm: LLMClient, max_tokens: int = 400) -> Summarizer:
+    """
+    Podsumowanie jednym wywołaniem LLM (niska temperatura, mały limit
+    odpowiedzi). Przy błędzie LLM – podsumowanie lokalne.
+    """
+    def summarize(summary: str, dropped: list[dict]) -> str:
+        transcript = "\n".join(_line(m) for m in dropped if m.get("content"))
+        prompt = SUMMARY_PROMPT.format(
+            max_lines=max(5, max_tokens // 40),
+            summary=summary or "(brak)",
+            messages=transcript,
+        )
+        try:
+            reply = llm.chat([{"role": "user", "content": prompt}],
+                             max_tokens=max_tokens, temperature=0.1)
+        except LLMError:
+            return local_summary(summary, dropped, max_tokens)
+        return reply.strip() or local_summary(summary, dropped, max_tokens)
+    return summarize
+
+
+class ConversationHistory:
+    """
+    Wiadomości sesji agenta w budżecie: system + kontekst + ostatnie tury.
+
+    Tura zaczyna się od odpowiedzi asystenta i obejmuje następujące po niej
+    wiadomości użytkownika (wyniki komend, polecenia). Gdy tur jest więcej
+    niż `keep_turns + compact_every`, najstarsze ponad `keep_turns` trafiają
+    do podsumowania – kompakcja odbywa się partiami, więc podsumowanie LLM
+    nie kosztuje wywołania w każdej turze.
+
+    Args:
+        system_prompt: prompt systemowy (zawsze dosłownie)
+        context: pierwsza wiadomość użytkownika z pełną diagnostyką
+        digest: skrót kontekstu wysyłany po pierwszej odpowiedzi (None = pełny)
+        keep_turns: liczba ostatnich tur przechowywanych dosłownie
+        summarizer: funkcja podsumowania (domyślnie local_summary)
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        context: str,
+        digest: Optional[str] = None,
+        keep_turns: int = 6,
+        compact_every: int = 2,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        self.system_prompt = system_prompt
+        self.context = context
+        self.digest = digest
+        self.keep_turns = max(1, keep_turns)
+        self.compact_every = max(1, compact_every)
+        self.summarizer = summarizer or local_summary
+        self.summary = ""
+        self.turns = 0           # odpowiedzi asystenta w całej sesji
+        self.compacted = 0       # wiadomości zastąpione podsumowaniem
+        self._recent: list[dict] = []
+
+    def add(self, role: str, content: str) -> None:
+        self._recent.append({"role": role, "content": content})
+        if role == "assistant":
+            self.turns += 1
+            self._compact()
+
+    def add_user(self, content: str) -> None:
+        self.add("user", content)
+
+    def add_assistant(self, content: str) -> None:
+        self.add("assistant", content)
+
+    @property
+    def messages(self) -> list[dict]:
+        """Wiadomości do wysłania w kolejnym zapytaniu."""
+        context = self.digest if self.turns and self.digest is not None else self.context
+        if self.summary:
+            context = f"{context}\n\n{SUMMARY_HEADER}\n{self.summary}"
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": context},
+            *self._recent,
+        ]
+
+    def tokens(self) -> int:
+        """Szacunkowy rozmiar `messages` w tokenach."""
+        return sum(count_tokens(m["content"]) for m in self.messages)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def _groups(self) -> list[list[dict]]:
+        groups: list[list[dict]] = []
+        for message in self._recent:
+            if message["role"] == "assistant" or not groups:
+                groups.append([])
+            groups[-1].append(message)
+        return groups
+
+    def _compact(self) -> None:
+        groups = self._groups()
+        if len(groups) <= self.keep_turns + self.compact_every:
+            return
+        cut = len(groups) - self.keep_turns
+        dropped = [m for group in groups[:cut] for m in group]
+        self.summary = self.summarizer(self.summary, dropped)
+        self.compacted += len(dropped)
+        self._recent = [m for group in groups[cut:] for m in group]
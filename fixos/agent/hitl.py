@@ -12,6 +12,7 @@ UX:
 
 from __future__ import annotations
 
+import json
 import re
 import sys
 import time
@@ -19,7 +20,8 @@ from dataclasses import dataclass, field
 from typing import Optional
 
 from ..providers.llm import LLMClient, LLMError
-from ..utils.anonymizer import anonymize, display_anonymized_preview
+from ..providers.prompt import PromptPacker, context_budget, excerpt
+from ..utils.anonymizer import anonymize, anonymize_tree, display_anonymized_preview
 from ..utils.web_search import search_all, format_results_for_llm
 from ..utils.terminal import (
     _C, render_md as _render_md, colorize as _colorize_inline,
@@ -27,6 +29,7 @@ from ..utils.terminal import (
     print_stdout_box, print_stderr_box,
 )
 from ..config import FixOsConfig
+from .history import ConversationHistory, llm_summarizer
 from ..platform_utils import (
     is_dangerous, elevate_cmd, run_command,
     setup_signal_timeout, cancel_signal_timeout,
@@ -164,7 +167,7 @@ def _extract_fixes(reply: str) -> list[tuple[str, str]]:
 def _print_action_menu(
     fixes: list[tuple[str, str]],
     rem_time: str,
-    tokens: int,
+    usage: str,
 ):
     """Prints the interactive numbered action menu."""
     from rich.rule import Rule
@@ -172,7 +175,7 @@ def _print_action_menu(
     from rich.panel import Panel
     console.print()
     console.print(Rule(
-        f"[bold cyan]📋 DOSTĘPNE AKCJE[/bold cyan]  [dim]⏰ {rem_time}  ~{tokens} tokenów[/dim]",
+        f"[bold cyan]📋 DOSTĘPNE AKCJE[/bold cyan]  [dim]⏰ {rem_time}  {usage}[/dim]",
         style="cyan",
     ))
     if fixes:
@@ -233,7 +236,13 @@ def run_hitl_session(
     os_info = get_os_info()
     pkg_manager = get_package_manager() or "unknown"
 
-    anon_str, report = anonymize(str(diagnostics))
+    # Anonimizacja całości, potem najcenniejsze pola w budżecie modelu
+    # (skracanie przed anonimizacją mogłoby przeciąć sekret lub adres);
+    # podgląd pokazuje dokładnie to, co zostanie wysłane
+    budget = context_budget(config)
+    tree, report = anonymize_tree(diagnostics)
+    tree = PromptPacker(budget).pack(tree)
+    anon_str = json.dumps(tree, ensure_ascii=False)
     if show_data:
         display_anonymized_preview(anon_str, report)
         ans = console.input("\n  Czy wysłać te dane do LLM? \\[Y/n]: ").strip().lower()
@@ -244,18 +253,24 @@ def run_hitl_session(
     setup_signal_timeout(config.session_timeout, _timeout)
     start_ts = time.time()
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {
-            "role": "user",
-            "content": (
-                f"OS: {os_info['system']} {os_info['release']} | "
-                f"Package manager: {pkg_manager}\n\n"
-                f"Anonymized diagnostic data:\n```\n{anon_str}\n```\n\n"
-                f"Perform full analysis and list all detected problems."
-            ),
-        },
-    ]
+    # Diagnostyka (w budżecie) tylko w pierwszej turze, potem skrót + podsumowanie
+    system_line = f"OS: {os_info['system']} {os_info['release']} | Package manager: {pkg_manager}"
+    digest = PromptPacker(budget // 2).pack_json(tree)
+    history = ConversationHistory(
+        SYSTEM_PROMPT,
+        context=(
+            f"{system_line}\n\n"
+            f"Anonymized diagnostic data:\n```\n{anon_str}\n```\n\n"
+            f"Perform full analysis and list all detected problems."
+        ),
+        digest=(
+            f"{system_line}\n\n"
+            f"Digest of the diagnostic data (full data was sent in the first turn):\n"
+            f"```\n{digest}\n```"
+        ),
+        keep_turns=config.history_turns,
+        summarizer=llm_summarizer(llm) if config.history_summary == "llm" else None,
+    )
 
     executed: list[CmdResult] = []
     web_search_count = 0
@@ -285,8 +300,8 @@ def run_hitl_session(
 
             console.print(f"\n  [dim]🧠 Analizuję...[/dim]", end="")
             try:
-                reply = llm.chat(messages, max_tokens=2500, temperature=0.2)
-                messages.append({"role": "assistant", "content": reply})
+                reply = llm.chat(history.messages, max_tokens=2500, temperature=0.2)
+                history.add_assistant(reply)
             except LLMError as e:
                 console.print(f"\n  [bold red]❌ Błąd LLM:[/bold red] {e}")
                 if config.enable_web_search and web_search_count < MAX_WEB_SEARCHES:
@@ -317,11 +332,10 @@ def run_hitl_session(
                     if results:
                         web_ctx = format_results_for_llm(results)
                         console.print(web_ctx)
-                        messages.append({"role": "user",
-                                         "content": f"External sources:\n{web_ctx}\nUpdate analysis."})
+                        history.add_user(f"External sources:\n{web_ctx}\nUpdate analysis.")
                         continue
 
-            _print_action_menu(last_fixes, fmt_time(rem), llm.total_tokens)
+            _print_action_menu(last_fixes, fmt_time(rem), llm.usage_summary())
 
             try:
                 user_in = console.input(f"\n  [bold cyan]fixos [{fmt_time(rem)}] ❯[/bold cyan] ").strip()
@@ -343,20 +357,16 @@ def run_hitl_session(
             if lo == "d":
                 problem = _ask_user_problem()
                 if problem:
-                    messages.append({
-                        "role": "user",
-                        "content": (
-                            f"User describes a new problem:\n"
-                            f"{problem}\n\n"
-                            f"Analyze this problem and provide numbered list of commands to fix it."
-                        ),
-                    })
+                    history.add_user(
+                        f"User describes a new problem:\n"
+                        f"{problem}\n\n"
+                        f"Analyze this problem and provide numbered list of commands to fix it."
+                    )
                 continue
 
             # [S] Skip all
             if lo in ("s", "skip", "pomiń", "pomin"):
-                messages.append({"role": "user",
-                                  "content": "Skip these fixes. What else can we check?"})
+                history.add_user("Skip these fixes. What else can we check?")
                 continue
 
             # [A] Execute all
@@ -372,14 +382,11 @@ def run_hitl_session(
                     anon_out, _ = anonymize(result.stdout + result.stderr)
                     status = "✅ sukces" if result.ok else f"❌ błąd (kod {result.returncode})"
                     summary_lines.append(f"- `{cmd}`: {status}")
-                messages.append({
-                    "role": "user",
-                    "content": (
-                        f"Executed all commands:\n" +
-                        "\n".join(summary_lines) +
-                        "\n\nEvaluate results and suggest next steps."
-                    ),
-                })
+                history.add_user(
+                    f"Executed all commands:\n" +
+                    "\n".join(summary_lines) +
+                    "\n\nEvaluate results and suggest next steps."
+                )
                 continue
 
             # [N] Execute specific fix by number
@@ -389,18 +396,15 @@ def run_hitl_session(
                     cmd, comment = last_fixes[idx]
                     result = _run_cmd(cmd, comment)
                     executed.append(result)
-                    anon_out, _ = anonymize(result.stdout)
-                    anon_err, _ = anonymize(result.stderr)
-                    messages.append({
-                        "role": "user",
-                        "content": (
-                            f"Executed: `{cmd}`\n"
-                            f"Success: {result.ok}\n"
-                            f"Stdout:\n```\n{anon_out[:800]}\n```\n"
-                            f"Stderr:\n```\n{anon_err[:300]}\n```\n"
-                            f"What next?"
-                        ),
-                    })
+                    anon_out = excerpt(result.stdout, 200)
+                    anon_err = excerpt(result.stderr, 75)
+                    history.add_user(
+                        f"Executed: `{cmd}`\n"
+                        f"Success: {result.ok}\n"
+                        f"Stdout:\n```\n{anon_out}\n```\n"
+                        f"Stderr:\n```\n{anon_err}\n```\n"
+                        f"What next?"
+                    )
                 else:
                     console.print(f"  [yellow]Brak opcji [{user_in}]. Dostępne: 1–{len(last_fixes)}[/yellow]")
                 continue
@@ -410,11 +414,8 @@ def run_hitl_session(
                 cmd = user_in[1:].strip()
                 result = _run_cmd(cmd, "Komenda użytkownika")
                 executed.append(result)
-                anon_out, _ = anonymize(result.stdout + "\n" + result.stderr)
-                messages.append({
-                    "role": "user",
-                    "content": f"User ran: `{cmd}`\nResult: {anon_out[:600]}\nWhat next?"
-                })
+                anon_out = excerpt(result.stdout + "\n" + result.stderr, 150)
+                history.add_user(f"User ran: `{cmd}`\nResult: {anon_out}\nWhat next?")
                 continue
 
             # [search <q>] Web search
@@ -424,16 +425,13 @@ def run_hitl_session(
                 if results:
                     web_ctx = format_results_for_llm(results)
                     console.print(web_ctx)
-                    messages.append({
-                        "role": "user",
-                        "content": f"Search results for '{query}':\n{web_ctx}\nWhat do you think?"
-                    })
+                    history.add_user(f"Search results for '{query}':\n{web_ctx}\nWhat do you think?")
                 else:
                     console.print("  [dim]Brak wyników.[/dim]")
                 continue
 
             # Free text → send to LLM
-            messages.append({"role": "user", "content": user_in})
+            history.add_user(user_in)
 
     except SessionTimeout:
         console.print(f"\n\n  [bold yellow]⏰ Sesja wygasła (limit: {fmt_time(config.session_timeout)}).[/bold yellow]")
@@ -443,8 +441,8 @@ def run_hitl_session(
     elapsed = int(time.time() - start_ts)
     ok_count = sum(1 for r in executed if r.ok)
     console.print(
-        f"\n  [bold cyan]📊 Sesja:[/bold cyan] {len(messages)-2} tur | {fmt_time(elapsed)} | "
-        f"~{llm.total_tokens} tokenów | [green]{ok_count}[/green]/[red]{len(executed)}[/red] komend OK"
+        f"\n  [bold cyan]📊 Sesja:[/bold cyan] {history.turns} tur | {fmt_time(elapsed)} | "
+        f"{llm.usage_summary()} | [green]{ok_count}[/green]/[red]{len(executed)}[/red] komend OK"
     )
 
 
@@ -23,7 +23,7 @@ from .config import (
     detect_provider_from_key, interactive_provider_setup,
 )
 from .diagnostics import get_full_diagnostics, DIAGNOSTIC_MODULES
-from .utils.anonymizer import anonymize, display_anonymized_preview
+from .utils.anonymizer import anonymize_tree, display_anonymized_preview
 from .agent.hitl import run_hitl_session
 from .agent.autonomous import run_autonomous_session
 
@@ -58,6 +58,8 @@ def add_shared_options(func):
                        help="Analiza zajętości dysku + grupowanie przyczyn")(func)
     func = click.option("--disk", "disc", is_flag=True, default=False,
                        help="Analiza zajętości dysku (alias do --disc)")(func)
+    func = click.option("--full-rescan", is_flag=True, default=False,
+                       help="Analiza dysku bez indeksu z poprzedniego skanu (pełne przeliczenie)")(func)
     func = click.option("--dry-run", is_flag=True, default=False,
                        help="Symuluj wykonanie komend bez faktycznego uruchamiania")(func)
     func = click.option("--interactive/--no-interactive", default=True,
@@ -486,13 +488,15 @@ def _print_welcome():
 @click.option("--all", "modules", flag_value="all", default=True, help="Wszystkie moduły (domyślnie)")
 @add_shared_options
 @click.option("--output", "-o", default=None, help="Zapisz wyniki do pliku")
-def scan(modules, output, show_raw, no_banner, disc, dry_run, interactive, json_output, llm_fallback):
+def scan(modules, output, show_raw, no_banner, disc, full_rescan, dry_run, interactive, json_output,
+         llm_fallback):
     """
     Przeprowadza diagnostykę systemu.
 
     \b
     Nowe opcje:
       --disc          – Analiza zajętości dysku
+      --full-rescan   – Pełny skan dysku, bez indeksu z poprzedniego uruchomienia
       --dry-run       – Symulacja (dla kompatybilności)
       --interactive   – Tryb interaktywny (dla kompatybilności)
       --json          – Wyjście w formacie JSON
@@ -520,7 +524,7 @@ def scan(modules, output, show_raw, no_banner, disc, dry_run, interactive, json_
         data = get_full_diagnostics(selected_modules, progress_callback=progress)
     
     if disc:
-        _run_disk_analysis(data, json_output=json_output, is_fix_mode=False)
+        _run_disk_analysis(data, json_output=json_output, is_fix_mode=False, full_rescan=full_rescan)
 
     if show_raw:
         import json
@@ -540,13 +544,25 @@ def scan(modules, output, show_raw, no_banner, disc, dry_run, interactive, json_
         except Exception as e:
             click.echo(f"Błąd zapisu: {e}")
 
-def _run_disk_analysis(data: dict, json_output: bool, is_fix_mode: bool = False):
+def _run_disk_analysis(data: dict, json_output: bool, is_fix_mode: bool = False,
+                       full_rescan: bool = False):
     """Helper for disk analysis logic to avoid duplication between scan and fix"""
     click.echo(click.style("Analizowanie zajętości dysku...", fg="blue"))
     try:
         from .diagnostics.disk_analyzer import DiskAnalyzer
-        analyzer = DiskAnalyzer()
+
+        def _show_largest(snapshot):
+            if snapshot:
+                top = snapshot[0]
+                click.echo(f"\r  → Największy plik: {top['path'][-60:]} ({top['size_gb']:.1f}GB)   ", nl=False)
+
+        analyzer = DiskAnalyzer(
+            incremental=not full_rescan,
+            progress_callback=None if json_output else _show_largest,
+        )
         disk_analysis = analyzer.analyze_disk_usage()
+        if not json_output:
+            click.echo("\r" + " " * 90 + "\r", nl=False)
         
         if "error" not in disk_analysis:
             data["disk_analysis"] = disk_analysis
@@ -658,7 +674,7 @@ def _print_quick_issues(data: dict):
               help="Maksymalna liczba napraw w sesji")
 @add_shared_options
 def fix(provider, token, model, no_banner, mode, timeout, modules, no_show_data, output, max_fixes,
-        disc, dry_run, interactive, json_output, llm_fallback):
+        disc, full_rescan, dry_run, interactive, json_output, llm_fallback):
     """
     Przeprowadza pełną diagnostykę i uruchamia sesję naprawczą z LLM.
 
@@ -670,6 +686,7 @@ def fix(provider, token, model, no_banner, mode, timeout, modules, no_show_data,
     \b
     Opcje dyskowe:
       --disc      – Analiza zajętości dysku + grupowanie przyczyn
+      --full-rescan – Pełny skan dysku, bez indeksu z poprzedniego uruchomienia
       --dry-run   – Symulacja bez wykonywania akcji
       --interactive – Tryb interaktywny (domyślnie włączony)
       --json      – Wyjście w formacie JSON
@@ -738,13 +755,13 @@ def fix(provider, token, model, no_banner, mode, timeout, modules, no_show_data,
     
     # Add disk analysis if --disc flag is used
     if disc:
-        _run_disk_analysis(data, json_output=json_output, is_fix_mode=True)
+        _run_disk_analysis(data, json_output=json_output, is_fix_mode=True, full_rescan=full_rescan)
 
     if output:
-        anon_str, _ = anonymize(str(data))
+        anon_tree, _ = anonymize_tree(data)
         try:
             Path(output).write_text(
-                json.dumps({"anonymized": anon_str, "raw": data}, ensure_ascii=False, indent=2, default=str),
+                json.dumps({"anonymized": anon_tree, "raw": data}, ensure_ascii=False, indent=2, default=str),
                 encoding="utf-8"
             )
             click.echo(click.style(f"Raport: {output}", fg="green"))
@@ -932,12 +949,14 @@ def execute_cleanup_actions(actions: List[Dict], cfg, llm_fallback: bool):
 def try_llm_fallback_for_failures(failed_actions: List[Dict], cfg):
     """Use LLM to analyze and suggest fixes for failed cleanup actions"""
     try:
-        from .providers.llm import LLMClient
-        
-        llm = LLMClient(cfg)
-        
-        for action in failed_actions[:3]:  # Limit to first 3 failures
-            prompt = f"""
+        import asyncio
+        from .providers.llm import AsyncLLMClient, aclose_pools
+
+        llm = AsyncLLMClient(cfg)
+        actions = failed_actions[:3]  # Limit to first 3 failures
+        prompts = []
+        for action in actions:
+            prompts.append(f"""
 Cleanup action failed:
 - Description: {action['description']}
 - Command: {action['command']}
@@ -945,12 +964,24 @@ Cleanup action failed:
 
 Please suggest alternative approaches to clean this up safely.
 Respond with JSON format: {{"alternative_commands": ["cmd1", "cmd2"], "explanation": "..."}}
-"""
-            
-            response = llm.chat([{"role": "user", "content": prompt}], max_tokens=200)
+""")
+
+        async def ask_all():
+            try:
+                return await llm.chat_many(
+                    [[{"role": "user", "content": p}] for p in prompts], max_tokens=200
+                )
+            finally:
+                await aclose_pools()
+
+        # Zapytania idą równolegle, wyniki wypisujemy w kolejności akcji
+        for action, response in zip(actions, asyncio.run(ask_all())):
             click.echo(click.style(f"Sugestia LLM dla {action['description']}:", fg="blue"))
-            click.echo(f"   {response[:200]}...")
-            
+            if isinstance(response, Exception):
+                click.echo(click.style(f"   {response}", fg="red"))
+            else:
+                click.echo(f"   {response[:200]}...")
+
     except Exception as e:
         click.echo(click.style(f"LLM fallback nieudany: {str(e)}", fg="red"))
 
@@ -1286,8 +1317,13 @@ def test_llm(provider, token, model, no_banner):
               help="Symuluj wykonanie komend bez faktycznego uruchamiania")
 @click.option("--max-iterations", default=50, show_default=True,
               help="Maksymalna liczba iteracji napraw")
+@click.option("--parallel", "-j", default=1, show_default=True, type=click.IntRange(min=1),
+              help="Liczba niezależnych problemów naprawianych równolegle")
+@click.option("--batch-eval", default=1, show_default=True, type=click.IntRange(min=1),
+              help="Ile wyników napraw (z --parallel) oceniać jednym zapytaniem do LLM")
 @click.option("--output", "-o", default=None, help="Zapisz log sesji do JSON")
-def orchestrate(provider, token, model, no_banner, mode, modules, dry_run, max_iterations, output):
+def orchestrate(provider, token, model, no_banner, mode, modules, dry_run, max_iterations, parallel,
+                batch_eval, output):
     """
     Orkiestracja napraw z grafem kaskadowych problemów.
 
@@ -1304,6 +1340,7 @@ def orchestrate(provider, token, model, no_banner, mode, modules, dry_run, max_i
       fixos orchestrate --dry-run          # podgląd bez wykonywania
       fixos orchestrate --modules audio    # tylko problemy audio
       fixos orchestrate --mode autonomous  # bez pytania o każdą komendę
+      fixos orchestrate -j 4               # niezależne problemy równolegle
     """
     if not no_banner:
         click.echo(click.style(BANNER, fg="cyan"))
@@ -1375,7 +1412,10 @@ def orchestrate(provider, token, model, no_banner, mode, modules, dry_run, max_i
     console.print()
 
     # Główna pętla napraw
-    summary = orch.run_sync()
+    if parallel > 1:
+        summary = orch.run_parallel(max_workers=parallel, batch_size=batch_eval)
+    else:
+        summary = orch.run_sync()
 
     # Podsumowanie
     by_status = summary.get("by_status", {})
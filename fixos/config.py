@@ -8,7 +8,7 @@ from __future__ import annotations
 
 import os
 import sys
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Optional
 
@@ -26,6 +26,9 @@ ENV_SEARCH_PATHS = [
     Path.home() / ".fixos.conf",
 ]
 
+# rpm/tpm – domyślne budżety zapytań i tokenów na minutę (najniższy płatny
+# lub darmowy tier; None = bez limitu), patrz providers/ratelimit.py
+# context – okno kontekstu domyślnego modelu w tokenach (providers/prompt.py)
 PROVIDER_DEFAULTS = {
     "gemini": {
         "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
@@ -33,6 +36,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "GEMINI_API_KEY",
         "key_url": "https://aistudio.google.com/app/apikey",
         "free_tier": True,
+        "rpm": 10,
+        "tpm": 250000,
+        "context": 1048576,
         "description": "Google Gemini – darmowy tier, bardzo dobry do diagnostyki",
     },
     "openai": {
@@ -41,6 +47,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "OPENAI_API_KEY",
         "key_url": "https://platform.openai.com/api-keys",
         "free_tier": False,
+        "rpm": 500,
+        "tpm": 200000,
+        "context": 128000,
         "description": "OpenAI GPT-4o-mini – płatny, niezawodny",
     },
     "openrouter": {
@@ -49,6 +58,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "OPENROUTER_API_KEY",
         "key_url": "https://openrouter.ai/settings/keys",
         "free_tier": True,
+        "rpm": 20,
+        "tpm": None,
+        "context": 128000,
         "description": "OpenRouter – agregator 200+ modeli, darmowe modele dostępne",
     },
     "xai": {
@@ -57,6 +69,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "XAI_API_KEY",
         "key_url": "https://console.x.ai/",
         "free_tier": False,
+        "rpm": 60,
+        "tpm": None,
+        "context": 131072,
         "description": "xAI Grok – model od Elona Muska",
     },
     "anthropic": {
@@ -65,6 +80,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "ANTHROPIC_API_KEY",
         "key_url": "https://console.anthropic.com/settings/keys",
         "free_tier": False,
+        "rpm": 50,
+        "tpm": 50000,
+        "context": 200000,
         "description": "Anthropic Claude – bardzo dobry do analizy logów",
     },
     "mistral": {
@@ -73,6 +91,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "MISTRAL_API_KEY",
         "key_url": "https://console.mistral.ai/api-keys/",
         "free_tier": True,
+        "rpm": 60,
+        "tpm": 500000,
+        "context": 32000,
         "description": "Mistral AI – europejski provider, darmowy tier",
     },
     "groq": {
@@ -81,6 +102,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "GROQ_API_KEY",
         "key_url": "https://console.groq.com/keys",
         "free_tier": True,
+        "rpm": 30,
+        "tpm": 6000,
+        "context": 131072,
         "description": "Groq – ultra-szybkie wnioskowanie, darmowy tier",
     },
     "together": {
@@ -89,6 +113,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "TOGETHER_API_KEY",
         "key_url": "https://api.together.ai/settings/api-keys",
         "free_tier": True,
+        "rpm": 60,
+        "tpm": None,
+        "context": 131072,
         "description": "Together AI – open-source modele, $1 kredyt startowy",
     },
     "cohere": {
@@ -97,6 +124,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "COHERE_API_KEY",
         "key_url": "https://dashboard.cohere.com/api-keys",
         "free_tier": True,
+        "rpm": 20,
+        "tpm": None,
+        "context": 128000,
         "description": "Cohere Command-R – darmowy trial, dobry do RAG",
     },
     "deepseek": {
@@ -105,6 +135,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "DEEPSEEK_API_KEY",
         "key_url": "https://platform.deepseek.com/api_keys",
         "free_tier": False,
+        "rpm": None,
+        "tpm": None,
+        "context": 64000,
         "description": "DeepSeek – tani chiński provider, bardzo dobry stosunek ceny",
     },
     "cerebras": {
@@ -113,6 +146,9 @@ PROVIDER_DEFAULTS = {
         "key_env": "CEREBRAS_API_KEY",
         "key_url": "https://cloud.cerebras.ai/platform/",
         "free_tier": True,
+        "rpm": 30,
+        "tpm": 60000,
+        "context": 8192,
         "description": "Cerebras – najszybsze wnioskowanie na świecie, darmowy tier",
     },
     "ollama": {
@@ -121,6 +157,9 @@ PROVIDER_DEFAULTS = {
         "key_env": None,
         "key_url": "https://ollama.com/download",
         "free_tier": True,
+        "rpm": None,
+        "tpm": None,
+        "context": 8192,
         "description": "Ollama – lokalne modele, brak klucza API, pełna prywatność",
     },
 }
@@ -164,6 +203,8 @@ class FixOsConfig:
     agent_mode: str = "hitl"          # hitl | autonomous
     session_timeout: int = 3600
     max_auto_fixes: int = 10          # limit dla trybu autonomous
+    history_turns: int = 6            # tury rozmowy wysyłane dosłownie (starsze – podsumowanie)
+    history_summary: str = "local"    # local | llm – sposób podsumowania starszych tur
 
     # UI
     show_anonymized_data: bool = True  # Pokaż dane użytkownikowi przed wysłaniem
@@ -172,6 +213,19 @@ class FixOsConfig:
     enable_web_search: bool = True
     serpapi_key: Optional[str] = None
 
+    # Cache odpowiedzi LLM (deterministyczne wywołania, SQLite w ~/.cache/fixos)
+    llm_cache: bool = False
+    llm_cache_ttl: int = 86400
+    llm_max_concurrency: int = 4      # zapytania w locie per provider (AsyncLLMClient)
+    llm_rpm: Optional[int] = None     # None = limit z PROVIDER_DEFAULTS, 0 = bez limitu
+    llm_tpm: Optional[int] = None
+    prompt_tokens: int = 1500         # budżet tokenów na dane diagnostyczne w prompcie
+
+    # Failover / hedging
+    fallback_providers: list[str] = field(default_factory=list)  # kolejne providery po głównym
+    llm_hedge: bool = False           # drugie zapytanie do zapasowego providera po progu p95
+    llm_hedge_after: Optional[float] = None  # stały próg (s) zamiast p95
+
     # Storage
     save_reports: bool = False
     reports_dir: Path = field(default_factory=lambda: Path("/tmp/fixos-reports"))
@@ -238,6 +292,11 @@ class FixOsConfig:
             os.environ.get("SESSION_TIMEOUT", "3600")
         )
 
+        # Historia rozmowy agenta
+        if os.environ.get("AGENT_HISTORY_TURNS"):
+            cfg.history_turns = int(os.environ["AGENT_HISTORY_TURNS"])
+        cfg.history_summary = os.environ.get("AGENT_HISTORY_SUMMARY", "local").lower()
+
         # Show data
         if show_anonymized_data is not None:
             cfg.show_anonymized_data = show_anonymized_data
@@ -250,6 +309,31 @@ class FixOsConfig:
         cfg.enable_web_search = val not in ("false", "0", "no")
         cfg.serpapi_key = os.environ.get("SERPAPI_KEY")
 
+        # Cache odpowiedzi LLM
+        val = os.environ.get("LLM_CACHE", "false").lower()
+        cfg.llm_cache = val in ("true", "1", "yes")
+        cfg.llm_cache_ttl = int(os.environ.get("LLM_CACHE_TTL", "86400"))
+        cfg.llm_max_concurrency = max(1, int(os.environ.get("LLM_MAX_CONCURRENCY", "4")))
+        if os.environ.get("LLM_RPM"):
+            cfg.llm_rpm = int(os.environ["LLM_RPM"])
+        if os.environ.get("LLM_TPM"):
+            cfg.llm_tpm = int(os.environ["LLM_TPM"])
+
+        if os.environ.get("LLM_PROMPT_TOKENS"):
+            cfg.prompt_tokens = int(os.environ["LLM_PROMPT_TOKENS"])
+
+        # Failover / hedging
+        cfg.fallback_providers = [
+            p for p in (
+                name.strip().lower()
+                for name in os.environ.get("LLM_FALLBACK_PROVIDERS", "").split(",")
+            )
+            if p in PROVIDER_DEFAULTS and p != cfg.provider
+        ]
+        cfg.llm_hedge = os.environ.get("LLM_HEDGE", "false").lower() in ("true", "1", "yes")
+        if os.environ.get("LLM_HEDGE_AFTER"):
+            cfg.llm_hedge_after = float(os.environ["LLM_HEDGE_AFTER"])
+
         # Reports
         val = os.environ.get("SAVE_REPORTS", "false").lower()
         cfg.save_reports = val in ("true", "1", "yes")
@@ -257,6 +341,32 @@ class FixOsConfig:
 
         return cfg
 
+    def for_provider(self, provider: str) -> Optional["FixOsConfig"]:
+        """
+        Kopia konfiguracji dla innego providera (failover): klucz z jego
+        zmiennej (np. OPENAI_API_KEY), model i URL z env lub PROVIDER_DEFAULTS.
+        None, gdy provider nie jest znany albo nie ma klucza.
+        """
+        pdef = PROVIDER_DEFAULTS.get(provider)
+        if pdef is None:
+            return None
+        key_env = pdef.get("key_env")
+        api_key = os.environ.get(key_env) if key_env else None
+        if key_env and not api_key:
+            return None
+        return replace(
+            self,
+            provider=provider,
+            api_key=api_key,
+            model=os.environ.get(f"{provider.upper()}_MODEL") or pdef["model"],
+            base_url=os.environ.get(f"{provider.upper()}_BASE_URL") or pdef["base_url"],
+            fallback_providers=[],
+        )
+
+    def fallback_configs(self) -> list["FixOsConfig"]:
+        """Konfiguracje providerów zapasowych (bez tych, dla których brak klucza)."""
+        return [c for c in map(self.for_provider, self.fallback_providers) if c is not None]
+
     def validate(self) -> list[str]:
         """Zwraca listę błędów walidacji (pusta = OK)."""
         errors = []
@@ -269,6 +379,10 @@ class FixOsConfig:
             errors.append(
                 f"Nieprawidłowy AGENT_MODE='{self.agent_mode}'. Użyj: hitl | autonomous"
             )
+        if self.history_summary not in ("local", "llm"):
+            errors.append(
+                f"Nieprawidłowy AGENT_HISTORY_SUMMARY='{self.history_summary}'. Użyj: local | llm"
+            )
         return errors
 
     def summary(self) -> str:
@@ -8,15 +8,41 @@ import os
 import shutil
 import json
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
+from .disk_index import DiskIndex
+from .disk_scanner import DiskScanner, DirStats, FileEntry, ScanResult
+
+MB = 1024**2
+
 
 class DiskAnalyzer:
     """Analyzes disk usage and provides cleanup suggestions"""
     
-    def __init__(self, base_path: str = "/"):
+    def __init__(
+        self,
+        base_path: str = "/",
+        max_workers: int = 8,
+        use_index: bool = True,
+        index_path: Optional[str] = None,
+        incremental: bool = True,
+        top_k: int = 100,
+        one_filesystem: bool = True,
+        progress_callback: Optional[Callable[[List[Dict]], None]] = None,
+    ):
         self.base_path = Path(base_path)
+        self.max_workers = max_workers
+        # Persistent index: rescans only list directories whose mtime changed
+        self.index = DiskIndex(Path(index_path) if index_path else None) if use_index else None
+        self.incremental = incremental
+        self.top_k = top_k
+        # Stay on the analyzed path's filesystem, like `find -xdev`
+        self.one_filesystem = one_filesystem
+        # Receives the current largest files while a scan is running
+        self.progress_callback = progress_callback
+        # One walk per analyzed root, shared by every query below
+        self._scans: Dict[str, ScanResult] = {}
         self.cache_patterns = [
             ".cache", "__pycache__", "node_modules", ".npm", 
             ".pip", "cache", "Cache", ".gradle", ".maven", ".cargo",
@@ -39,6 +65,7 @@ class DiskAnalyzer:
             return {"error": f"Path {path} does not exist"}
             
         try:
+            scan = self._scan(path, refresh=True)
             stat = shutil.disk_usage(path)
             total_gb = stat.total / (1024**3)
             used_gb = stat.used / (1024**3)
@@ -57,6 +84,7 @@ class DiskAnalyzer:
                 "log_dirs": self.get_log_dirs(path),
                 "temp_dirs": self.get_temp_dirs(path),
                 "suggestions": self.suggest_cleanup_actions(path),
+                "skipped_paths": scan.skipped[:20],
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -78,126 +106,125 @@ class DiskAnalyzer:
     
     def get_large_files(self, path: Path, min_size_mb: int = 100, max_files: int = 20) -> List[Dict]:
         """Find large files"""
+        scan = self._scan(path, min_file_size=min_size_mb * MB, top_k=max_files)
+        root = os.path.normpath(str(path))
         large_files = []
-        
-        try:
-            for file_path in path.rglob("*"):
-                if file_path.is_file():
-                    try:
-                        size_mb = file_path.stat().st_size / (1024**2)
-                        if size_mb >= min_size_mb:
-                            large_files.append({
-                                "path": str(file_path),
-                                "size_mb": round(size_mb, 2),
-                                "size_gb": round(size_mb / 1024, 3),
-                                "modified": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                                "category": self._categorize_file(file_path)
-                            })
-                    except (OSError, PermissionError):
-                        continue
-                        
-                # Limit results to avoid excessive scanning
-                if len(large_files) >= max_files:
-                    break
-                    
-        except Exception as e:
-            pass
-            
-        # Sort by size (largest first)
-        large_files.sort(key=lambda x: x["size_mb"], reverse=True)
-        return large_files[:max_files]
+        for entry in scan.large_files:
+            if entry.size < min_size_mb * MB or not _within(entry.path, root):
+                continue
+            large_files.append({
+                "path": entry.path,
+                **self._sizes(entry.size, entry.disk),
+                "modified": datetime.fromtimestamp(entry.mtime).isoformat(),
+                "category": self._categorize_file(Path(entry.path))
+            })
+            if len(large_files) >= max_files:
+                break
+        return large_files
     
     def get_cache_dirs(self, path: Path, max_dirs: int = 15) -> List[Dict]:
         """Find cache directories"""
         cache_dirs = []
-        
-        try:
-            for dir_path in path.rglob("*"):
-                if dir_path.is_dir():
-                    dir_name = dir_path.name.lower()
-                    if any(pattern in dir_name for pattern in self.cache_patterns):
-                        try:
-                            size_mb = self._get_dir_size_mb(dir_path)
-                            if size_mb > 10:  # Only include significant cache dirs
-                                cache_dirs.append({
-                                    "path": str(dir_path),
-                                    "size_mb": round(size_mb, 2),
-                                    "size_gb": round(size_mb / 1024, 3),
-                                    "files_count": len(list(dir_path.rglob("*"))) if size_mb < 1000 else "many",
-                                    "cache_type": self._identify_cache_type(dir_path)
-                                })
-                        except (OSError, PermissionError):
-                            continue
-                            
-                if len(cache_dirs) >= max_dirs:
-                    break
-                    
-        except Exception:
-            pass
-            
-        cache_dirs.sort(key=lambda x: x["size_mb"], reverse=True)
-        return cache_dirs
+        for stats in self._matching_dirs(path, self.cache_patterns, min_size_mb=10):
+            cache_dirs.append({
+                "path": stats.path,
+                **self._sizes(stats.size, stats.disk),
+                "files_count": stats.files,
+                "cache_type": self._identify_cache_type(Path(stats.path))
+            })
+        return cache_dirs[:max_dirs]
     
     def get_log_dirs(self, path: Path, max_dirs: int = 10) -> List[Dict]:
         """Find log directories"""
         log_dirs = []
-        
-        try:
-            for dir_path in path.rglob("*"):
-                if dir_path.is_dir():
-                    dir_name = dir_path.name.lower()
-                    if any(pattern in dir_name for pattern in ["log", "logs"]):
-                        try:
-                            size_mb = self._get_dir_size_mb(dir_path)
-                            if size_mb > 5:  # Only include significant log dirs
-                                log_dirs.append({
-                                    "path": str(dir_path),
-                                    "size_mb": round(size_mb, 2),
-                                    "size_gb": round(size_mb / 1024, 3),
-                                    "oldest_log": self._get_oldest_file_date(dir_path),
-                                    "newest_log": self._get_newest_file_date(dir_path)
-                                })
-                        except (OSError, PermissionError):
-                            continue
-                            
-                if len(log_dirs) >= max_dirs:
-                    break
-                    
-        except Exception:
-            pass
-            
-        log_dirs.sort(key=lambda x: x["size_mb"], reverse=True)
-        return log_dirs
+        for stats in self._matching_dirs(path, ["log", "logs"], min_size_mb=5):
+            log_dirs.append({
+                "path": stats.path,
+                **self._sizes(stats.size, stats.disk),
+                "oldest_log": self._format_mtime(stats.oldest),
+                "newest_log": self._format_mtime(stats.newest)
+            })
+        return log_dirs[:max_dirs]
     
     def get_temp_dirs(self, path: Path, max_dirs: int = 10) -> List[Dict]:
         """Find temporary directories"""
         temp_dirs = []
-        
-        try:
-            for dir_path in path.rglob("*"):
-                if dir_path.is_dir():
-                    dir_name = dir_path.name.lower()
-                    if any(pattern in dir_name for pattern in self.temp_patterns):
-                        try:
-                            size_mb = self._get_dir_size_mb(dir_path)
-                            if size_mb > 5:
-                                temp_dirs.append({
-                                    "path": str(dir_path),
-                                    "size_mb": round(size_mb, 2),
-                                    "size_gb": round(size_mb / 1024, 3),
-                                    "temp_type": self._identify_temp_type(dir_path)
-                                })
-                        except (OSError, PermissionError):
-                            continue
-                            
-                if len(temp_dirs) >= max_dirs:
-                    break
-                    
-        except Exception:
-            pass
-            
-        temp_dirs.sort(key=lambda x: x["size_mb"], reverse=True)
-        return temp_dirs
+        for stats in self._matching_dirs(path, self.temp_patterns, min_size_mb=5):
+            temp_dirs.append({
+                "path": stats.path,
+                **self._sizes(stats.size, stats.disk),
+                "temp_type": self._identify_temp_type(Path(stats.path))
+            })
+        return temp_dirs[:max_dirs]
+    
+    def _scan(
+        self, path: Path, min_file_size: int = 100 * MB, top_k: int = 0, refresh: bool = False
+    ) -> ScanResult:
+        """Walk `path` once and reuse the result for every later query"""
+        key = os.path.normpath(str(path))
+        if not refresh:
+            # A scan of the same or an enclosing root already covers this subtree
+            for root, scan in self._scans.items():
+                if _within(key, root) and scan.min_file_size <= min_file_size and scan.top_k >= top_k:
+                    return scan
+        scanner = DiskScanner(
+            min_file_size=min(min_file_size, 100 * MB),
+            max_workers=self.max_workers,
+            index=self.index,
+            incremental=self.incremental,
+            top_k=max(top_k, self.top_k),
+            one_filesystem=self.one_filesystem,
+            on_snapshot=self._report_progress if self.progress_callback else None,
+        )
+        self._scans[key] = scanner.scan(key)
+        return self._scans[key]
+    
+    @staticmethod
+    def _sizes(apparent: int, disk: int) -> Dict[str, float]:
+        """size_* is reclaimable on-disk space; apparent_* is the st_size sum"""
+        return {
+            "size_mb": round(disk / MB, 2),
+            "size_gb": round(disk / 1024**3, 3),
+            "apparent_mb": round(apparent / MB, 2),
+            "apparent_gb": round(apparent / 1024**3, 3),
+        }
+    
+    def _report_progress(self, snapshot: List[FileEntry]) -> None:
+        self.progress_callback([
+            {"path": entry.path, "size_gb": round(entry.disk / 1024**3, 3)}
+            for entry in snapshot
+        ])
+    
+    def get_growth(self, path: Optional[str] = None, limit: int = 30) -> List[Dict]:
+        """Size history of `path` recorded by previous scans, oldest first"""
+        if self.index is None:
+            return []
+        return [
+            {
+                "scanned_at": datetime.fromtimestamp(ts).isoformat(),
+                "size_gb": round(disk / 1024**3, 3),
+                "apparent_gb": round(size / 1024**3, 3),
+            }
+            for ts, size, disk in self.index.growth(str(path or self.base_path), limit)
+        ]
+    
+    def _dir_stats(self, dir_path: Path) -> DirStats:
+        key = os.path.normpath(str(dir_path))
+        return self._scan(dir_path).stats(key) or DirStats(key)
+    
+    def _matching_dirs(self, path: Path, patterns: List[str], min_size_mb: float) -> List[DirStats]:
+        """Directories under `path` whose name matches a pattern, largest first"""
+        scan = self._scan(path)
+        root = os.path.normpath(str(path))
+        matches = []
+        for dir_path, stats in scan.dirs.items():
+            if dir_path == root or stats.disk <= min_size_mb * MB or not _within(dir_path, root):
+                continue
+            dir_name = os.path.basename(dir_path).lower()
+            if any(pattern in dir_name for pattern in patterns):
+                matches.append(stats)
+        matches.sort(key=lambda s: s.disk, reverse=True)
+        return matches
     
     def suggest_cleanup_actions(self, path: Path) -> List[Dict]:
         """Generate cleanup suggestions using heuristics"""
@@ -310,15 +337,8 @@ class DiskAnalyzer:
         return suggestions[:15]  # Limit to top 15 suggestions
     
     def _get_dir_size_mb(self, dir_path: Path) -> float:
-        """Calculate directory size in MB"""
-        total_size = 0
-        try:
-            for item in dir_path.rglob("*"):
-                if item.is_file():
-                    total_size += item.stat().st_size
-        except (OSError, PermissionError):
-            pass
-        return total_size / (1024**2)
+        """Calculate directory size in MB (allocated on disk, hard links counted once)"""
+        return self._dir_stats(dir_path).disk / MB
     
     def _categorize_file(self, file_path: Path) -> str:
         """Categorize file type"""
@@ -379,33 +399,21 @@ class DiskAnalyzer:
     
     def _get_oldest_file_date(self, dir_path: Path) -> str:
         """Get oldest file date in directory"""
-        oldest_time = None
-        try:
-            for file_path in dir_path.rglob("*"):
-                if file_path.is_file():
-                    mtime = file_path.stat().st_mtime
-                    if oldest_time is None or mtime < oldest_time:
-                        oldest_time = mtime
-            if oldest_time:
-                return datetime.fromtimestamp(oldest_time).isoformat()
-        except Exception:
-            pass
-        return "unknown"
+        return self._format_mtime(self._dir_stats(dir_path).oldest)
     
     def _get_newest_file_date(self, dir_path: Path) -> str:
         """Get newest file date in directory"""
-        newest_time = None
-        try:
-            for file_path in dir_path.rglob("*"):
-                if file_path.is_file():
-                    mtime = file_path.stat().st_mtime
-                    if newest_time is None or mtime > newest_time:
-                        newest_time = mtime
-            if newest_time:
-                return datetime.fromtimestamp(newest_time).isoformat()
-        except Exception:
-            pass
-        return "unknown"
+        return self._format_mtime(self._dir_stats(dir_path).newest)
+    
+    @staticmethod
+    def _format_mtime(mtime) -> str:
+        if mtime is None:
+            return "unknown"
+        return datetime.fromtimestamp(mtime).isoformat()
+
+def _within(path: str, root: str) -> bool:
+    """True if `path` is `root` or lies below it"""
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
 
 
 def main():
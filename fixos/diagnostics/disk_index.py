@@ -0,0 +1,192 @@
+"""
+Persistent disk-usage index for incremental rescans.
+
+Stores the direct contents of every scanned directory (file totals, mtimes,
+subdirectories and large files) in SQLite under ~/.cache/fixos. DiskScanner
+reuses records of directories whose mtime did not change since the previous
+run. Each scan also appends the cumulative size of the root and its
+top-level directories to a history table used for growth-trend reporting.
+
+Note: a file that grows in place does not change its directory's mtime.
+DiskScanner re-stats the stored large files of every reused directory, but
+smaller files are only re-measured by a full rescan; `load` therefore drops
+the records once the last full scan of a root is older than `max_age`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from ..platform_utils import cache_dir
+from .disk_scanner import DirRecord, DirStats, FileEntry, LinkedFile
+
+if TYPE_CHECKING:
+    from .disk_scanner import ScanResult
+
+# Bumped whenever the stored record layout changes; older indexes are dropped
+_SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY,
+    min_file_size INTEGER NOT NULL,
+    scanned_at REAL NOT NULL,
+    full_scan_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    disk INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    oldest REAL,
+    newest REAL,
+    children TEXT NOT NULL,
+    large TEXT NOT NULL,
+    links TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    path TEXT NOT NULL,
+    scanned_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    disk INTEGER NOT NULL,
+    files INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_path ON history (path, scanned_at);
+"""
+
+
+def default_index_path() -> Path:
+    return cache_dir() / "disk-index.sqlite"
+
+
+class DiskIndex:
+    """SQLite-backed store of per-directory scan records."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_index_path()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _session(self) -> Iterator[sqlite3.Connection]:
+        """One serialized connection, committed on success and always closed."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(sqlite3.connect(self.path)) as conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                    conn.executescript(
+                        "DROP TABLE IF EXISTS roots; DROP TABLE IF EXISTS dirs; "
+                        "DROP TABLE IF EXISTS history;"
+                    )
+                    conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+                conn.executescript(_SCHEMA)
+                with conn:
+                    yield conn
+
+    def load(
+        self, root: str, min_file_size: int, max_age: Optional[float] = None
+    ) -> Dict[str, DirRecord]:
+        """
+        Records under `root` from the previous scan. Empty when there was
+        none, it used a higher large-file threshold than requested, or the
+        last full scan of `root` is more than `max_age` seconds old.
+        """
+        try:
+            with self._session() as conn:
+                row = conn.execute(
+                    "SELECT min_file_size, full_scan_at FROM roots WHERE root = ?", (root,)
+                ).fetchone()
+                if row is None or row[0] > min_file_size:
+                    return {}
+                if max_age is not None and time.time() - row[1] > max_age:
+                    return {}
+                lo, hi = _subtree_range(root)
+                rows = conn.execute(
+                    "SELECT path, mtime, size, disk, files, oldest, newest, children, large, links FROM dirs "
+                    "WHERE path = ? OR (path >= ? AND path < ?)",
+                    (root, lo, hi),
+                ).fetchall()
+        except (sqlite3.Error, OSError):
+            return {}
+        records = {}
+        for path, mtime, size, disk, files, oldest, newest, children, large, links in rows:
+            records[path] = DirRecord(
+                path=path,
+                mtime=mtime,
+                own=DirStats(path, size=size, disk=disk, files=files, oldest=oldest, newest=newest),
+                children=json.loads(children),
+                large=[FileEntry(*f) for f in json.loads(large)],
+                links=[LinkedFile(*f) for f in json.loads(links)],
+            )
+        return records
+
+    def save(self, result: "ScanResult") -> None:
+        """Replaces the records under the scanned root and appends growth history."""
+        root = result.root
+        now = time.time()
+        # Only a scan that listed every directory resets the rescan clock
+        full = result.reused == 0
+        lo, hi = _subtree_range(root)
+        rows = [
+            (
+                rec.path, rec.mtime, rec.own.size, rec.own.disk, rec.own.files,
+                rec.own.oldest, rec.own.newest,
+                json.dumps(rec.children),
+                json.dumps([(f.path, f.size, f.mtime, f.disk) for f in rec.large]),
+                json.dumps([(f.dev, f.ino, f.size, f.disk, f.mtime) for f in rec.links]),
+            )
+            for rec in result.records.values()
+        ]
+        tracked = [root] + list(result.records[root].children) if root in result.records else [root]
+        history = [
+            (path, now, result.dirs[path].size, result.dirs[path].disk, result.dirs[path].files)
+            for path in tracked if path in result.dirs
+        ]
+        try:
+            with self._session() as conn:
+                # A root scan supersedes any narrower scan inside it
+                conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (root, lo, hi))
+                conn.execute("DELETE FROM roots WHERE root >= ? AND root < ?", (lo, hi))
+                # Enclosing roots may now hold records with this scan's threshold
+                for other, size in conn.execute("SELECT root, min_file_size FROM roots").fetchall():
+                    if root.startswith(other.rstrip(os.sep) + os.sep) and size < result.min_file_size:
+                        conn.execute(
+                            "UPDATE roots SET min_file_size = ? WHERE root = ?",
+                            (result.min_file_size, other),
+                        )
+                prev = conn.execute("SELECT full_scan_at FROM roots WHERE root = ?", (root,)).fetchone()
+                full_scan_at = now if full or prev is None else prev[0]
+                conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.execute(
+                    "INSERT OR REPLACE INTO roots VALUES (?, ?, ?, ?)",
+                    (root, result.min_file_size, now, full_scan_at),
+                )
+                conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?)", history)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def growth(self, path: str, limit: int = 30) -> List[Tuple[float, int, int]]:
+        """(scanned_at, apparent bytes, on-disk bytes) of `path` over recent scans, oldest first."""
+        try:
+            with self._session() as conn:
+                rows = conn.execute(
+                    "SELECT scanned_at, size, disk FROM history WHERE path = ? "
+                    "ORDER BY scanned_at DESC LIMIT ?",
+                    (os.path.normpath(path), limit),
+                ).fetchall()
+        except (sqlite3.Error, OSError):
+            return []
+        return list(reversed(rows))
+
+
+def _subtree_range(root: str) -> Tuple[str, str]:
+    """[lo, hi) string range covering every path strictly below `root`."""
+    prefix = root.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
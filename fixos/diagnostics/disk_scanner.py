@@ -0,0 +1,427 @@
+"""
+Single-pass filesystem scanner for DiskAnalyzer.
+
+One os.scandir walk collects everything the analyzer needs: large files,
+cumulative per-directory sizes and file counts, and the oldest/newest file
+mtime of every subtree. Top-level directories are walked in parallel on a
+worker pool and the partial results are merged at the end.
+
+With a DiskIndex attached, directories whose mtime matches the previous run
+reuse their recorded file totals instead of being listed again; only their
+subdirectories and recorded large files are stat()ed. A large file that
+grew in place (logs, VM images) leaves the directory mtime untouched, so
+its directory is listed again when the re-stat shows a different size.
+Smaller files are re-measured by the periodic full rescan
+(`full_rescan_after`).
+
+Large files are kept in a bounded min-heap (TopK), so the result is the true
+K largest files of the whole tree in O(K) memory, regardless of walk order.
+
+Sizes are tracked twice: apparent (st_size) and on-disk (st_blocks * 512).
+Sparse files (VM images) count only their allocated blocks on disk, and a
+hard-linked inode (ostree, flatpak, container layers) is counted once per
+scan, under the first directory that claims its (st_dev, st_ino).
+
+Like `find -xdev`, the walk stays on the root's device by default. It never
+enters configured pseudo-filesystem paths or mount types (procfs, sysfs,
+network shares), and every mount point it does cross is first probed in a
+daemon thread with a timeout, so a stale NFS mount cannot stall the scan.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, List, Optional
+
+from . import procfs
+
+if TYPE_CHECKING:
+    from .disk_index import DiskIndex
+
+
+# Never worth walking: kernel and runtime pseudo-filesystems
+DEFAULT_SKIP_PATHS: FrozenSet[str] = frozenset({"/proc", "/sys", "/dev", "/run"})
+
+# Mount types pruned even when crossing filesystems is allowed
+DEFAULT_SKIP_FSTYPES: FrozenSet[str] = frozenset({
+    "proc", "sysfs", "devtmpfs", "devpts", "cgroup", "cgroup2", "securityfs",
+    "debugfs", "tracefs", "pstore", "bpf", "configfs", "fusectl", "mqueue",
+    "hugetlbfs", "binfmt_misc", "autofs", "rpc_pipefs", "nsfs",
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p",
+})
+
+
+@dataclass
+class DirStats:
+    """Cumulative statistics of a directory subtree."""
+    path: str
+    size: int = 0
+    files: int = 0
+    oldest: Optional[float] = None
+    newest: Optional[float] = None
+    disk: int = 0
+
+    def add_file(self, size: int, disk: int, mtime: float) -> None:
+        self.size += size
+        self.disk += disk
+        self.files += 1
+        self._add_mtimes(mtime, mtime)
+
+    def merge(self, child: "DirStats") -> None:
+        self.size += child.size
+        self.disk += child.disk
+        self.files += child.files
+        if child.oldest is not None:
+            self._add_mtimes(child.oldest, child.newest)
+
+    def _add_mtimes(self, oldest: float, newest: float) -> None:
+        if self.oldest is None or oldest < self.oldest:
+            self.oldest = oldest
+        if self.newest is None or newest > self.newest:
+            self.newest = newest
+
+
+@dataclass
+class FileEntry:
+    path: str
+    size: int
+    mtime: float
+    disk: int = 0
+
+
+@dataclass
+class LinkedFile:
+    """A file with st_nlink > 1 – counted only by the first directory claiming its inode."""
+    dev: int
+    ino: int
+    size: int
+    disk: int
+    mtime: float
+
+
+def disk_bytes(st: os.stat_result) -> int:
+    """Allocated bytes; st_size where st_blocks is unavailable (Windows)."""
+    blocks = getattr(st, "st_blocks", None)
+    return st.st_size if blocks is None else blocks * 512
+
+
+def _unchanged(files: List[FileEntry]) -> bool:
+    """True when every recorded file still exists with the same size and mtime."""
+    for f in files:
+        try:
+            st = os.lstat(f.path)
+        except OSError:
+            return False
+        if st.st_size != f.size or st.st_mtime != f.mtime or disk_bytes(st) != f.disk:
+            return False
+    return True
+
+
+class TopK:
+    """Thread-safe collector of the K largest files by on-disk size (min-heap of size K)."""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def push(self, entry: FileEntry) -> None:
+        # Unlocked pre-check: most files are smaller than the current K-th largest
+        heap = self._heap
+        if len(heap) >= self.k and entry.disk <= heap[0][0]:
+            return
+        with self._lock:
+            item = (entry.disk, entry.path, entry.size, entry.mtime)
+            if len(heap) < self.k:
+                heapq.heappush(heap, item)
+            elif entry.disk > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    def snapshot(self) -> List[FileEntry]:
+        """Current top-K, largest first."""
+        with self._lock:
+            items = sorted(self._heap, reverse=True)
+        return [FileEntry(path, size, mtime, disk) for disk, path, size, mtime in items]
+
+
+@dataclass
+class DirRecord:
+    """Direct (non-cumulative) contents of one directory, as stored in the index."""
+    path: str
+    mtime: float
+    own: DirStats
+    children: List[str] = field(default_factory=list)
+    large: List[FileEntry] = field(default_factory=list)
+    links: List[LinkedFile] = field(default_factory=list)
+
+
+@dataclass
+class ScanResult:
+    """Output of one walk – shared by every DiskAnalyzer query."""
+    root: str
+    min_file_size: int = 0
+    top_k: int = 0
+    dirs: Dict[str, DirStats] = field(default_factory=dict)
+    large_files: List[FileEntry] = field(default_factory=list)
+    errors: int = 0
+    skipped: List[str] = field(default_factory=list)
+    records: Dict[str, DirRecord] = field(default_factory=dict)
+    reused: int = 0
+
+    def merge(self, other: "ScanResult") -> None:
+        self.dirs.update(other.dirs)
+        self.errors += other.errors
+        self.skipped.extend(other.skipped)
+        self.records.update(other.records)
+        self.reused += other.reused
+
+    def stats(self, path: str) -> Optional[DirStats]:
+        return self.dirs.get(os.path.normpath(path))
+
+
+class DiskScanner:
+    """
+    Walks a tree once with os.scandir, one worker per top-level directory.
+
+    Args:
+        min_file_size: files at least this large are candidates for `large_files`
+        incremental: reuse index records of directories whose mtime is unchanged
+        full_rescan_after: seconds after the last full scan of a root at which
+            the index is ignored, so files that grew in place are re-measured
+        top_k: how many of the largest files to keep
+        on_snapshot: called from worker threads with the current top-K
+            (largest first) at most every `snapshot_interval` seconds
+        one_filesystem: stay on the root's device (`find -xdev`)
+        skip_paths: absolute paths never entered
+        skip_fstypes: mount types never entered
+        mount_timeout: seconds a newly entered mount point may take to respond
+    """
+
+    def __init__(
+        self,
+        min_file_size: int = 100 * 1024**2,
+        max_workers: int = 8,
+        index: Optional["DiskIndex"] = None,
+        incremental: bool = True,
+        full_rescan_after: Optional[float] = 7 * 24 * 3600,
+        top_k: int = 100,
+        on_snapshot: Optional[Callable[[List[FileEntry]], None]] = None,
+        snapshot_interval: float = 1.0,
+        one_filesystem: bool = True,
+        skip_paths: FrozenSet[str] = DEFAULT_SKIP_PATHS,
+        skip_fstypes: FrozenSet[str] = DEFAULT_SKIP_FSTYPES,
+        mount_timeout: float = 5.0,
+    ):
+        self.min_file_size = min_file_size
+        self.max_workers = max_workers
+        self.index = index
+        self.incremental = incremental
+        self.full_rescan_after = full_rescan_after
+        self.top_k = top_k
+        self.on_snapshot = on_snapshot
+        self.snapshot_interval = snapshot_interval
+        self.one_filesystem = one_filesystem
+        self.skip_paths = frozenset(os.path.normpath(p) for p in skip_paths)
+        self.skip_fstypes = skip_fstypes
+        self.mount_timeout = mount_timeout
+        self._root = ""
+        self._root_dev: Optional[int] = None
+        self._mounts: Dict[str, str] = {}
+        self._prior: Dict[str, DirRecord] = {}
+        self._top = TopK(top_k)
+        self._last_snapshot = 0.0
+        self._snapshot_lock = threading.Lock()
+        self._inodes: set = set()
+        self._inode_lock = threading.Lock()
+
+    def scan(self, root: str) -> ScanResult:
+        root = os.path.normpath(root)
+        self._prior = {}
+        self._top = TopK(self.top_k)
+        self._inodes = set()
+        if self.index is not None and self.incremental:
+            self._prior = self.index.load(root, self.min_file_size, self.full_rescan_after)
+
+        result = ScanResult(root=root, min_file_size=self.min_file_size, top_k=self.top_k)
+        self._root = root
+        self._mounts = {m["mountpoint"]: m["fstype"] for m in procfs.mounts()}
+        try:
+            if not self._responsive(root):
+                raise TimeoutError(root)
+            self._root_dev = os.lstat(root).st_dev
+        except OSError:
+            result.errors += 1
+            result.dirs[root] = DirStats(root)
+            return result
+        top, subdirs = self._visit(root, result)
+
+        if subdirs:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(subdirs)),
+                thread_name_prefix="fixos-disk",
+            ) as pool:
+                for partial in pool.map(self._walk, subdirs):
+                    result.merge(partial)
+                    top.merge(partial.dirs[partial.root])
+
+        result.dirs[root] = top
+        result.large_files = self._top.snapshot()
+        self._prior = {}
+        self._inodes = set()
+        if self.index is not None:
+            self.index.save(result)
+        return result
+
+    def _walk(self, top: str) -> ScanResult:
+        """Iterative walk of one subtree; cumulative sizes are folded bottom-up."""
+        result = ScanResult(root=top)
+        order: List[DirStats] = []
+        parents: Dict[str, str] = {}
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            stats, children = self._visit(path, result)
+            order.append(stats)
+            for child in children:
+                parents[child] = path
+            stack.extend(children)
+
+        for stats in order:
+            result.dirs[stats.path] = stats
+        # Parents precede children in `order`, so reversed order visits every
+        # child before its parent
+        for stats in reversed(order):
+            parent = parents.get(stats.path)
+            if parent is not None:
+                result.dirs[parent].merge(stats)
+        return result
+
+    def _visit(self, path: str, result: ScanResult):
+        """Direct contents of one directory – from the index if unchanged, else listed."""
+        if self._pruned(path):
+            result.skipped.append(path)
+            return DirStats(path), []
+        try:
+            st = os.lstat(path)
+        except OSError:
+            result.errors += 1
+            return DirStats(path), []
+        if self.one_filesystem and st.st_dev != self._root_dev:
+            # Mount missing from the mount table (e.g. inside a container)
+            result.skipped.append(path)
+            return DirStats(path), []
+        mtime = st.st_mtime
+
+        prior = self._prior.get(path)
+        if prior is not None and prior.mtime == mtime and _unchanged(prior.large):
+            stats = replace(prior.own)
+            children = list(prior.children)
+            large = [f for f in prior.large if f.size >= self.min_file_size]
+            links = list(prior.links)
+            result.reused += 1
+        else:
+            stats = DirStats(path)
+            children = []
+            large = []
+            links = []
+            self._scan_entries(path, stats, children, large, links, result)
+
+        record = DirRecord(path, mtime, replace(stats), children, large, links)
+        # Hard links are resolved per scan, so reused records stay correct
+        for link in links:
+            if self._claim(link.dev, link.ino):
+                stats.add_file(link.size, link.disk, link.mtime)
+        for entry in large:
+            self._top.push(entry)
+        self._maybe_snapshot()
+        if self.index is not None:
+            result.records[path] = record
+        return stats, children
+
+    def _pruned(self, path: str) -> bool:
+        """Configured pseudo-fs paths and mount points that must not be entered."""
+        if path == self._root:
+            return False
+        if path in self.skip_paths:
+            return True
+        fstype = self._mounts.get(path)
+        if fstype is None:
+            return False
+        if self.one_filesystem or fstype in self.skip_fstypes:
+            return True
+        return not self._responsive(path)
+
+    def _responsive(self, path: str) -> bool:
+        """
+        lstat + first scandir entry of `path` in a daemon thread, bounded by
+        `mount_timeout`. A hung call (stale NFS) is abandoned, not joined.
+        """
+        done = threading.Event()
+
+        def probe() -> None:
+            try:
+                os.lstat(path)
+                with os.scandir(path) as it:
+                    next(it, None)
+            except OSError:
+                pass
+            finally:
+                done.set()
+
+        threading.Thread(target=probe, name="fixos-disk-probe", daemon=True).start()
+        return done.wait(self.mount_timeout)
+
+    def _claim(self, dev: int, ino: int) -> bool:
+        """True for the first claim of an inode in this scan."""
+        key = (dev, ino)
+        with self._inode_lock:
+            if key in self._inodes:
+                return False
+            self._inodes.add(key)
+            return True
+
+    def _maybe_snapshot(self) -> None:
+        if self.on_snapshot is None:
+            return
+        now = time.monotonic()
+        if now - self._last_snapshot < self.snapshot_interval:
+            return
+        with self._snapshot_lock:
+            if now - self._last_snapshot < self.snapshot_interval:
+                return
+            self._last_snapshot = now
+        self.on_snapshot(self._top.snapshot())
+
+    def _scan_entries(
+        self,
+        path: str,
+        stats: DirStats,
+        subdirs: List[str],
+        large: List[FileEntry],
+        links: List[LinkedFile],
+        result: ScanResult,
+    ) -> None:
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            disk = disk_bytes(st)
+                            if st.st_nlink > 1:
+                                links.append(LinkedFile(st.st_dev, st.st_ino, st.st_size, disk, st.st_mtime))
+                            else:
+                                stats.add_file(st.st_size, disk, st.st_mtime)
+                            if st.st_size >= self.min_file_size:
+                                large.append(FileEntry(entry.path, st.st_size, st.st_mtime, disk))
+                    except OSError:
+                        result.errors += 1
+        except OSError:
+            result.errors += 1
@@ -0,0 +1,137 @@
+"""
+ProbeEngine – współbieżne uruchamianie sond diagnostycznych.
+
+Każda sonda to niezależna komenda shell. Zamiast wykonywać je jedna po
+drugiej, silnik rozrzuca je na ograniczoną pulę wątków, pilnując:
+- timeoutu pojedynczej sondy (przekazywanego do runnera)
+- globalnego deadline'u całego skanu (sondy, które nie zdążą, dostają znacznik)
+- deduplikacji – identyczna komenda w obrębie skanu uruchamiana jest raz
+
+Sondy z natywnym czytnikiem (procfs) nie uruchamiają shella – komenda jest
+wykonywana tylko, gdy czytnik zwróci None lub rzuci OSError/ValueError.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from .probes import Probe, ProbeCost, Reader
+
+ProbeRunner = Callable[[str, int], str]
+
+DEADLINE_MARKER = "[POMINIĘTO – przekroczono limit czasu skanu]"
+
+# Silnik aktywny w bieżącym skanie (ustawiany przez get_full_diagnostics)
+_ACTIVE_ENGINE: contextvars.ContextVar[Optional["ProbeEngine"]] = contextvars.ContextVar(
+    "fixos_probe_engine", default=None
+)
+
+
+class ProbeEngine:
+    """
+    Ograniczona pula wątków dla sond diagnostycznych.
+
+    Args:
+        runner: funkcja (cmd, timeout) -> str wykonująca pojedynczą sondę
+        max_workers: maksymalna liczba równoległych sond
+        deadline: globalny limit czasu skanu liczony od utworzenia (s), None = brak
+        max_cost: najwyższa klasa kosztu sond z rejestru (None = wszystkie)
+    """
+
+    def __init__(
+        self,
+        runner: ProbeRunner,
+        max_workers: int = 8,
+        deadline: Optional[float] = None,
+        max_cost: Optional[ProbeCost] = None,
+    ):
+        self._runner = runner
+        self.max_workers = max_workers
+        self.max_cost = max_cost
+        self._deadline_at = time.monotonic() + deadline if deadline else None
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fixos-probe"
+        )
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "ProbeEngine":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+    def remaining(self) -> Optional[float]:
+        """Sekundy do globalnego deadline'u (None = bez limitu)."""
+        if self._deadline_at is None:
+            return None
+        return max(0.0, self._deadline_at - time.monotonic())
+
+    def run_registered(self, probes: list[Probe]) -> dict[str, str]:
+        """
+        Uruchamia sondy z rejestru, pomijając te powyżej `max_cost`.
+        Sondy ze wspólną komendą bazową dzielą jedno wykonanie – każda
+        filtruje zapamiętany output własnymi filtrami.
+        """
+        active = [p for p in probes if p.within(self.max_cost)]
+        futures: dict[str, Optional[Future]] = {
+            p.key: self._submit(p.command, p.timeout, p.reader) for p in active
+        }
+        done, _ = wait({f for f in futures.values() if f is not None}, timeout=self.remaining())
+        return {
+            p.key: p.refine(futures[p.key].result())
+            if futures[p.key] in done else DEADLINE_MARKER
+            for p in active
+        }
+
+    def prefetch(self, probes: list[Probe]) -> None:
+        """Planuje sondy z wyprzedzeniem – późniejsze run_registered() trafią w gotowe wyniki."""
+        for p in probes:
+            if p.within(self.max_cost):
+                self._submit(p.command, p.timeout, p.reader)
+
+    def _submit(self, cmd: str, timeout: int, reader: Optional[Reader] = None) -> Optional[Future]:
+        with self._lock:
+            fut = self._futures.get(cmd)
+            if fut is not None:
+                return fut
+            remaining = self.remaining()
+            if remaining is not None:
+                if remaining <= 0:
+                    return None
+                # Timeout sondy nigdy nie wychodzi poza deadline skanu
+                timeout = max(1, min(timeout, int(remaining)))
+            if reader is not None:
+                fut = self._pool.submit(self._read_or_run, reader, cmd, timeout)
+            else:
+                fut = self._pool.submit(self._runner, cmd, timeout)
+            self._futures[cmd] = fut
+            return fut
+
+    def _read_or_run(self, reader: Reader, cmd: str, timeout: int) -> str:
+        """Natywny odczyt; komenda shell gdy źródło niedostępne lub nieczytelne."""
+        try:
+            out = reader()
+        except (OSError, ValueError):
+            # ValueError – parser trafił na niespodziewany format tekstu jądra
+            out = None
+        if out is None:
+            return self._runner(cmd, timeout)
+        return out.strip() or "(brak outputu)"
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def active_engine() -> Optional[ProbeEngine]:
+    """Zwraca silnik bieżącego skanu (None poza get_full_diagnostics)."""
+    return _ACTIVE_ENGINE.get()
+
+
+def bind_engine(engine: Optional[ProbeEngine]) -> contextvars.Token:
+    """Ustawia silnik dla bieżącego kontekstu (wątku/zadania)."""
+    return _ACTIVE_ENGINE.set(engine)
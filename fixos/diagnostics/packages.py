@@ -0,0 +1,228 @@
+"""
+PackageIndex – indeks zainstalowanych pakietów (rpm/dpkg).
+
+Zamiast wielokrotnego `rpm -qa | grep ...` (≈1 s na maszynie z 3000+ pakietów)
+indeks jest budowany jednym wywołaniem `rpm -qa --queryformat` lub
+`dpkg-query -W`, trzymany w pamięci procesu i zapisywany na dysku
+(~/.cache/fixos). Cache dyskowy jest unieważniany zmianą mtime bazy
+pakietów (rpmdb / /var/lib/dpkg/status), więc po `dnf install` indeks
+odbudowuje się sam.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import shutil
+import subprocess
+import threading
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Iterable, Literal, Optional
+
+from ..platform_utils import cache_dir
+
+Backend = Literal["rpm", "dpkg"]
+
+RPM_QUERY = "rpm -qa --queryformat '%{NAME}\\t%{VERSION}\\t%{RELEASE}\\t%{ARCH}\\n'"
+DPKG_QUERY = "dpkg-query -W -f '${db:Status-Abbrev}\\t${Package}\\t${Version}\\t${Architecture}\\n'"
+
+RPMDB_DIRS = (Path("/var/lib/rpm"), Path("/usr/lib/sysimage/rpm"))
+DPKG_STATUS = Path("/var/lib/dpkg/status")
+
+_CACHE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Package:
+    name: str
+    version: str
+    release: str = ""
+    arch: str = ""
+
+    @property
+    def nvra(self) -> str:
+        """Pełna nazwa w formacie `rpm -qa` (name-version-release.arch)."""
+        evr = f"{self.version}-{self.release}" if self.release else self.version
+        return f"{self.name}-{evr}.{self.arch}" if self.arch else f"{self.name}-{evr}"
+
+
+class PackageIndex:
+    """Zainstalowane pakiety z wyszukiwaniem po nazwie, prefiksie i regex."""
+
+    def __init__(self, packages: Iterable[Package], backend: Backend, source_mtime: float = 0.0):
+        self.backend = backend
+        self.source_mtime = source_mtime
+        self._packages = sorted(packages, key=lambda p: p.nvra)
+        self._by_name: dict[str, list[Package]] = {}
+        for pkg in self._packages:
+            self._by_name.setdefault(pkg.name, []).append(pkg)
+
+    def __len__(self) -> int:
+        return len(self._packages)
+
+    def __contains__(self, name: str) -> bool:
+        return self.installed(name)
+
+    def installed(self, name: str) -> bool:
+        return name in self._by_name
+
+    def get(self, name: str) -> list[Package]:
+        return list(self._by_name.get(name, []))
+
+    def with_prefix(self, prefix: str) -> list[Package]:
+        return [p for p in self._packages if p.name.startswith(prefix)]
+
+    def search(self, pattern: str, ignore_case: bool = False) -> list[Package]:
+        """Pakiety, których pełna nazwa pasuje do wyrażenia (jak `rpm -qa | grep -E`)."""
+        rx = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        return [p for p in self._packages if rx.search(p.nvra)]
+
+    def names(self) -> list[str]:
+        return [p.nvra for p in self._packages]
+
+    # ── budowanie i cache ────────────────────────────────────
+
+    @classmethod
+    def build(cls, backend: Backend, timeout: int = 60) -> Optional["PackageIndex"]:
+        """Buduje indeks jednym zapytaniem do menedżera pakietów."""
+        mtime = source_mtime(backend)
+        query = RPM_QUERY if backend == "rpm" else DPKG_QUERY
+        try:
+            result = subprocess.run(
+                query, shell=True, capture_output=True, text=True, timeout=timeout
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+        if result.returncode != 0:
+            return None
+        return cls(_parse(result.stdout, backend), backend, mtime)
+
+    @classmethod
+    def load_cached(cls, path: Path, backend: Backend) -> Optional["PackageIndex"]:
+        """Indeks z dysku, o ile pasuje do bieżącego mtime bazy pakietów."""
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if (
+            data.get("version") != _CACHE_VERSION
+            or data.get("backend") != backend
+            or data.get("source_mtime") != source_mtime(backend)
+        ):
+            return None
+        return cls((Package(*row) for row in data["packages"]), backend, data["source_mtime"])
+
+    def save(self, path: Path) -> None:
+        data = {
+            "version": _CACHE_VERSION,
+            "backend": self.backend,
+            "source_mtime": self.source_mtime,
+            "packages": [astuple(p) for p in self._packages],
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            tmp.replace(path)
+        except OSError:
+            pass
+
+
+def _parse(output: str, backend: Backend) -> list[Package]:
+    packages = []
+    for line in output.splitlines():
+        cols = line.split("\t")
+        if backend == "dpkg":
+            # ${db:Status-Abbrev} = "ii " dla zainstalowanych
+            if len(cols) < 4 or not cols[0].startswith("ii"):
+                continue
+            packages.append(Package(cols[1], cols[2], "", cols[3]))
+        elif len(cols) >= 4:
+            packages.append(Package(cols[0], cols[1], cols[2], cols[3]))
+    return packages
+
+
+def detect_backend() -> Optional[Backend]:
+    """rpm lub dpkg – zależnie od bazy pakietów obecnej w systemie."""
+    if shutil.which("rpm") and any(d.is_dir() for d in RPMDB_DIRS):
+        return "rpm"
+    if shutil.which("dpkg-query") and DPKG_STATUS.exists():
+        return "dpkg"
+    return None
+
+
+def source_mtime(backend: Backend) -> float:
+    """Najnowszy mtime plików bazy pakietów (0.0 gdy niedostępne)."""
+    paths: list[Path] = [DPKG_STATUS] if backend == "dpkg" else []
+    if backend == "rpm":
+        for d in RPMDB_DIRS:
+            if d.is_dir():
+                paths.append(d)
+                paths.extend(d.iterdir())
+    mtimes = []
+    for p in paths:
+        try:
+            mtimes.append(p.stat().st_mtime)
+        except OSError:
+            pass
+    return max(mtimes, default=0.0)
+
+
+_INDEX: Optional[PackageIndex] = None
+_LOCK = threading.Lock()
+
+
+def package_index(refresh: bool = False) -> Optional[PackageIndex]:
+    """
+    Indeks pakietów współdzielony w procesie.
+    Kolejność: pamięć → cache dyskowy → zapytanie do rpm/dpkg.
+    None, gdy system nie ma obsługiwanego menedżera pakietów.
+    """
+    global _INDEX
+    backend = detect_backend()
+    if backend is None:
+        return None
+    with _LOCK:
+        mtime = source_mtime(backend)
+        if (
+            not refresh
+            and _INDEX is not None
+            and _INDEX.backend == backend
+            and _INDEX.source_mtime == mtime
+        ):
+            return _INDEX
+        path = cache_dir() / f"packages-{backend}.json"
+        index = None if refresh else PackageIndex.load_cached(path, backend)
+        if index is None:
+            index = PackageIndex.build(backend)
+            if index is None:
+                return None
+            index.save(path)
+        _INDEX = index
+        return index
+
+
+# ═══════════════════════════════════════════════════════════
+#  CZYTNIKI SOND – output w formacie `rpm -qa` / `rpm -q`
+# ═══════════════════════════════════════════════════════════
+
+def rpm_qa_text() -> Optional[str]:
+    """Odpowiednik `rpm -qa` (None → sonda wykona komendę)."""
+    index = package_index()
+    return None if index is None else "\n".join(index.names())
+
+
+def rpm_q_text(*names: str) -> Optional[str]:
+    """Odpowiednik `rpm -q <nazwy>`."""
+    index = package_index()
+    if index is None:
+        return None
+    lines = []
+    for name in names:
+        found = index.get(name)
+        if found:
+            lines.extend(p.nvra for p in found)
+        else:
+            lines.append(f"package {name} is not installed")
+    return "\n".join(lines)
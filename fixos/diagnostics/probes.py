@@ -0,0 +1,424 @@
+"""
+Rejestr sond diagnostycznych.
+
+Każda sonda jest deklarowana jako dane (klucz wyniku, komenda, moduł,
+timeout, platformy, klasa kosztu), a nie jako wywołanie w literale dict.
+Dzięki temu silnik skanu może wybrać tylko potrzebne sondy dla danego
+modułu i platformy, pominąć drogie sondy i zdeduplikować identyczne komendy
+zanim cokolwiek zostanie uruchomione.
+
+Sondy, które różnią się tylko filtrowaniem wspólnej komendy bazowej
+(`rpm -qa | grep ...`, `lsmod | grep ...`, `ss -tlnp | awk ...`), deklarują
+komendę bazową + listę filtrów. Silnik uruchamia komendę bazową raz na skan,
+a każda sonda filtruje jej output w Pythonie.
+
+Sondy czytające tylko pliki jądra lub bazę pakietów mają natywny `reader`
+(fixos.diagnostics.procfs / fixos.diagnostics.packages) – komenda shell
+zostaje jako fallback, gdy źródło jest niedostępne.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from typing import Callable, Literal, Optional
+
+from ..platform_utils import SYSTEM as _SYSTEM
+from . import packages, procfs
+
+ProbeCost = Literal["cheap", "normal", "expensive"]
+
+COST_RANK: dict[str, int] = {"cheap": 0, "normal": 1, "expensive": 2}
+
+LINUX = ("Linux",)
+WINDOWS = ("Windows",)
+MAC = ("Darwin",)
+
+# Outputy runnera, których nie filtrujemy (błąd wykonania, a nie dane)
+_PASSTHROUGH_PREFIXES = ("[TIMEOUT", "[WYJĄTEK", "[POMINIĘTO")
+_EMPTY_OUTPUT = "(brak outputu)"
+
+Filter = Callable[[list[str]], list[str]]
+Reader = Callable[[], Optional[str]]
+
+
+# ═══════════════════════════════════════════════════════════
+#  FILTRY – odpowiedniki grep/head/tail/sort/awk na liniach outputu
+# ═══════════════════════════════════════════════════════════
+
+def grep(pattern: str, *, ignore_case: bool = False, invert: bool = False) -> Filter:
+    """Linie pasujące do wyrażenia (`grep -E`, `-i`, `-v`)."""
+    rx = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    return lambda lines: [ln for ln in lines if bool(rx.search(ln)) != invert]
+
+
+def head(n: int) -> Filter:
+    """Pierwsze n linii (`head -n`)."""
+    return lambda lines: lines[:n]
+
+
+def tail(n: int) -> Filter:
+    """Ostatnie n linii (`tail -n`)."""
+    return lambda lines: lines[-n:] if n else []
+
+
+def skip(n: int) -> Filter:
+    """Pomija pierwsze n linii, np. nagłówek (`awk 'NR>n'`)."""
+    return lambda lines: lines[n:]
+
+
+def sort_lines() -> Filter:
+    """Sortowanie leksykograficzne (`sort`)."""
+    return sorted
+
+
+def fields(*cols: int) -> Filter:
+    """Wybrane kolumny rozdzielone białymi znakami, numerowane od 1 (`awk '{print $1, $4}'`)."""
+    def _pick(lines: list[str]) -> list[str]:
+        out = []
+        for ln in lines:
+            parts = ln.split()
+            out.append(" ".join(parts[c - 1] if c <= len(parts) else "" for c in cols).rstrip())
+        return out
+    return _pick
+
+
+# Wspólne komendy bazowe – uruchamiane raz na skan, filtrowane per sonda
+LSMOD = "lsmod 2>/dev/null"
+RPM_QA = "rpm -qa 2>/dev/null"
+DMESG = "dmesg 2>/dev/null"
+SS_LISTEN = "ss -tlnp 2>/dev/null"
+SS_TCP = "ss -tnp 2>/dev/null"
+
+
+@dataclass(frozen=True)
+class Probe:
+    """Pojedyncza sonda: komenda, której output trafia pod `key` w wyniku modułu."""
+    key: str
+    command: str
+    cost: ProbeCost = "normal"
+    timeout: int = 20
+    module: str = ""
+    platforms: tuple[str, ...] = LINUX
+    filters: tuple[Filter, ...] = ()
+    reader: Optional[Reader] = None
+
+    def within(self, max_cost: Optional[ProbeCost]) -> bool:
+        return max_cost is None or COST_RANK[self.cost] <= COST_RANK[max_cost]
+
+    def refine(self, output: str) -> str:
+        """Nakłada filtry sondy na output komendy bazowej."""
+        if not self.filters or output.startswith(_PASSTHROUGH_PREFIXES):
+            return output
+        lines = [] if output == _EMPTY_OUTPUT else output.splitlines()
+        for f in self.filters:
+            lines = f(lines)
+        return "\n".join(lines).strip() or _EMPTY_OUTPUT
+
+
+def _dmi(field: str) -> Reader:
+    return lambda: procfs.dmi_text(field)
+
+
+def _rpm_q(*names: str) -> Reader:
+    return lambda: packages.rpm_q_text(*names)
+
+
+def _module(name: str, platforms: tuple[str, ...], probes: list[Probe]) -> list[Probe]:
+    return [replace(p, module=name, platforms=platforms) for p in probes]
+
+
+PROBES: list[Probe] = []
+
+# ═══════════════════════════════════════════════════════════
+#  AUDIO – ALSA / PipeWire / PulseAudio / SOF
+# ═══════════════════════════════════════════════════════════
+
+PROBES += _module("audio", LINUX, [
+    # System audio
+    Probe("pipewire_version", "pipewire --version 2>/dev/null | head -1", cost="cheap"),
+    Probe("pipewire_status", "systemctl --user status pipewire.service --no-pager -l 2>/dev/null | head -20"),
+    Probe("pipewire_pulse_status", "systemctl --user status pipewire-pulse.service --no-pager -l 2>/dev/null | head -20"),
+    Probe("wireplumber_status", "systemctl --user status wireplumber.service --no-pager -l 2>/dev/null | head -20"),
+    Probe("pulseaudio_status", "systemctl --user status pulseaudio.service --no-pager 2>/dev/null | head -10"),
+    # ALSA
+    Probe("alsa_cards", "cat /proc/asound/cards 2>/dev/null", cost="cheap", reader=procfs.asound_cards_text),
+    Probe("alsa_devices", "aplay -l 2>/dev/null"),
+    Probe("alsa_capture", "arecord -l 2>/dev/null"),
+    Probe("alsa_mixer_controls", "amixer -c 0 scontents 2>/dev/null | head -40"),
+    # PipeWire objects
+    Probe("pw_dump_audio", "pw-dump 2>/dev/null | python3 -c \"import sys,json; d=json.load(sys.stdin); [print(n.get('info',{}).get('props',{}).get('node.name','?'), '->', n.get('info',{}).get('props',{}).get('object.path','?')) for n in d if n.get('type','') == 'PipeWire:Interface:Node']\" 2>/dev/null | head -30", cost="expensive"),
+    Probe("pactl_info", "pactl info 2>/dev/null"),
+    Probe("pactl_sinks", "pactl list sinks 2>/dev/null | grep -E '(Name|State|Volume|Mute|Description)' | head -30"),
+    Probe("pactl_sources", "pactl list sources 2>/dev/null | grep -E '(Name|State|Volume|Mute|Description)' | head -30"),
+    # Kernel / SOF (Sound Open Firmware) - kluczowy dla Lenovo/Intel
+    Probe("sof_firmware", "ls /lib/firmware/intel/sof* 2>/dev/null | head -10", cost="cheap"),
+    Probe("sof_modules", LSMOD, reader=procfs.lsmod_text, filters=(grep(r"(sof|snd_hda|intel_sst|avs)"),)),
+    Probe("kernel_audio_dmesg", DMESG, filters=(
+        grep(r"(snd|audio|alsa|hda|sof|codec|speaker|mic|hdmi)", ignore_case=True), tail(30),
+    )),
+    Probe("hdaudio_codec", "cat /proc/asound/card*/codec* 2>/dev/null | grep -E '(Codec|Address|Vendor)' | head -20", cost="cheap", reader=procfs.hda_codecs_text),
+    # Lenovo-specific
+    Probe("lenovo_ideapad", LSMOD, reader=procfs.lsmod_text, filters=(grep("ideapad", ignore_case=True),)),
+    Probe("thinkpad_acpi", LSMOD, reader=procfs.lsmod_text, filters=(grep("thinkpad_acpi", ignore_case=True),)),
+    Probe("yoga_udev", "udevadm info /sys/class/sound/card0 2>/dev/null | head -20"),
+    # Mikrofon
+    Probe("mic_privacy_switch", "cat /sys/bus/platform/devices/*/PNP0C14*/wmi_bus/*/mic_mute 2>/dev/null || echo 'N/A'", cost="cheap"),
+    Probe("mic_input_mute", "amixer get Capture 2>/dev/null | tail -3"),
+    # Pakiety audio
+    Probe("audio_packages", RPM_QA, cost="expensive", reader=packages.rpm_qa_text, filters=(
+        grep(r"(alsa|pipewire|pulseaudio|sof-firmware|wireplumber|jack)"), sort_lines(),
+    )),
+    Probe("sof_firmware_pkg", "rpm -q sof-firmware 2>/dev/null", reader=_rpm_q("sof-firmware")),
+    Probe("alsa_firmware_pkg", "rpm -q alsa-firmware alsa-ucm-utils 2>/dev/null", reader=_rpm_q("alsa-firmware", "alsa-ucm-utils")),
+])
+
+
+# ═══════════════════════════════════════════════════════════
+#  THUMBNAILS – podglądy plików w menedżerach
+# ═══════════════════════════════════════════════════════════
+
+PROBES += _module("thumbnails", LINUX, [
+    # Desktop Environment / File manager
+    Probe("desktop_env", "echo $XDG_CURRENT_DESKTOP 2>/dev/null || echo 'nieznane'", cost="cheap"),
+    Probe("file_manager", "ps aux 2>/dev/null | grep -E '(nautilus|thunar|dolphin|nemo|pcmanfm|caja)' | grep -v grep | awk '{print $11}' | head -3"),
+    Probe("nautilus_version", "nautilus --version 2>/dev/null", cost="cheap"),
+    Probe("thunar_version", "thunar --version 2>/dev/null | head -1", cost="cheap"),
+    Probe("dolphin_version", "dolphin --version 2>/dev/null | head -1", cost="cheap"),
+    # Thumbnailer binaries
+    Probe("thumbnailers_installed", "ls /usr/bin/*thumb* /usr/lib/*thumb* /usr/lib64/*thumb* 2>/dev/null", cost="cheap"),
+    Probe("gdk_pixbuf_loaders", "gdk-pixbuf-query-loaders 2>/dev/null | grep -c 'loader' || echo '0'"),
+    Probe("thumbnailer_configs", "ls /usr/share/thumbnailers/ 2>/dev/null", cost="cheap"),
+    Probe("local_thumbnailers", "ls ~/.local/share/thumbnailers/ 2>/dev/null", cost="cheap"),
+    # Cache stanu
+    Probe("thumbnail_cache_size", "du -sh ~/.cache/thumbnails/ 2>/dev/null || echo 'brak cache'"),
+    Probe("thumbnail_cache_count", "find ~/.cache/thumbnails/ -name '*.png' 2>/dev/null | wc -l"),
+    Probe("thumbnail_cache_perms", "ls -la ~/.cache/ 2>/dev/null | grep thumb", cost="cheap"),
+    Probe("thumbnail_fail_files", "find ~/.cache/thumbnails/fail/ -name '*.png' 2>/dev/null | wc -l"),
+    # GStreamer (podglądy wideo)
+    Probe("gst_plugins", "gst-inspect-1.0 2>/dev/null | grep -cE '(video|thumbnailer)' || echo '0 (gstreamer brak)'", cost="expensive"),
+    Probe("gst_bad_good", RPM_QA, cost="expensive", reader=packages.rpm_qa_text, filters=(
+        grep("gstreamer1-plugins", ignore_case=True), sort_lines(),
+    )),
+    # Pakiety thumbnailerów
+    Probe("thumbnailer_packages", RPM_QA, cost="expensive", reader=packages.rpm_qa_text, filters=(
+        grep(
+            r"(thumbnailer|ffmpegthumbnailer|totem-nautilus|evince-thumbnailer|raw-thumbnailer|gnome-epub-thumbnailer)",
+            ignore_case=True,
+        ),
+        sort_lines(),
+    )),
+    Probe("ffmpegthumbnailer", "ffmpegthumbnailer --version 2>/dev/null || echo 'ffmpegthumbnailer nie zainstalowany'", cost="cheap"),
+    Probe("totem_thumb", "which totem-video-thumbnailer 2>/dev/null || echo 'totem-video-thumbnailer nie znaleziony'", cost="cheap"),
+    # GNOME/GTK ustawienia
+    Probe("gsettings_thumbnails", "gsettings get org.gnome.nautilus.preferences show-image-thumbnails 2>/dev/null; gsettings get org.gnome.nautilus.preferences thumbnail-limit 2>/dev/null"),
+    Probe("gsettings_show_previews", "gsettings get org.gnome.nautilus.icon-view default-zoom-level 2>/dev/null"),
+    # Problemy z uprawnieniami
+    Probe("xdg_cache_dir", "echo $XDG_CACHE_HOME 2>/dev/null || echo '~/.cache (domyślnie)'", cost="cheap"),
+])
+
+
+# ═══════════════════════════════════════════════════════════
+#  HARDWARE – laptop/desktop hardware diagnostics
+# ═══════════════════════════════════════════════════════════
+
+PROBES += _module("hardware", LINUX, [
+    # Identyfikacja
+    Probe("dmi_product", "cat /sys/class/dmi/id/product_name 2>/dev/null", cost="cheap", reader=_dmi("product_name")),
+    Probe("dmi_vendor", "cat /sys/class/dmi/id/sys_vendor 2>/dev/null", cost="cheap", reader=_dmi("sys_vendor")),
+    Probe("dmi_board", "cat /sys/class/dmi/id/board_name 2>/dev/null", cost="cheap", reader=_dmi("board_name")),
+    Probe("bios_version", "cat /sys/class/dmi/id/bios_version 2>/dev/null", cost="cheap", reader=_dmi("bios_version")),
+    Probe("bios_date", "cat /sys/class/dmi/id/bios_date 2>/dev/null", cost="cheap", reader=_dmi("bios_date")),
+    Probe("cpu_model", "grep 'model name' /proc/cpuinfo | head -1 | cut -d: -f2 | xargs", cost="cheap", reader=procfs.cpu_model_text),
+    # Grafika
+    Probe("gpu_info", "lspci -nn 2>/dev/null | grep -iE '(vga|3d|display)'"),
+    Probe("drm_drivers", "ls /sys/class/drm/ 2>/dev/null", cost="cheap"),
+    Probe("wayland_display", "echo $WAYLAND_DISPLAY $XDG_SESSION_TYPE 2>/dev/null", cost="cheap"),
+    # Touchpad / Input
+    Probe("input_devices", "cat /proc/bus/input/devices 2>/dev/null | grep -E '(Name|Handlers)' | head -20", cost="cheap", reader=procfs.input_devices_text),
+    Probe("touchpad_driver", LSMOD, reader=procfs.lsmod_text, filters=(grep(r"(i2c_hid|hid_multitouch|psmouse|libinput)"),)),
+    # Kamera
+    Probe("camera_devices", "ls /dev/video* 2>/dev/null", cost="cheap"),
+    Probe("camera_v4l", "v4l2-ctl --list-devices 2>/dev/null | head -10"),
+    # ACPI / Power
+    Probe("acpi_events", "acpi -a -b -t 2>/dev/null"),
+    Probe("battery_status", "upower -i $(upower -e | grep battery) 2>/dev/null | grep -E '(state|percentage|time|energy)'"),
+    Probe("power_profile", "powerprofilesctl get 2>/dev/null || echo 'power-profiles-daemon niedostępny'"),
+    Probe("tlp_status", "tlp-stat -s 2>/dev/null | head -5 || echo 'TLP nie zainstalowany'"),
+    # Czujniki temperatury
+    Probe("sensors", "sensors 2>/dev/null || echo 'lm_sensors niedostępny (dnf install lm_sensors)'"),
+])
+
+
+# ═══════════════════════════════════════════════════════════
+#  SYSTEM – wersja OS, aktualizacje, usługi
+# ═══════════════════════════════════════════════════════════
+
+PROBES += _module("system", LINUX, [
+    Probe("os_release", "cat /etc/os-release | grep -E '^(NAME|VERSION|ID)='", cost="cheap", reader=procfs.os_release_text),
+    Probe("kernel", "uname -r", cost="cheap", reader=procfs.kernel_release_text),
+    Probe("uptime", "uptime -p", cost="cheap", reader=procfs.uptime_text),
+])
+
+PROBES += _module("system", WINDOWS, [
+    Probe("os_release", 'powershell -Command "(Get-WmiObject Win32_OperatingSystem).Caption"', cost="cheap"),
+    Probe("kernel", 'powershell -Command "(Get-WmiObject Win32_OperatingSystem).Version"', cost="cheap"),
+    Probe("uptime", 'powershell -Command "((Get-Date)-(gcim Win32_OperatingSystem).LastBootUpTime).ToString()"', cost="cheap"),
+])
+
+PROBES += _module("system", MAC, [
+    Probe("os_release", "sw_vers 2>/dev/null", cost="cheap"),
+    Probe("kernel", "uname -r", cost="cheap"),
+    Probe("uptime", "uptime 2>/dev/null", cost="cheap"),
+])
+
+PROBES += _module("system", LINUX, [
+    Probe("updates_pending", "dnf check-update -q 2>/dev/null | grep -c '^[A-Za-z]' || apt list --upgradable 2>/dev/null | grep -c upgradable || echo '0'", cost="expensive"),
+    Probe("pkg_history", "dnf history list --last=5 2>/dev/null || true", cost="expensive"),
+    Probe("systemctl_failed", "systemctl --failed --no-legend 2>/dev/null"),
+    Probe("journal_errors_24h", "journalctl -p err -n 20 --no-pager --since '24 hours ago' 2>/dev/null", cost="expensive"),
+    Probe("dmesg_errors", "dmesg --level=err,crit,emerg --notime 2>/dev/null", filters=(tail(15),)),
+    Probe("selinux", "getenforce 2>/dev/null || echo 'N/A'", cost="cheap"),
+    Probe("firewall", "firewall-cmd --state 2>/dev/null || echo 'N/A'"),
+])
+
+PROBES += _module("system", WINDOWS, [
+    Probe("updates_pending", 'powershell -Command "(New-Object -ComObject Microsoft.Update.Session).CreateUpdateSearcher().Search("IsInstalled=0").Updates.Count" 2>nul || echo "N/A"', cost="expensive"),
+    Probe("services_failed", 'powershell -Command "Get-Service | Where-Object{$_.Status -eq "Stopped" -and $_.StartType -eq "Automatic"} | Select-Object Name | Format-List"'),
+    Probe("event_errors", 'powershell -Command "Get-EventLog -LogName System -EntryType Error -Newest 10 2>$null | Select-Object TimeGenerated,Source,Message | Format-List"'),
+    Probe("firewall", "netsh advfirewall show allprofiles state 2>nul"),
+])
+
+PROBES += _module("system", MAC, [
+    Probe("updates_pending", "softwareupdate -l 2>/dev/null | grep -c '\\*' || echo '0'", cost="expensive"),
+    Probe("launchd_failed", "launchctl list 2>/dev/null | grep -v '^-' | awk '$1 != 0 {print}' | head -10"),
+    Probe("firewall", "defaults read /Library/Preferences/com.apple.alf globalstate 2>/dev/null", cost="cheap"),
+])
+
+
+# ═══════════════════════════════════════════════════════════
+#  SECURITY – bezpieczeństwo sieci i systemu
+# ═══════════════════════════════════════════════════════════
+
+PROBES += _module("security", LINUX, [
+    # Firewall
+    Probe("firewall_state", "firewall-cmd --state 2>/dev/null || ufw status 2>/dev/null || iptables -L -n --line-numbers 2>/dev/null | head -20 || echo 'N/A'"),
+    Probe("firewall_zones", "firewall-cmd --list-all 2>/dev/null | head -20 || ufw status verbose 2>/dev/null | head -20 || echo 'N/A'"),
+    # Otwarte porty i połączenia
+    Probe("open_ports", SS_LISTEN, filters=(head(30),)),
+    Probe("active_connections", SS_TCP, filters=(grep("ESTAB"), head(20))),
+    Probe("listening_services", SS_LISTEN, filters=(skip(1), fields(1, 4, 6), head(20))),
+    # SELinux / AppArmor
+    Probe("selinux_status", "getenforce 2>/dev/null || sestatus 2>/dev/null | head -5 || echo 'N/A'", cost="cheap"),
+    Probe("apparmor_status", "aa-status 2>/dev/null | head -10 || apparmor_status 2>/dev/null | head -10 || echo 'N/A'"),
+    Probe("selinux_denials", "ausearch -m avc -ts recent 2>/dev/null | tail -10 || journalctl -t audit --no-pager -n 10 2>/dev/null | grep 'denied' | tail -10 || echo 'N/A'", cost="expensive"),
+    # SSH
+    Probe("ssh_config", "grep -E '^(PermitRootLogin|PasswordAuthentication|PubkeyAuthentication|Port|AllowUsers)' /etc/ssh/sshd_config 2>/dev/null || echo 'N/A'"),
+    Probe("ssh_service", "systemctl is-active sshd 2>/dev/null || systemctl is-active ssh 2>/dev/null || echo 'N/A'"),
+    Probe("ssh_authorized_keys", "find /home -name 'authorized_keys' 2>/dev/null | head -5 || echo 'N/A'", cost="expensive"),
+    # Aktualizacje bezpieczeństwa
+    Probe("security_updates", "dnf updateinfo list security 2>/dev/null | wc -l || apt list --upgradable 2>/dev/null | grep -i security | wc -l || echo '0'", cost="expensive"),
+    Probe("last_security_update", "dnf history list 2>/dev/null | grep -i security | head -3 || grep 'security' /var/log/dpkg.log 2>/dev/null | tail -3 || echo 'N/A'", cost="expensive"),
+    # Użytkownicy i uprawnienia
+    Probe("sudo_users", "getent group sudo wheel 2>/dev/null | head -5"),
+    Probe("users_with_shell", "awk -F: '$7 !~ /nologin|false/ {print $1, $7}' /etc/passwd 2>/dev/null | head -10"),
+    Probe("suid_files", "find /usr/bin /usr/sbin /bin /sbin -perm -4000 2>/dev/null | head -15", cost="expensive"),
+    Probe("world_writable", "find /tmp /var/tmp -world-writable -not -sticky 2>/dev/null | head -10 || echo 'N/A'", cost="expensive"),
+    # Sieć
+    Probe("network_interfaces", "ip addr show 2>/dev/null | grep -E '(^[0-9]+:|inet )' | head -20"),
+    Probe("routing_table", "ip route 2>/dev/null | head -10"),
+    Probe("dns_config", "cat /etc/resolv.conf 2>/dev/null | grep -v '^#' | head -5", cost="cheap"),
+    Probe("hosts_file", "cat /etc/hosts 2>/dev/null | grep -v '^#' | grep -v '^$' | head -10", cost="cheap"),
+    # Procesy sieciowe
+    Probe("network_processes", SS_LISTEN, filters=(
+        grep(r"127\.0\.0\.1|::1", invert=True), skip(1), fields(4, 6), head(15),
+    )),
+    Probe("suspicious_connections", SS_TCP, filters=(
+        grep(r"127\.0\.0\.1|::1|LISTEN", invert=True), grep("ESTAB"), head(10),
+    )),
+    # Fail2ban / intrusion detection
+    Probe("fail2ban", "fail2ban-client status 2>/dev/null | head -5 || echo 'fail2ban nie zainstalowany'"),
+    Probe("auth_failures", "journalctl -u sshd --no-pager -n 20 2>/dev/null", cost="expensive", filters=(
+        grep("failed|invalid", ignore_case=True), tail(10),
+    )),
+])
+
+PROBES += _module("security", WINDOWS, [
+    Probe("firewall_state", "netsh advfirewall show allprofiles state 2>nul"),
+    Probe("open_ports", "netstat -an 2>nul | findstr LISTENING | head -20"),
+    Probe("windows_defender", 'powershell -Command "Get-MpComputerStatus | Select-Object AntivirusEnabled,RealTimeProtectionEnabled" 2>nul'),
+    Probe("security_updates", "powershell -Command \"(New-Object -ComObject Microsoft.Update.Session).CreateUpdateSearcher().Search(\"IsInstalled=0 and Type='Software' and IsHidden=0\").Updates | Where-Object {$_.AutoSelectOnWebSites} | Measure-Object | Select-Object Count\" 2>nul", cost="expensive"),
+])
+
+PROBES += _module("security", MAC, [
+    Probe("firewall_state", "defaults read /Library/Preferences/com.apple.alf globalstate 2>/dev/null", cost="cheap"),
+    Probe("open_ports", "netstat -an 2>/dev/null | grep LISTEN | head -20"),
+    Probe("gatekeeper", "spctl --status 2>/dev/null", cost="cheap"),
+    Probe("sip_status", "csrutil status 2>/dev/null", cost="cheap"),
+])
+
+
+# ═══════════════════════════════════════════════════════════
+#  RESOURCES – zasoby systemowe i procesy
+# ═══════════════════════════════════════════════════════════
+
+PROBES += _module("resources", LINUX, [
+    # Dysk – co zajmuje miejsce
+    Probe("disk_usage_top", "du -sh /var/log /var/cache /tmp /home 2>/dev/null | sort -h", cost="expensive"),
+    Probe("disk_usage_home", "du -sh /home/*/ 2>/dev/null | sort -h | tail -10", cost="expensive"),
+    Probe("large_files", "find / -xdev -size +100M -not -path '*/proc/*' -not -path '*/sys/*' 2>/dev/null | head -15", cost="expensive"),
+    Probe("log_sizes", "du -sh /var/log/* 2>/dev/null | sort -h | tail -10", cost="expensive"),
+    Probe("journal_size", "journalctl --disk-usage 2>/dev/null"),
+    Probe("old_kernels", "rpm -q kernel 2>/dev/null | sort -V | head -5 || dpkg -l 'linux-image-*' 2>/dev/null | grep '^ii' | head -5"),
+    Probe("package_cache", "du -sh /var/cache/dnf 2>/dev/null || du -sh /var/cache/apt 2>/dev/null || echo 'N/A'", cost="expensive"),
+    # Autostart – usługi startujące z systemem
+    Probe("autostart_services", "systemctl list-unit-files --type=service --state=enabled --no-legend 2>/dev/null | head -30"),
+    Probe("autostart_user", "systemctl --user list-unit-files --state=enabled --no-legend 2>/dev/null | head -20"),
+    Probe("startup_time", "systemd-analyze 2>/dev/null | head -3"),
+    Probe("slowest_services", "systemd-analyze blame 2>/dev/null | head -15"),
+    # Pamięć – szczegóły
+    Probe("memory_details", "free -h 2>/dev/null"),
+    Probe("oom_events", "journalctl -k --no-pager -n 20 2>/dev/null", cost="expensive", filters=(
+        grep("oom|killed process|out of memory", ignore_case=True), tail(10),
+    )),
+    Probe("swap_usage", "swapon --show 2>/dev/null || echo 'Brak swap'"),
+    # Zasoby sieciowe
+    Probe("network_usage", "cat /proc/net/dev 2>/dev/null | awk 'NR>2 {print $1, \"RX:\", $2, \"TX:\", $10}' | head -10", cost="cheap", reader=procfs.net_dev_text),
+])
+
+PROBES += _module("resources", WINDOWS, [
+    Probe("disk_usage", 'powershell -Command "Get-PSDrive -PSProvider FileSystem | Select-Object Name,Used,Free | Format-Table" 2>nul'),
+    Probe("autostart", 'powershell -Command "Get-CimInstance Win32_StartupCommand | Select-Object Name,Command,Location | Format-List" 2>nul'),
+    Probe("large_files", 'powershell -Command "Get-ChildItem C:\\ -Recurse -ErrorAction SilentlyContinue | Where-Object {$_.Length -gt 100MB} | Select-Object FullName,Length | Sort-Object Length -Descending | Select-Object -First 10" 2>nul', cost="expensive"),
+])
+
+PROBES += _module("resources", MAC, [
+    Probe("disk_usage_top", "du -sh /Library /Applications ~/Library 2>/dev/null | sort -h", cost="expensive"),
+    Probe("large_files", "find / -xdev -size +100M 2>/dev/null | head -15", cost="expensive"),
+    Probe("autostart", "launchctl list 2>/dev/null | head -20"),
+    Probe("startup_time", "system_profiler SPStartupItemDataType 2>/dev/null | head -20", cost="expensive"),
+])
+
+
+def select_probes(
+    modules: Optional[list[str]] = None,
+    platform: str = _SYSTEM,
+    max_cost: Optional[ProbeCost] = None,
+) -> list[Probe]:
+    """
+    Wybiera sondy dla modułów i platformy, z limitem klasy kosztu.
+    Kolejność deklaracji jest zachowana; powtórzony (moduł, klucz) występuje raz.
+    """
+    selected: list[Probe] = []
+    seen: set[tuple[str, str]] = set()
+    for probe in PROBES:
+        if modules is not None and probe.module not in modules:
+            continue
+        if platform not in probe.platforms or not probe.within(max_cost):
+            continue
+        ident = (probe.module, probe.key)
+        if ident in seen:
+            continue
+        seen.add(ident)
+        selected.append(probe)
+    return selected
@@ -0,0 +1,247 @@
+"""
+Natywne odczyty /proc i /sys.
+
+Sondy, które tylko czytają pliki jądra (`cat /proc/asound/cards`,
+`grep 'model name' /proc/cpuinfo`, `lsmod | grep ...`), nie muszą uruchamiać
+`/bin/sh` i 2–3 narzędzi. Ten moduł czyta i parsuje te pliki bezpośrednio,
+zwracając dane strukturalne, oraz renderuje je do tekstu w formacie dawnych
+komend – dzięki temu klucze wyników modułów diagnostyki pozostają bez zmian.
+
+Czytniki tekstowe (`*_text`) zwracają None, gdy źródło jest niedostępne –
+silnik sond wykonuje wtedy zwykłą komendę shell jako fallback.
+"""
+
+from __future__ import annotations
+
+import glob
+import re
+from pathlib import Path
+from typing import Optional
+
+PROC = Path("/proc")
+SYS = Path("/sys")
+ETC = Path("/etc")
+
+
+def read_text(path: Path | str) -> Optional[str]:
+    """Zawartość pliku (bez końcowych białych znaków) lub None, gdy nieczytelny."""
+    try:
+        return Path(path).read_text(encoding="utf-8", errors="replace").rstrip()
+    except OSError:
+        return None
+
+
+# ═══════════════════════════════════════════════════════════
+#  PARSERY – dane strukturalne
+# ═══════════════════════════════════════════════════════════
+
+def loaded_modules() -> Optional[list[dict]]:
+    """Moduły jądra z /proc/modules: name, size, refcount, used_by, state."""
+    text = read_text(PROC / "modules")
+    if text is None:
+        return None
+    modules = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        deps = parts[3] if len(parts) > 3 else "-"
+        modules.append({
+            "name": parts[0],
+            "size": int(parts[1]),
+            "refcount": parts[2],
+            "used_by": [] if deps == "-" else [d for d in deps.split(",") if d],
+            "state": parts[4] if len(parts) > 4 else "",
+        })
+    return modules
+
+
+def cpu_info() -> dict[str, str]:
+    """Pierwszy blok /proc/cpuinfo jako słownik (klucz → wartość)."""
+    info: dict[str, str] = {}
+    for line in (read_text(PROC / "cpuinfo") or "").splitlines():
+        if not line.strip():
+            if info:
+                break
+            continue
+        key, _, value = line.partition(":")
+        info.setdefault(key.strip(), value.strip())
+    return info
+
+
+def net_dev() -> dict[str, dict[str, int]]:
+    """Liczniki interfejsów z /proc/net/dev: {iface: {rx_bytes, rx_packets, tx_bytes, tx_packets}}."""
+    stats: dict[str, dict[str, int]] = {}
+    for line in (read_text(PROC / "net" / "dev") or "").splitlines()[2:]:
+        iface, _, counters = line.partition(":")
+        values = counters.split()
+        if len(values) < 10:
+            continue
+        stats[iface.strip()] = {
+            "rx_bytes": int(values[0]),
+            "rx_packets": int(values[1]),
+            "tx_bytes": int(values[8]),
+            "tx_packets": int(values[9]),
+        }
+    return stats
+
+
+def input_devices() -> list[dict[str, str]]:
+    """Urządzenia wejścia z /proc/bus/input/devices (pola N/P/S/H/…)."""
+    devices: list[dict[str, str]] = []
+    current: dict[str, str] = {}
+    for line in (read_text(PROC / "bus" / "input" / "devices") or "").splitlines():
+        if not line.strip():
+            if current:
+                devices.append(current)
+            current = {}
+            continue
+        tag, _, rest = line.partition(": ")
+        if tag == "N":
+            current["name"] = rest.removeprefix("Name=").strip('"')
+        elif tag == "H":
+            current["handlers"] = rest.removeprefix("Handlers=").strip()
+        elif tag == "P":
+            current["phys"] = rest.removeprefix("Phys=")
+        elif tag == "S":
+            current["sysfs"] = rest.removeprefix("Sysfs=")
+    if current:
+        devices.append(current)
+    return devices
+
+
+def dmi_info() -> dict[str, str]:
+    """Identyfikacja sprzętu z /sys/class/dmi/id (puste pola pominięte)."""
+    info = {}
+    for field in ("product_name", "sys_vendor", "board_name", "bios_version", "bios_date"):
+        value = read_text(SYS / "class" / "dmi" / "id" / field)
+        if value:
+            info[field] = value
+    return info
+
+
+def mounts() -> list[dict[str, str]]:
+    """Punkty montowania z /proc/self/mounts: device, mountpoint, fstype, options."""
+    entries = []
+    for line in (read_text(PROC / "self" / "mounts") or "").splitlines():
+        parts = line.split()
+        if len(parts) < 4:
+            continue
+        device, mountpoint, fstype, options = (_unescape_mount(p) for p in parts[:4])
+        entries.append({
+            "device": device, "mountpoint": mountpoint, "fstype": fstype, "options": options,
+        })
+    return entries
+
+
+def _unescape_mount(field: str) -> str:
+    # Jądro koduje spacje/tabulatory w ścieżkach jako \040, \011 itd.
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+
+def uptime_seconds() -> Optional[float]:
+    """Czas od startu systemu z /proc/uptime."""
+    text = read_text(PROC / "uptime")
+    try:
+        return float(text.split()[0]) if text else None
+    except ValueError:
+        return None
+
+
+def os_release() -> dict[str, str]:
+    """Pary KLUCZ=wartość z /etc/os-release (wartości bez cudzysłowów)."""
+    info = {}
+    for line in (read_text(ETC / "os-release") or "").splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            info[key.strip()] = value.strip().strip('"')
+    return info
+
+
+# ═══════════════════════════════════════════════════════════
+#  RENDERERY – tekst w formacie dawnych komend shell
+# ═══════════════════════════════════════════════════════════
+
+def lsmod_text() -> Optional[str]:
+    """Odpowiednik `lsmod`."""
+    modules = loaded_modules()
+    if modules is None:
+        return None
+    lines = ["Module                  Size  Used by"]
+    for m in modules:
+        used = " ".join(filter(None, [m["refcount"], ",".join(m["used_by"])]))
+        lines.append(f"{m['name']:<19} {m['size']:>8}  {used}")
+    return "\n".join(lines)
+
+
+def cpu_model_text() -> str:
+    """Odpowiednik `grep 'model name' /proc/cpuinfo | head -1 | cut -d: -f2 | xargs`."""
+    return cpu_info().get("model name", "")
+
+
+def net_dev_text(limit: int = 10) -> str:
+    """Odpowiednik `awk 'NR>2 {print $1, "RX:", $2, "TX:", $10}' /proc/net/dev | head`."""
+    return "\n".join(
+        f"{iface}: RX: {s['rx_bytes']} TX: {s['tx_bytes']}"
+        for iface, s in list(net_dev().items())[:limit]
+    )
+
+
+def input_devices_text(limit: int = 20) -> str:
+    """Odpowiednik `grep -E '(Name|Handlers)' /proc/bus/input/devices | head`."""
+    lines = []
+    for dev in input_devices():
+        if "name" in dev:
+            lines.append(f'N: Name="{dev["name"]}"')
+        if "handlers" in dev:
+            lines.append(f"H: Handlers={dev['handlers']}")
+    return "\n".join(lines[:limit])
+
+
+def dmi_text(field: str) -> str:
+    """Odpowiednik `cat /sys/class/dmi/id/<field>`."""
+    return read_text(SYS / "class" / "dmi" / "id" / field) or ""
+
+
+def asound_cards_text() -> str:
+    """Odpowiednik `cat /proc/asound/cards`."""
+    return read_text(PROC / "asound" / "cards") or ""
+
+
+def hda_codecs_text(limit: int = 20) -> str:
+    """Odpowiednik `cat /proc/asound/card*/codec* | grep -E '(Codec|Address|Vendor)' | head`."""
+    lines = []
+    for path in sorted(glob.glob(str(PROC / "asound" / "card*" / "codec*"))):
+        text = read_text(path) or ""
+        lines.extend(ln for ln in text.splitlines() if re.search(r"(Codec|Address|Vendor)", ln))
+    return "\n".join(lines[:limit])
+
+
+def kernel_release_text() -> Optional[str]:
+    """Odpowiednik `uname -r`."""
+    return read_text(PROC / "sys" / "kernel" / "osrelease")
+
+
+def uptime_text() -> Optional[str]:
+    """Odpowiednik `uptime -p` (procps: up 1 week, 2 days, 3 hours, 4 minutes)."""
+    seconds = uptime_seconds()
+    if seconds is None:
+        return None
+    minutes = int(seconds) // 60
+    weeks, minutes = divmod(minutes, 7 * 24 * 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    parts = [
+        f"{n} {unit}{'s' if n != 1 else ''}"
+        for n, unit in ((weeks, "week"), (days, "day"), (hours, "hour"), (minutes, "minute"))
+        if n
+    ]
+    return "up " + (", ".join(parts) if parts else "0 minutes")
+
+
+def os_release_text() -> Optional[str]:
+    """Odpowiednik `grep -E '^(NAME|VERSION|ID)=' /etc/os-release`."""
+    text = read_text(ETC / "os-release")
+    if text is None:
+        return None
+    return "\n".join(ln for ln in text.splitlines() if re.match(r"^(NAME|VERSION|ID)=", ln))
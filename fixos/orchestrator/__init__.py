@@ -1,9 +1,13 @@
 from .graph import Problem, ProblemGraph
 from .executor import CommandExecutor, ExecutionResult, DangerousCommandError, CommandTimeoutError
-from .orchestrator import FixOrchestrator
+from .locks import AsyncResourceLocks, ResourceLocks
+from .verdicts import LocalVerdict, VerdictEngine, VerdictRule
+from .orchestrator import FixEvent, FixOrchestrator
 
 __all__ = [
     "Problem", "ProblemGraph",
     "CommandExecutor", "ExecutionResult", "DangerousCommandError", "CommandTimeoutError",
-    "FixOrchestrator",
+    "AsyncResourceLocks", "ResourceLocks",
+    "LocalVerdict", "VerdictEngine", "VerdictRule",
+    "FixEvent", "FixOrchestrator",
 ]
@@ -0,0 +1,135 @@
+"""
+Batching – zbieranie wyników kilku napraw w jedno wywołanie LLM.
+
+Przy równoległej naprawie problemy kończą się blisko siebie w czasie.
+Zamiast osobnej rundy do LLM dla każdego wyniku, pierwszy zgłoszony wynik
+otwiera okno (`window` sekund), a kolejne dołączają do tej samej paczki –
+do `max_size` elementów. Paczka jest oceniana jednym wywołaniem, a wyniki
+wracają do zgłaszających w tej samej kolejności.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class _Slot(Generic[T]):
+    item: T
+    taken: bool = False
+    result: Any = None
+    error: Optional[BaseException] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class EvaluationBatcher(Generic[T, R]):
+    """
+    Paczkowanie dla wątków: `submit()` blokuje do czasu oceny paczki.
+    `evaluate(items)` musi zwrócić listę wyników tej samej długości.
+    Wywołanie `batcher(*item)` to skrót dla `submit(item)`.
+    """
+
+    def __init__(self, evaluate: Callable[[list[T]], list[R]], max_size: int = 8, window: float = 0.5):
+        self.evaluate = evaluate
+        self.max_size = max_size
+        self.window = window
+        self._pending: list[_Slot[T]] = []
+        self._cond = threading.Condition()
+
+    def __call__(self, *item) -> R:
+        return self.submit(item)
+
+    def submit(self, item: T) -> R:
+        slot = _Slot(item)
+        batch: list[_Slot[T]] = []
+        with self._cond:
+            self._pending.append(slot)
+            leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_size:
+                batch = self._take()
+            elif leader:
+                # Pierwszy w paczce czeka na kolejne wyniki albo koniec okna
+                self._cond.wait_for(lambda: slot.taken, timeout=self.window)
+                if not slot.taken:
+                    batch = self._take()
+        if batch:
+            self._run(batch)
+        slot.done.wait()
+        if slot.error is not None:
+            raise slot.error
+        return slot.result
+
+    def _take(self) -> list[_Slot[T]]:
+        batch, self._pending = self._pending, []
+        for s in batch:
+            s.taken = True
+        self._cond.notify_all()
+        return batch
+
+    def _run(self, batch: list[_Slot[T]]) -> None:
+        try:
+            results = self.evaluate([s.item for s in batch])
+            for s, result in zip(batch, results):
+                s.result = result
+        except BaseException as e:  # wyjątek trafia do każdego zgłaszającego
+            for s in batch:
+                s.error = e
+        finally:
+            for s in batch:
+                s.done.set()
+
+
+class AsyncEvaluationBatcher(Generic[T, R]):
+    """Odpowiednik EvaluationBatcher dla korutyn w jednej pętli asyncio."""
+
+    def __init__(
+        self,
+        evaluate: Callable[[list[T]], Awaitable[list[R]]],
+        max_size: int = 8,
+        window: float = 0.5,
+    ):
+        self.evaluate = evaluate
+        self.max_size = max_size
+        self.window = window
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._full: Optional[asyncio.Event] = None
+
+    async def __call__(self, *item) -> R:
+        return await self.submit(item)
+
+    async def submit(self, item: T) -> R:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            await self._flush()
+        elif len(self._pending) == 1:
+            full = self._full = asyncio.Event()
+            try:
+                await asyncio.wait_for(full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            if not future.done() and any(f is future for _, f in self._pending):
+                await self._flush()
+        return await future
+
+    async def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if self._full is not None:
+            self._full.set()
+            self._full = None
+        try:
+            results = await self.evaluate([item for item, _ in batch])
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
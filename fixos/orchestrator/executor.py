@@ -12,6 +12,9 @@ import subprocess
 from dataclasses import dataclass, field
 from typing import Optional
 
+from ..diagnostics.packages import package_index
+from ..providers.prompt import condense
+
 
 class DangerousCommandError(Exception):
     def __init__(self, command: str, reason: str = ""):
@@ -46,8 +49,8 @@ class ExecutionResult:
         return {
             "command": self.command,
             "returncode": self.returncode,
-            "stdout": self.stdout[:2000],
-            "stderr": self.stderr[:1000],
+            "stdout": condense(self.stdout, 500),
+            "stderr": condense(self.stderr, 250),
             "success": self.success,
             "executed": self.executed,
         }
@@ -146,16 +149,22 @@ class CommandExecutor:
                     pass
         return None
 
-    def execute_sync(
-        self,
-        command: str,
-        timeout: Optional[int] = None,
-        add_sudo: bool = True,
-        check_idempotent: bool = True,
-    ) -> ExecutionResult:
-        """Synchroniczne wykonanie komendy."""
-        timeout = timeout or self.default_timeout
+    def _state_satisfied(self, check_cmd: str) -> bool:
+        """Wykonuje komendę sprawdzającą; `rpm -q` rozstrzyga z indeksu pakietów."""
+        m = re.match(r"^rpm -q (.+) &>/dev/null$", check_cmd)
+        if m:
+            names = [t for t in m.group(1).split() if not t.startswith("-")]
+            index = package_index()
+            if index is not None and names:
+                return all(index.installed(n) for n in names)
+        try:
+            result = subprocess.run(check_cmd, shell=True, capture_output=True, timeout=5)
+            return result.returncode == 0
+        except Exception:
+            return False
 
+    def _prepare(self, command: str, add_sudo: bool) -> str:
+        """Walidacja, sudo i tryb nieinteraktywny – wspólne dla obu ścieżek."""
         # Sprawdź niebezpieczne wzorce
         dangerous, reason = self.is_dangerous(command)
         if dangerous:
@@ -166,25 +175,20 @@ class CommandExecutor:
             command = self.add_sudo(command)
 
         # Wymuś tryb nieinteraktywny dla menedżerów pakietów
-        command = self._make_noninteractive(command)
+        return self._make_noninteractive(command)
 
+    def _short_circuit(self, command: str, check_idempotent: bool) -> Optional[ExecutionResult]:
+        """Wynik bez uruchamiania komendy: stan już osiągnięty albo dry-run."""
         # Sprawdź idempotentność
         if check_idempotent:
             check_cmd = self.check_idempotent(command)
-            if check_cmd:
-                try:
-                    result = subprocess.run(
-                        check_cmd, shell=True, capture_output=True, timeout=5
-                    )
-                    if result.returncode == 0:
-                        return ExecutionResult(
-                            command=command,
-                            returncode=0,
-                            stdout="(już wykonane – stan aktualny)",
-                            executed=False,
-                        )
-                except Exception:
-                    pass
+            if check_cmd and self._state_satisfied(check_cmd):
+                return ExecutionResult(
+                    command=command,
+                    returncode=0,
+                    stdout="(już wykonane – stan aktualny)",
+                    executed=False,
+                )
 
         if self.dry_run:
             return ExecutionResult(
@@ -192,6 +196,21 @@ class CommandExecutor:
                 executed=False,
                 preview=f"[DRY-RUN] {command}",
             )
+        return None
+
+    def execute_sync(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        add_sudo: bool = True,
+        check_idempotent: bool = True,
+    ) -> ExecutionResult:
+        """Synchroniczne wykonanie komendy."""
+        timeout = timeout or self.default_timeout
+        command = self._prepare(command, add_sudo)
+        early = self._short_circuit(command, check_idempotent)
+        if early is not None:
+            return early
 
         try:
             proc = subprocess.run(
@@ -222,23 +241,15 @@ class CommandExecutor:
         command: str,
         timeout: Optional[int] = None,
         add_sudo: bool = True,
+        check_idempotent: bool = True,
     ) -> ExecutionResult:
-        """Asynchroniczne wykonanie komendy."""
+        """Asynchroniczne wykonanie komendy (te same reguły co execute_sync)."""
         timeout = timeout or self.default_timeout
-
-        dangerous, reason = self.is_dangerous(command)
-        if dangerous:
-            raise DangerousCommandError(command, reason)
-
-        if add_sudo:
-            command = self.add_sudo(command)
-
-        if self.dry_run:
-            return ExecutionResult(
-                command=command,
-                executed=False,
-                preview=f"[DRY-RUN] {command}",
-            )
+        command = self._prepare(command, add_sudo)
+        # Sprawdzenie stanu może uruchomić krótki subprocess – poza pętlą zdarzeń
+        early = await asyncio.to_thread(self._short_circuit, command, check_idempotent)
+        if early is not None:
+            return early
 
         try:
             proc = await asyncio.create_subprocess_shell(
@@ -6,14 +6,19 @@ tworząc DAG (directed acyclic graph) zależności.
 
 from __future__ import annotations
 
+import heapq
+import itertools
+import threading
+from collections import Counter, deque
 from dataclasses import dataclass, field
 from typing import Literal, Optional
-from collections import deque
 
 
 ProblemStatus = Literal["pending", "in_progress", "resolved", "failed", "blocked"]
 ProblemSeverity = Literal["critical", "warning", "info"]
 
+SEVERITY_RANK = {"critical": 0, "warning": 1, "info": 2}
+
 
 @dataclass
 class Problem:
@@ -28,6 +33,14 @@ class Problem:
     attempts: int = 0
     max_attempts: int = 3
 
+    def __setattr__(self, name, value):
+        # Graf utrzymuje liczniki przyrostowo – informuj go o zmianie statusu
+        graph = self.__dict__.get("_graph")
+        old = self.__dict__.get("status")
+        object.__setattr__(self, name, value)
+        if name == "status" and graph is not None and old != value:
+            graph._on_status(self, old, value)
+
     def is_actionable(self) -> bool:
         return self.status == "pending" and self.attempts < self.max_attempts
 
@@ -47,52 +60,180 @@ class ProblemGraph:
     """
     DAG problemów systemowych z topological sort do wyznaczania kolejności napraw.
     Problemy bez nierozwiązanych zależności są actionable.
+
+    Stan jest utrzymywany przyrostowo: liczniki nierozwiązanych zależności,
+    kopiec gotowych problemów (severity, kolejność dodania) i liczniki
+    statusów aktualizowane przy każdej zmianie `Problem.status`. Wybór
+    następnego problemu kosztuje O(log N). Zależności (`caused_by`) muszą
+    być ustawione przed `add()`.
+
+    Wpis w kopcu jest ważny tylko, gdy jego klucz zgadza się z bieżącym
+    kluczem problemu – po ponownym dodaniu tego samego id stary wpis
+    zostaje w kopcu jako martwy i jest pomijany. Stan grafu chroni jedna
+    blokada: statusy zmieniają też wątki robocze run_parallel().
     """
 
     def __init__(self):
         self.nodes: dict[str, Problem] = {}
-        self.execution_order: list[str] = []
+        self._order: list[str] = []
+        self._order_dirty = False
+        self._seq = itertools.count()
+        self._keys: dict[str, tuple] = {}
+        self._unresolved: dict[str, int] = {}
+        self._dependents: dict[str, set[str]] = {}
+        self._heap: list[tuple[tuple, str]] = []
+        self._in_heap: set[str] = set()
+        self._status_counts: Counter[str] = Counter()
+        self._lock = threading.RLock()
+
+    @property
+    def execution_order(self) -> list[str]:
+        """Pełna kolejność wykonania (liczona leniwie – tylko do raportów/renderowania)."""
+        with self._lock:
+            if self._order_dirty:
+                self._recalculate_order()
+            return self._order
 
     def add(self, problem: Problem) -> None:
-        self.nodes[problem.id] = problem
-        self._recalculate_order()
+        with self._lock:
+            self._add(problem)
+
+    def _add(self, problem: Problem) -> None:
+        pid = problem.id
+        if pid in self.nodes:
+            self._detach(self.nodes[pid])
+        self.nodes[pid] = problem
+        object.__setattr__(problem, "_graph", self)
+        self._status_counts[problem.status] += 1
+        self._keys[pid] = (
+            bool(problem.caused_by),  # root problems first
+            SEVERITY_RANK.get(problem.severity, 3),
+            next(self._seq),
+        )
+
+        deps = set(problem.caused_by)
+        for dep in deps:
+            self._dependents.setdefault(dep, set()).add(pid)
+        self._unresolved[pid] = sum(
+            1 for dep in deps
+            if dep in self.nodes and self.nodes[dep].status != "resolved"
+        )
+        # Problemy już w grafie, które czekały na ten identyfikator
+        for child in self._dependents.get(pid, ()):
+            if child != pid and child in self.nodes:
+                if problem.status != "resolved":
+                    self._unresolved[child] += 1
+                self._push_if_ready(self.nodes[child])
+
+        self._push_if_ready(problem)
+        self._order_dirty = True
 
     def get(self, problem_id: str) -> Optional[Problem]:
         return self.nodes.get(problem_id)
 
     def next_actionable(self) -> Optional[Problem]:
         """Zwraca pierwszy problem bez nierozwiązanych zależności."""
-        for pid in self.execution_order:
-            p = self.nodes[pid]
-            if not p.is_actionable():
-                continue
-            deps_resolved = all(
-                self.nodes[dep].status == "resolved"
-                for dep in p.caused_by
-                if dep in self.nodes
-            )
-            if deps_resolved:
-                return p
-        return None
+        with self._lock:
+            while self._heap:
+                key, pid = self._heap[0]
+                if self._live(key, pid):
+                    problem = self.nodes[pid]
+                    if self._is_ready(problem):
+                        return problem
+                    self._in_heap.discard(pid)
+                heapq.heappop(self._heap)
+            return None
+
+    def ready(self, limit: Optional[int] = None) -> list[Problem]:
+        """
+        Problemy bez nierozwiązanych zależności, w kolejności wykonania
+        (najwyżej `limit`). Martwe i niegotowe wpisy są przy okazji zdejmowane
+        z kopca, tak jak w next_actionable() – koszt O((k + zdjęte) log N).
+        """
+        with self._lock:
+            picked: list[tuple[tuple, str]] = []
+            while self._heap and (limit is None or len(picked) < limit):
+                key, pid = heapq.heappop(self._heap)
+                if not self._live(key, pid):
+                    continue
+                if self._is_ready(self.nodes[pid]):
+                    picked.append((key, pid))
+                else:
+                    self._in_heap.discard(pid)
+            for entry in picked:
+                heapq.heappush(self._heap, entry)
+            return [self.nodes[pid] for _, pid in picked]
+
+    def is_ready(self, problem: Problem) -> bool:
+        """Czy problem (nadal) należy do grafu i może być naprawiany."""
+        with self._lock:
+            return self.nodes.get(problem.id) is problem and self._is_ready(problem)
+
+    # ── utrzymanie przyrostowe ───────────────────────────────
+
+    def _live(self, key: tuple, pid: str) -> bool:
+        """Czy wpis kopca dotyczy bieżącej wersji problemu (a nie zastąpionej)."""
+        return pid in self.nodes and self._keys.get(pid) == key
+
+    def _is_ready(self, problem: Problem) -> bool:
+        return problem.is_actionable() and self._unresolved.get(problem.id, 0) == 0
+
+    def _push_if_ready(self, problem: Problem) -> None:
+        if problem.id not in self._in_heap and self._is_ready(problem):
+            heapq.heappush(self._heap, (self._keys[problem.id], problem.id))
+            self._in_heap.add(problem.id)
+
+    def _on_status(self, problem: Problem, old: str, new: str) -> None:
+        with self._lock:
+            self._status_changed(problem, old, new)
+
+    def _status_changed(self, problem: Problem, old: str, new: str) -> None:
+        pid = problem.id
+        if self.nodes.get(pid) is not problem:
+            return
+        self._status_counts[old] -= 1
+        self._status_counts[new] += 1
+        if "resolved" in (old, new):
+            delta = -1 if new == "resolved" else 1
+            for child in self._dependents.get(pid, ()):
+                if child != pid and child in self.nodes:
+                    self._unresolved[child] += delta
+                    self._push_if_ready(self.nodes[child])
+        self._push_if_ready(problem)
+
+    def _detach(self, problem: Problem) -> None:
+        """Usuwa wkład zastępowanego problemu (ten sam id dodany ponownie)."""
+        pid = problem.id
+        self._status_counts[problem.status] -= 1
+        for dep in set(problem.caused_by):
+            self._dependents.get(dep, set()).discard(pid)
+        if problem.status != "resolved":
+            for child in self._dependents.get(pid, ()):
+                if child != pid and child in self.nodes:
+                    self._unresolved[child] -= 1
+        object.__setattr__(problem, "_graph", None)
+        del self.nodes[pid]
+        self._in_heap.discard(pid)
 
     def all_done(self) -> bool:
-        return all(
-            p.status in ("resolved", "failed", "blocked")
-            for p in self.nodes.values()
-        )
+        with self._lock:
+            done = sum(self._status_counts[s] for s in ("resolved", "failed", "blocked"))
+            return done == len(self.nodes)
 
     def pending_count(self) -> int:
-        return sum(1 for p in self.nodes.values() if p.status == "pending")
+        with self._lock:
+            return self._status_counts["pending"]
 
     def summary(self) -> dict:
-        by_status: dict[str, list[str]] = {}
-        for p in self.nodes.values():
-            by_status.setdefault(p.status, []).append(p.id)
-        return {
-            "total": len(self.nodes),
-            "by_status": by_status,
-            "execution_order": self.execution_order,
-        }
+        with self._lock:
+            by_status: dict[str, list[str]] = {}
+            for p in self.nodes.values():
+                by_status.setdefault(p.status, []).append(p.id)
+            return {
+                "total": len(self.nodes),
+                "by_status": by_status,
+                "execution_order": list(self.execution_order),
+            }
 
     def render_tree(self) -> str:
         """Renderuje drzewo problemów jako tekst."""
@@ -150,14 +291,15 @@ class ProblemGraph:
                         queue.append(child_id)
 
         # Dołącz ewentualne cykle (nie powinny wystąpić, ale dla bezpieczeństwa)
-        remaining = [pid for pid in self.nodes if pid not in order]
-        self.execution_order = order + remaining
+        seen = set(order)
+        remaining = [pid for pid in self.nodes if pid not in seen]
+        self._order = order + remaining
 
         # Sortuj po severity w ramach tej samej warstwy
-        severity_rank = {"critical": 0, "warning": 1, "info": 2}
-        self.execution_order.sort(
+        self._order.sort(
             key=lambda pid: (
                 self.nodes[pid].caused_by != [],  # root problems first
-                severity_rank.get(self.nodes[pid].severity, 3),
+                SEVERITY_RANK.get(self.nodes[pid].severity, 3),
             )
         )
+        self._order_dirty = False
@@ -0,0 +1,113 @@
+"""
+ResourceLocks – serializacja komend konkurujących o ten sam zasób systemowy.
+
+Przy równoległej naprawie niezależnych problemów dwie komendy nie mogą
+jednocześnie trzymać blokady menedżera pakietów (dnf/rpm/apt) ani
+przełączać tej samej jednostki systemd. Każda komenda jest mapowana na
+zbiór nazwanych zasobów, a blokady są brane w stałej (posortowanej)
+kolejności – dzięki temu nie ma zakleszczeń.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import shlex
+import threading
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterable, Iterator
+
+# Separatory komend złożonych (a && b; c | d)
+_SEGMENTS = re.compile(r"&&|\|\||;|\|")
+
+PACKAGE_MANAGERS = frozenset({
+    "dnf", "yum", "rpm", "apt", "apt-get", "dpkg", "flatpak", "snap", "zypper", "pacman",
+})
+
+# Podkomendy systemctl działające na konkretnych jednostkach
+_UNIT_VERBS = frozenset({
+    "start", "stop", "restart", "reload", "try-restart", "reload-or-restart",
+    "enable", "disable", "reenable", "mask", "unmask", "kill", "reset-failed",
+})
+
+
+def resources_for(command: str) -> set[str]:
+    """
+    Zasoby, których dotyczy komenda:
+    `pkg` (menedżer pakietów), `unit:<nazwa>` (jednostka systemd),
+    `systemd` (daemon-reload), `firewall`, `bootloader`.
+    """
+    resources: set[str] = set()
+    for segment in _SEGMENTS.split(command):
+        try:
+            tokens = shlex.split(segment)
+        except ValueError:
+            tokens = segment.split()
+        while tokens and (tokens[0] == "sudo" or tokens[0].startswith("-") or "=" in tokens[0]):
+            tokens.pop(0)  # sudo, jego opcje i przypisania zmiennych
+        if not tokens:
+            continue
+        prog = tokens[0].rsplit("/", 1)[-1]
+        if prog in PACKAGE_MANAGERS:
+            resources.add("pkg")
+        elif prog == "systemctl":
+            resources.update(_systemctl_resources(tokens[1:]))
+        elif prog == "firewall-cmd":
+            resources.add("firewall")
+        elif prog in ("grub2-mkconfig", "update-grub", "grubby"):
+            resources.add("bootloader")
+    return resources
+
+
+def _systemctl_resources(args: list[str]) -> set[str]:
+    scope = "user:" if "--user" in args else ""
+    words = [a for a in args if not a.startswith("-")]
+    if not words:
+        return set()
+    verb, units = words[0], words[1:]
+    if verb == "daemon-reload":
+        return {f"{scope}systemd"}
+    if verb not in _UNIT_VERBS:
+        return set()
+    return {f"unit:{scope}{u if '.' in u else u + '.service'}" for u in units}
+
+
+class ResourceLocks:
+    """Nazwane blokady zasobów współdzielone przez wątki orkiestratora."""
+
+    def __init__(self):
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, name: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    @contextmanager
+    def hold(self, resources: Iterable[str]) -> Iterator[None]:
+        """Trzyma blokady wszystkich zasobów (w kolejności alfabetycznej)."""
+        with ExitStack() as stack:
+            for name in sorted(set(resources)):
+                stack.enter_context(self._lock(name))
+            yield
+
+    def for_command(self, command: str):
+        """Kontekst blokad dla pojedynczej komendy."""
+        return self.hold(resources_for(command))
+
+
+class AsyncResourceLocks:
+    """Odpowiednik ResourceLocks dla orkiestracji w jednej pętli asyncio."""
+
+    def __init__(self):
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    @asynccontextmanager
+    async def hold(self, resources: Iterable[str]) -> AsyncIterator[None]:
+        async with AsyncExitStack() as stack:
+            for name in sorted(set(resources)):
+                await stack.enter_async_context(self._locks.setdefault(name, asyncio.Lock()))
+            yield
+
+    def for_command(self, command: str):
+        return self.hold(resources_for(command))
@@ -6,26 +6,50 @@ Zarządza grafem problemów, re-diagnozą po każdym kroku i eskalacją.
 from __future__ import annotations
 
 import asyncio
+import inspect
 import json
+import threading
 import time
 import uuid
-from typing import Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
 
 from ..config import FixOsConfig
 from ..providers.llm import LLMClient, LLMError
-from ..utils.anonymizer import anonymize
+from ..providers.prompt import PromptPacker, context_budget, excerpt
+from ..utils.anonymizer import anonymize, anonymize_tree
 from ..utils.terminal import (
     _C, console, print_problem_header, print_cmd_block,
     print_stdout_box, print_stderr_box, render_tree_colored,
 )
 from .executor import CommandExecutor, ExecutionResult, DangerousCommandError, CommandTimeoutError
+from .batching import AsyncEvaluationBatcher, EvaluationBatcher
 from .graph import Problem, ProblemGraph, ProblemSeverity
+from .locks import AsyncResourceLocks, ResourceLocks
+from .verdicts import VerdictEngine
 
 
 class _SkipAll(Exception):
     """Rzucany gdy user wpisuje 's' – pomija wszystkie komendy bieżącego problemu."""
 
 
+@dataclass
+class FixEvent:
+    """Zdarzenie postępu strumieniowane przez FixOrchestrator.events()."""
+    kind: str
+    problem: Optional[Problem] = None
+    result: Optional[ExecutionResult] = None
+    data: dict = field(default_factory=dict)
+
+
+async def _maybe_await(value):
+    """Wynik callbacku – awaitowany, jeśli callback jest korutyną."""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
 DIAGNOSE_PROMPT = """\
 You are a Linux system repair assistant. Analyze the diagnostic data and identify problems.
 
@@ -80,6 +104,37 @@ Return ONLY valid JSON:
 """
 
 
+EVALUATE_BATCH_PROMPT = """\
+You are a Linux system repair assistant. Evaluate the results of several independent fix attempts.
+
+Fix attempts (JSON list, stdout/stderr anonymized):
+{attempts}
+
+For EACH attempt decide whether the fix succeeded and list any new problems discovered.
+
+Return ONLY valid JSON with one entry per attempt:
+{{
+  "results": [
+    {{
+      "problem_id": "<problem_id of the attempt>",
+      "verdict": "resolved|failed|partial",
+      "confidence": 0.0,
+      "new_problems": [
+        {{
+          "id": "p_<short_slug>",
+          "description": "...",
+          "severity": "critical|warning|info",
+          "fix_commands": ["cmd1"],
+          "related_to": ["<problem_id of the attempt>"]
+        }}
+      ],
+      "explanation": "..."
+    }}
+  ]
+}}
+"""
+
+
 class FixOrchestrator:
     """
     Orkiestrator napraw systemowych.
@@ -94,6 +149,7 @@ class FixOrchestrator:
         config: FixOsConfig,
         executor: Optional[CommandExecutor] = None,
         auto_confirm_threshold: float = 0.90,
+        verdicts: Optional[VerdictEngine] = None,
     ):
         self.config = config
         self.llm = LLMClient(config)
@@ -105,44 +161,38 @@ class FixOrchestrator:
         self.graph = ProblemGraph()
         self.session_log: list[dict] = []
         self.auto_confirm_threshold = auto_confirm_threshold
+        # Oczywiste wyniki (kod 0 z systemctl, "already installed", …) bez LLM
+        self.verdicts = verdicts if verdicts is not None else VerdictEngine()
+        self.locks = ResourceLocks()
+        self._console_lock = threading.Lock()
         self._start_time = time.time()
 
     # ── Public API ─────────────────────────────────────────────────────────
 
     def load_from_diagnostics(self, diagnostics: dict) -> list[Problem]:
         """Parsuje dane diagnostyczne przez LLM i buduje graf problemów."""
-        anon_str, _ = anonymize(str(diagnostics))
-        os_info_raw = diagnostics.get("system", {}).get("os_release", "Linux")
-        os_info, _ = anonymize(os_info_raw)
-
-        known = [p.to_summary() for p in self.graph.nodes.values()]
-
-        prompt = DIAGNOSE_PROMPT.format(
-            os_info=os_info,
-            known_problems=json.dumps(known, ensure_ascii=False),
-            diagnostic_data=anon_str[:6000],
-        )
-
+        prompt = self._diagnose_prompt(diagnostics)
         try:
             raw = self.llm.chat(
                 [{"role": "user", "content": prompt}],
                 max_tokens=2000,
                 temperature=0.1,
             )
-            data = self._parse_json(raw)
-            problems = []
-            for pd in data.get("new_problems", []):
-                p = Problem(
-                    id=pd.get("id") or f"p_{uuid.uuid4().hex[:6]}",
-                    description=pd.get("description", "Nieznany problem"),
-                    severity=pd.get("severity", "warning"),
-                    fix_commands=pd.get("fix_commands", []),
-                    caused_by=pd.get("related_to", []),
-                )
-                self.graph.add(p)
-                problems.append(p)
-            self._log("diagnose", {"found": len(problems), "explanation": data.get("explanation", "")})
-            return problems
+            return self._apply_diagnosis(raw)
+        except (LLMError, ValueError) as e:
+            self._log("diagnose_error", {"error": str(e)})
+            return []
+
+    async def aload_from_diagnostics(self, diagnostics: dict) -> list[Problem]:
+        """Asynchroniczna wersja load_from_diagnostics."""
+        prompt = self._diagnose_prompt(diagnostics)
+        try:
+            raw = await self.llm.achat(
+                [{"role": "user", "content": prompt}],
+                max_tokens=2000,
+                temperature=0.1,
+            )
+            return self._apply_diagnosis(raw)
         except (LLMError, ValueError) as e:
             self._log("diagnose_error", {"error": str(e)})
             return []
@@ -187,131 +237,516 @@ class FixOrchestrator:
             problem = self.graph.next_actionable()
             if problem is None:
                 break
+            self._begin(problem)
+            self._add_discovered(problem, self._attempt(problem, confirm_fn, progress_fn))
+
+        return self._session_summary()
+
+    def run_parallel(
+        self,
+        confirm_fn=None,
+        progress_fn=None,
+        max_workers: int = 4,
+        batch_size: int = 1,
+        batch_window: float = 0.5,
+    ) -> dict:
+        """
+        Równoległa pętla napraw: każdy problem z rozwiązanymi zależnościami
+        trafia od razu do puli wątków (do `max_workers` naraz). Komendy
+        konkurujące o zasób (menedżer pakietów, ta sama jednostka systemd)
+        są serializowane przez ResourceLocks; potwierdzenia i wydruki
+        postępu – przez wspólną blokadę konsoli.
 
-            problem.status = "in_progress"
-            problem.attempts += 1
-
-            # Wykonaj każdą komendę fix
-            last_result = None
-            skip_all = False
-            for cmd in problem.fix_commands:
-                try:
-                    if not confirm_fn(problem, cmd):
-                        problem.status = "skipped"
-                        self._log("skipped", {"problem_id": problem.id, "command": cmd})
+        Sesja trwa tyle, co najdłuższy łańcuch zależności, a nie suma napraw.
+
+        Przy `batch_size` > 1 wyniki napraw kończących się w oknie
+        `batch_window` sekund są oceniane jednym wywołaniem LLM.
+        """
+        confirm_fn = self._serialized(confirm_fn or self._default_confirm)
+        progress_fn = self._serialized(progress_fn or self._default_progress)
+        evaluate = None
+        if batch_size > 1:
+            evaluate = EvaluationBatcher(self._evaluate_batch, batch_size, batch_window)
+
+        max_iterations = 50
+        dispatched = 0
+        running: dict[Future, Problem] = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fixos-fix") as pool:
+            while True:
+                active = {p.id for p in running.values()}
+                for problem in self.graph.ready(max_workers - len(running)):
+                    if len(running) >= max_workers or dispatched >= max_iterations:
                         break
-                except _SkipAll:
-                    skip_all = True
-                    problem.status = "skipped"
-                    self._log("skipped_all", {"problem_id": problem.id})
+                    # Wątki robocze zmieniają statusy w trakcie – sprawdź ponownie
+                    if problem.id in active or not self.graph.is_ready(problem):
+                        continue
+                    self._begin(problem)
+                    active.add(problem.id)
+                    dispatched += 1
+                    future = pool.submit(self._attempt, problem, confirm_fn, progress_fn, evaluate)
+                    running[future] = problem
+                if not running:
                     break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # Nowe problemy dodaje tylko wątek główny; statusy zmieniają
+                    # też wątki robocze – graf chroni je własną blokadą
+                    self._add_discovered(running.pop(future), future.result())
 
-                if skip_all:
+        return self._session_summary()
+
+    async def run_async(
+        self,
+        confirm_fn=None,
+        progress_fn=None,
+        max_concurrency: int = 1,
+        locks: Optional[AsyncResourceLocks] = None,
+        batch_size: int = 1,
+        batch_window: float = 0.5,
+    ) -> dict:
+        """
+        Natywna asynchroniczna pętla napraw (odpowiednik run_sync/run_parallel).
+
+        Komendy idą przez CommandExecutor.execute, ocena przez LLMClient.achat.
+        `confirm_fn` i `progress_fn` mogą być zwykłymi funkcjami lub korutynami.
+        Kilka orkiestracji (np. dla różnych hostów) może działać razem
+        w jednej pętli: `asyncio.gather(a.run_async(), b.run_async())`;
+        orkiestracje na tym samym hoście powinny współdzielić `locks`.
+        """
+        if progress_fn is None:
+            progress_fn = self._default_progress
+        summary: dict = {}
+        async for event in self.events(confirm_fn, max_concurrency, locks, batch_size, batch_window):
+            if event.kind == "executed":
+                await _maybe_await(progress_fn(event.problem, event.result))
+            elif event.kind == "blocked":
+                console.print(f"\n  [bold red]⛔ ZABLOKOWANO:[/bold red] {event.data['error']}")
+            elif event.kind == "timeout":
+                console.print(f"\n  [bold yellow]⏰ TIMEOUT:[/bold yellow] {event.data['error']}")
+            elif event.kind == "done":
+                summary = event.data
+        return summary
+
+    async def events(
+        self,
+        confirm_fn=None,
+        max_concurrency: int = 1,
+        locks: Optional[AsyncResourceLocks] = None,
+        batch_size: int = 1,
+        batch_window: float = 0.5,
+    ) -> AsyncIterator[FixEvent]:
+        """
+        Strumień zdarzeń sesji napraw: started, executed, skipped, blocked,
+        timeout, evaluated, discovered, finished i na końcu done (podsumowanie).
+        Problemy z rozwiązanymi zależnościami są naprawiane współbieżnie
+        (do `max_concurrency` naraz), a ich wyniki – przy `batch_size` > 1 –
+        oceniane paczkami.
+        """
+        if confirm_fn is None:
+            confirm_fn = self._default_confirm_async
+        locks = locks or AsyncResourceLocks()
+        evaluate = None
+        if batch_size > 1:
+            evaluate = AsyncEvaluationBatcher(self._aevaluate_batch, batch_size, batch_window)
+        console_lock = asyncio.Lock()
+
+        async def confirm(problem: Problem, cmd: str) -> bool:
+            async with console_lock:
+                return await _maybe_await(confirm_fn(problem, cmd))
+
+        queue: asyncio.Queue[FixEvent] = asyncio.Queue()
+        running: dict[str, asyncio.Task] = {}
+        max_iterations = 50
+        dispatched = 0
+
+        def dispatch() -> None:
+            nonlocal dispatched
+            for problem in self.graph.ready(max_concurrency - len(running)):
+                if len(running) >= max_concurrency or dispatched >= max_iterations:
+                    return
+                if problem.id in running:
+                    continue
+                self._begin(problem)
+                dispatched += 1
+                queue.put_nowait(FixEvent("started", problem))
+                running[problem.id] = asyncio.create_task(
+                    self._attempt_async(problem, confirm, locks, queue.put_nowait, evaluate)
+                )
+
+        try:
+            dispatch()
+            while running:
+                event = await queue.get()
+                yield event
+                if event.kind != "finished":
+                    continue
+                new_problems = await running.pop(event.problem.id)
+                self._add_discovered(event.problem, new_problems)
+                for np in new_problems:
+                    yield FixEvent("discovered", np, data={"caused_by": event.problem.id})
+                dispatch()
+            while not queue.empty():
+                yield queue.get_nowait()
+        finally:
+            for task in running.values():
+                task.cancel()
+
+        yield FixEvent("done", data=self._session_summary())
+
+    # ── Private helpers ────────────────────────────────────────────────────
+
+    def _begin(self, problem: Problem) -> None:
+        problem.status = "in_progress"
+        problem.attempts += 1
+
+    def _attempt(self, problem: Problem, confirm_fn, progress_fn, evaluate=None) -> list[Problem]:
+        """Jedna próba naprawy: komendy fix + ocena przez LLM. Zwraca nowe problemy."""
+        last_result = None
+        for cmd in problem.fix_commands:
+            try:
+                if not confirm_fn(problem, cmd):
+                    problem.status = "skipped"
+                    self._log("skipped", {"problem_id": problem.id, "command": cmd})
                     break
+            except _SkipAll:
+                problem.status = "skipped"
+                self._log("skipped_all", {"problem_id": problem.id})
+                return []
 
-                try:
+            try:
+                with self.locks.for_command(cmd):
                     result = self.executor.execute_sync(cmd)
-                    last_result = result
-                    self._log("executed", result.to_context())
-                    progress_fn(problem, result)
+                last_result = result
+                self._log("executed", result.to_context())
+                progress_fn(problem, result)
 
-                    if not result.success and result.executed:
-                        break
-                except DangerousCommandError as e:
-                    console.print(f"\n  [bold red]⛔ ZABLOKOWANO:[/bold red] {e}")
-                    problem.status = "failed"
-                    self._log("dangerous_blocked", {"command": cmd, "error": str(e)})
-                    break
-                except CommandTimeoutError as e:
-                    console.print(f"\n  [bold yellow]⏰ TIMEOUT:[/bold yellow] {e}")
-                    last_result = ExecutionResult(command=cmd, timed_out=True, executed=False)
+                if not result.success and result.executed:
                     break
+            except DangerousCommandError as e:
+                console.print(f"\n  [bold red]⛔ ZABLOKOWANO:[/bold red] {e}")
+                problem.status = "failed"
+                self._log("dangerous_blocked", {"command": cmd, "error": str(e)})
+                break
+            except CommandTimeoutError as e:
+                console.print(f"\n  [bold yellow]⏰ TIMEOUT:[/bold yellow] {e}")
+                last_result = ExecutionResult(command=cmd, timed_out=True, executed=False)
+                break
 
-            if skip_all:
-                continue
+        # Oceń wynik przez LLM i wykryj nowe problemy
+        if last_result is None:
+            return []
+        return (evaluate or self._evaluate_and_rediagnose)(problem, last_result)
 
-            # Oceń wynik przez LLM i wykryj nowe problemy
-            if last_result is not None:
-                new_problems = self._evaluate_and_rediagnose(problem, last_result)
-                for np in new_problems:
-                    np.caused_by.append(problem.id)
-                    problem.may_cause.append(np.id)
-                    self.graph.add(np)
-                    console.print(f"\n  [cyan]Odkryto nowy problem:[/cyan] [{np.id}] {np.description}")
+    async def _attempt_async(self, problem: Problem, confirm, locks, emit, evaluate=None) -> list[Problem]:
+        """Asynchroniczna wersja _attempt; kończy się zdarzeniem `finished`."""
+        try:
+            return await self._attempt_async_inner(problem, confirm, locks, emit, evaluate)
+        finally:
+            emit(FixEvent("finished", problem, data={"status": problem.status}))
+
+    async def _attempt_async_inner(self, problem: Problem, confirm, locks, emit, evaluate) -> list[Problem]:
+        last_result = None
+        for cmd in problem.fix_commands:
+            try:
+                if not await confirm(problem, cmd):
+                    problem.status = "skipped"
+                    self._log("skipped", {"problem_id": problem.id, "command": cmd})
+                    emit(FixEvent("skipped", problem, data={"command": cmd}))
+                    break
+            except _SkipAll:
+                problem.status = "skipped"
+                self._log("skipped_all", {"problem_id": problem.id})
+                emit(FixEvent("skipped", problem, data={"all": True}))
+                return []
+
+            try:
+                async with locks.for_command(cmd):
+                    result = await self.executor.execute(cmd)
+                last_result = result
+                self._log("executed", result.to_context())
+                emit(FixEvent("executed", problem, result))
+
+                if not result.success and result.executed:
+                    break
+            except DangerousCommandError as e:
+                problem.status = "failed"
+                self._log("dangerous_blocked", {"command": cmd, "error": str(e)})
+                emit(FixEvent("blocked", problem, data={"command": cmd, "error": str(e)}))
+                break
+            except CommandTimeoutError as e:
+                last_result = ExecutionResult(command=cmd, timed_out=True, executed=False)
+                emit(FixEvent("timeout", problem, last_result, data={"error": str(e)}))
+                break
 
-        return self._session_summary()
+        if last_result is None:
+            return []
+        new_problems = await (evaluate or self._aevaluate_and_rediagnose)(problem, last_result)
+        emit(FixEvent("evaluated", problem, last_result, data={"status": problem.status}))
+        return new_problems
+
+    def _add_discovered(self, problem: Problem, new_problems: list[Problem]) -> None:
+        for np in new_problems:
+            np.caused_by.append(problem.id)
+            problem.may_cause.append(np.id)
+            self.graph.add(np)
+            console.print(f"\n  [cyan]Odkryto nowy problem:[/cyan] [{np.id}] {np.description}")
+
+    def _serialized(self, fn):
+        """Owija callback tak, by wątki nie przeplatały wejścia/wyjścia konsoli."""
+        def wrapper(*args):
+            with self._console_lock:
+                return fn(*args)
+        return wrapper
+
+    def _diagnose_prompt(self, diagnostics: dict) -> str:
+        budget = context_budget(self.config)
+        # Najpierw anonimizacja całości – skracanie mogłoby przeciąć sekret
+        # lub adres tak, że reguły by go nie rozpoznały; potem wybór pól
+        # wg sygnału (błędy, nieudane jednostki; puste odpadają)
+        tree, _ = anonymize_tree(diagnostics)
+        packer = PromptPacker(budget)
+        anon_str = packer.pack_json(tree)
+        if packer.omitted:
+            self._log("prompt_omitted", {"budget": budget, "fields": packer.omitted})
+        os_info_raw = diagnostics.get("system", {}).get("os_release", "Linux")
+        os_info, _ = anonymize(os_info_raw)
 
-    async def run_async(self, confirm_fn=None, progress_fn=None) -> dict:
-        """Asynchroniczna wersja run_sync."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, lambda: self.run_sync(confirm_fn, progress_fn)
+        known = [p.to_summary() for p in self.graph.nodes.values()]
+
+        return DIAGNOSE_PROMPT.format(
+            os_info=os_info,
+            known_problems=json.dumps(known, ensure_ascii=False),
+            diagnostic_data=anon_str,
         )
 
-    # ── Private helpers ────────────────────────────────────────────────────
+    def _apply_diagnosis(self, raw: str) -> list[Problem]:
+        """Dodaje do grafu problemy z odpowiedzi LLM (ValueError gdy to nie JSON)."""
+        data = self._parse_json(raw)
+        problems = []
+        for pd in data.get("new_problems", []):
+            p = Problem(
+                id=pd.get("id") or f"p_{uuid.uuid4().hex[:6]}",
+                description=pd.get("description", "Nieznany problem"),
+                severity=pd.get("severity", "warning"),
+                fix_commands=pd.get("fix_commands", []),
+                caused_by=pd.get("related_to", []),
+            )
+            self.graph.add(p)
+            problems.append(p)
+        self._log("diagnose", {"found": len(problems), "explanation": data.get("explanation", "")})
+        return problems
 
     def _evaluate_and_rediagnose(
         self, problem: Problem, result: ExecutionResult
     ) -> list[Problem]:
         """Wysyła wynik do LLM, ocenia sukces i wykrywa nowe problemy."""
-        anon_stdout, _ = anonymize(result.stdout)
-        anon_stderr, _ = anonymize(result.stderr)
+        if self._evaluate_locally(problem, result):
+            return []
+        prompt = self._evaluation_prompt(problem, result)
+        try:
+            raw = self.llm.chat(
+                [{"role": "user", "content": prompt}],
+                max_tokens=1000,
+                temperature=0.1,
+            )
+            return self._apply_evaluation(problem, raw)
+        except (LLMError, ValueError) as e:
+            return self._evaluation_fallback(problem, result, e)
 
-        prompt = EVALUATE_PROMPT.format(
+    async def _aevaluate_and_rediagnose(
+        self, problem: Problem, result: ExecutionResult
+    ) -> list[Problem]:
+        """Asynchroniczna wersja _evaluate_and_rediagnose."""
+        if self._evaluate_locally(problem, result):
+            return []
+        prompt = self._evaluation_prompt(problem, result)
+        try:
+            raw = await self.llm.achat(
+                [{"role": "user", "content": prompt}],
+                max_tokens=1000,
+                temperature=0.1,
+            )
+            return self._apply_evaluation(problem, raw)
+        except (LLMError, ValueError) as e:
+            return self._evaluation_fallback(problem, result, e)
+
+    def _evaluate_locally(self, problem: Problem, result: ExecutionResult) -> bool:
+        """Rozstrzyga werdykt regułami lokalnymi; False = potrzebna ocena LLM."""
+        local = self.verdicts.evaluate(result)
+        if local is None:
+            return False
+        self._apply_verdict(problem, {
+            "verdict": local.verdict,
+            "confidence": local.confidence,
+            "explanation": f"reguła lokalna: {local.rule}",
+        })
+        return True
+
+    def _evaluation_prompt(self, problem: Problem, result: ExecutionResult) -> str:
+        anon_stdout = excerpt(result.stdout, 375)
+        anon_stderr = excerpt(result.stderr, 125)
+
+        return EVALUATE_PROMPT.format(
             problem=json.dumps(problem.to_summary(), ensure_ascii=False),
             command=result.command,
             returncode=result.returncode,
-            stdout=anon_stdout[:1500],
-            stderr=anon_stderr[:500],
+            stdout=anon_stdout,
+            stderr=anon_stderr,
             problem_id=problem.id,
         )
 
+    def _apply_evaluation(self, problem: Problem, raw: str) -> list[Problem]:
+        return self._apply_verdict(problem, self._parse_json(raw))
+
+    def _apply_verdict(self, problem: Problem, data: dict) -> list[Problem]:
+        """Ustawia status problemu wg werdyktu LLM i zwraca nowo wykryte problemy."""
+        verdict = data.get("verdict", "failed")
+        confidence = float(data.get("confidence", 0.5))
+
+        if verdict == "resolved" or (verdict == "partial" and confidence >= self.auto_confirm_threshold):
+            problem.status = "resolved"
+        elif problem.attempts >= problem.max_attempts:
+            problem.status = "failed"
+        else:
+            problem.status = "pending"
+
+        self._log("evaluate", {
+            "problem_id": problem.id,
+            "verdict": verdict,
+            "confidence": confidence,
+            "explanation": data.get("explanation", ""),
+        })
+
+        new_problems = []
+        for pd in data.get("new_problems", []):
+            p = Problem(
+                id=pd.get("id") or f"p_{uuid.uuid4().hex[:6]}",
+                description=pd.get("description", "Nieznany problem"),
+                severity=pd.get("severity", "warning"),
+                fix_commands=pd.get("fix_commands", []),
+                caused_by=pd.get("related_to", []),
+            )
+            new_problems.append(p)
+        return new_problems
+
+    def _evaluate_batch(
+        self, items: list[tuple[Problem, ExecutionResult]]
+    ) -> list[list[Problem]]:
+        """
+        Ocena kilku wyników jednym wywołaniem LLM. Problemy, dla których
+        odpowiedź nie zawiera poprawnego werdyktu, są oceniane osobno.
+        """
+        local = [self._evaluate_locally(problem, result) for problem, result in items]
+        if all(local):
+            return [[] for _ in items]
+        remote = [item for item, done in zip(items, local) if not done]
+        results = iter(self._evaluate_remote_batch(remote))
+        return [[] if done else next(results) for done in local]
+
+    def _evaluate_remote_batch(
+        self, items: list[tuple[Problem, ExecutionResult]]
+    ) -> list[list[Problem]]:
+        if len(items) == 1:
+            return [self._evaluate_and_rediagnose(*items[0])]
         try:
             raw = self.llm.chat(
-                [{"role": "user", "content": prompt}],
-                max_tokens=1000,
+                [{"role": "user", "content": self._batch_prompt(items)}],
+                max_tokens=min(4000, 1000 * len(items)),
                 temperature=0.1,
             )
-            data = self._parse_json(raw)
-            verdict = data.get("verdict", "failed")
-            confidence = float(data.get("confidence", 0.5))
-
-            if verdict == "resolved" or (verdict == "partial" and confidence >= self.auto_confirm_threshold):
-                problem.status = "resolved"
-            elif problem.attempts >= problem.max_attempts:
-                problem.status = "failed"
-            else:
-                problem.status = "pending"
-
-            self._log("evaluate", {
+            outcomes = self._apply_batch(items, raw)
+        except (LLMError, ValueError) as e:
+            self._log("evaluate_batch_error", {"size": len(items), "error": str(e)})
+            outcomes = [None] * len(items)
+        return [
+            outcome if outcome is not None else self._evaluate_and_rediagnose(problem, result)
+            for (problem, result), outcome in zip(items, outcomes)
+        ]
+
+    async def _aevaluate_batch(
+        self, items: list[tuple[Problem, ExecutionResult]]
+    ) -> list[list[Problem]]:
+        """Asynchroniczna wersja _evaluate_batch (osobne oceny współbieżnie)."""
+        local = [self._evaluate_locally(problem, result) for problem, result in items]
+        if all(local):
+            return [[] for _ in items]
+        remote = [item for item, done in zip(items, local) if not done]
+        results = iter(await self._aevaluate_remote_batch(remote))
+        return [[] if done else next(results) for done in local]
+
+    async def _aevaluate_remote_batch(
+        self, items: list[tuple[Problem, ExecutionResult]]
+    ) -> list[list[Problem]]:
+        if len(items) == 1:
+            return [await self._aevaluate_and_rediagnose(*items[0])]
+        try:
+            raw = await self.llm.achat(
+                [{"role": "user", "content": self._batch_prompt(items)}],
+                max_tokens=min(4000, 1000 * len(items)),
+                temperature=0.1,
+            )
+            outcomes = self._apply_batch(items, raw)
+        except (LLMError, ValueError) as e:
+            self._log("evaluate_batch_error", {"size": len(items), "error": str(e)})
+            outcomes = [None] * len(items)
+        retries = [
+            self._aevaluate_and_rediagnose(problem, result)
+            for (problem, result), outcome in zip(items, outcomes) if outcome is None
+        ]
+        retried = iter(await asyncio.gather(*retries))
+        return [outcome if outcome is not None else next(retried) for outcome in outcomes]
+
+    def _batch_prompt(self, items: list[tuple[Problem, ExecutionResult]]) -> str:
+        attempts = []
+        for problem, result in items:
+            anon_stdout = excerpt(result.stdout, 250)
+            anon_stderr = excerpt(result.stderr, 100)
+            attempts.append({
                 "problem_id": problem.id,
-                "verdict": verdict,
-                "confidence": confidence,
-                "explanation": data.get("explanation", ""),
+                "problem": problem.to_summary(),
+                "command": result.command,
+                "returncode": result.returncode,
+                "stdout": anon_stdout,
+                "stderr": anon_stderr,
             })
+        return EVALUATE_BATCH_PROMPT.format(attempts=json.dumps(attempts, ensure_ascii=False, indent=1))
+
+    def _apply_batch(
+        self, items: list[tuple[Problem, ExecutionResult]], raw: str
+    ) -> list[Optional[list[Problem]]]:
+        """Rozdziela werdykty paczki na problemy; None = brak werdyktu dla problemu."""
+        data = self._parse_json(raw)
+        entries = {
+            str(entry.get("problem_id")): entry
+            for entry in data.get("results", [])
+            if isinstance(entry, dict)
+        }
+        outcomes: list[Optional[list[Problem]]] = []
+        for problem, _ in items:
+            entry = entries.get(problem.id)
+            try:
+                outcomes.append(None if entry is None else self._apply_verdict(problem, entry))
+            except (TypeError, ValueError):
+                outcomes.append(None)
+        self._log("evaluate_batch", {
+            "size": len(items),
+            "answered": sum(o is not None for o in outcomes),
+        })
+        return outcomes
 
-            new_problems = []
-            for pd in data.get("new_problems", []):
-                p = Problem(
-                    id=pd.get("id") or f"p_{uuid.uuid4().hex[:6]}",
-                    description=pd.get("description", "Nieznany problem"),
-                    severity=pd.get("severity", "warning"),
-                    fix_commands=pd.get("fix_commands", []),
-                    caused_by=pd.get("related_to", []),
-                )
-                new_problems.append(p)
-            return new_problems
-
-        except (LLMError, ValueError) as e:
-            self._log("evaluate_error", {"error": str(e)})
-            # Fallback: oceniaj po returncode
-            if result.success:
-                problem.status = "resolved"
-            elif problem.attempts >= problem.max_attempts:
-                problem.status = "failed"
-            else:
-                problem.status = "pending"
-            return []
+    def _evaluation_fallback(
+        self, problem: Problem, result: ExecutionResult, error: Exception
+    ) -> list[Problem]:
+        self._log("evaluate_error", {"error": str(error)})
+        # Fallback: oceniaj po returncode
+        if result.success:
+            problem.status = "resolved"
+        elif problem.attempts >= problem.max_attempts:
+            problem.status = "failed"
+        else:
+            problem.status = "pending"
+        return []
 
     def _parse_json(self, raw: str) -> dict:
         """Parsuje JSON z odpowiedzi LLM (usuwa markdown code fences)."""
@@ -364,6 +799,11 @@ class FixOrchestrator:
             raise _SkipAll()
         return ans in ("y", "yes", "")
 
+    @classmethod
+    async def _default_confirm_async(cls, problem: Problem, command: str) -> bool:
+        # console.input blokuje – w wątku, by nie wstrzymywać innych orkiestracji
+        return await asyncio.to_thread(cls._default_confirm, problem, command)
+
     @staticmethod
     def _default_progress(problem: Problem, result: ExecutionResult) -> None:
         if not result.executed:
@@ -0,0 +1,148 @@
+"""
+VerdictEngine – lokalna ocena oczywistych wyników napraw (bez LLM).
+
+Wiele wyników jest jednoznacznych: `systemctl restart` z kodem 0,
+"already installed" z dnf, "(już wykonane – stan aktualny)" ze sprawdzenia
+idempotentności. Reguły dopasowują komendę, kod wyjścia i output; pierwsza
+pasująca reguła rozstrzyga werdykt. Do LLM trafiają tylko przypadki
+niejednoznaczne.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Literal, Optional
+
+from .executor import ExecutionResult
+
+LocalVerdictKind = Literal["resolved", "failed"]
+
+_SUDO = r"^(?:sudo\s+(?:-\S+\s+)*)?"
+_PKG_MISSING = r"No match for argument|Unable to locate package|Unable to find a match"
+
+
+@dataclass(frozen=True)
+class VerdictRule:
+    """
+    Reguła werdyktu. Puste kryterium pasuje zawsze.
+
+    Args:
+        command: regex dopasowywany (re.search) do komendy
+        returncode: dozwolone kody wyjścia
+        output: regex dopasowywany do stdout + stderr
+        unless: regex, który NIE może wystąpić w stdout + stderr
+        executed: wymagany stan `ExecutionResult.executed`
+    """
+    name: str
+    verdict: LocalVerdictKind
+    command: Optional[str] = None
+    returncode: Optional[tuple[int, ...]] = None
+    output: Optional[str] = None
+    unless: Optional[str] = None
+    executed: Optional[bool] = True
+    confidence: float = 1.0
+    _command_rx: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+    _output_rx: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+    _unless_rx: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.command:
+            object.__setattr__(self, "_command_rx", re.compile(self.command))
+        if self.output:
+            object.__setattr__(self, "_output_rx", re.compile(self.output, re.IGNORECASE | re.MULTILINE))
+        if self.unless:
+            object.__setattr__(self, "_unless_rx", re.compile(self.unless, re.IGNORECASE | re.MULTILINE))
+
+    def matches(self, result: ExecutionResult) -> bool:
+        if result.timed_out or result.error:
+            return False
+        if self.executed is not None and result.executed != self.executed:
+            return False
+        if self.returncode is not None and result.returncode not in self.returncode:
+            return False
+        if self._command_rx and not self._command_rx.search(result.command):
+            return False
+        output = f"{result.stdout}\n{result.stderr}"
+        if self._output_rx and not self._output_rx.search(output):
+            return False
+        if self._unless_rx and self._unless_rx.search(output):
+            return False
+        return True
+
+
+@dataclass(frozen=True)
+class LocalVerdict:
+    verdict: LocalVerdictKind
+    confidence: float
+    rule: str
+
+
+DEFAULT_RULES: tuple[VerdictRule, ...] = (
+    # Sprawdzenie idempotentności w CommandExecutor – stan już osiągnięty
+    VerdictRule(
+        "idempotent", "resolved", executed=False, returncode=(0,),
+        output=r"^\(już wykonane",
+    ),
+    # Menedżery pakietów: nic do zrobienia / pakiet już jest
+    VerdictRule(
+        "package-present", "resolved", returncode=(0,),
+        command=_SUDO + r"(?:dnf|yum|apt|apt-get|zypper)\b",
+        output=r"already installed|Nothing to do|is already the newest version|Nothing to install",
+        unless=_PKG_MISSING,
+    ),
+    VerdictRule(
+        "package-installed", "resolved", returncode=(0,),
+        command=_SUDO + r"(?:dnf|yum|apt|apt-get|zypper)\s+(?:-\S+\s+)*(?:install|reinstall|upgrade|update|remove)\b",
+        output=r"^Complete!$|^Zakończono!$|^Setting up |^Installed:|^Upgraded:|^Removed:",
+        unless=_PKG_MISSING,
+    ),
+    # systemctl z kodem 0 – operacja na jednostce się powiodła
+    VerdictRule(
+        "systemctl-ok", "resolved", returncode=(0,),
+        command=_SUDO + r"systemctl\s+(?:--\S+\s+)*(?:start|stop|restart|reload|try-restart|"
+                        r"reload-or-restart|enable|disable|reenable|mask|unmask|daemon-reload|reset-failed)\b",
+    ),
+    # Proste komendy zmieniające stan, które milczą przy sukcesie
+    VerdictRule(
+        "silent-success", "resolved", returncode=(0,),
+        command=_SUDO + r"(?:mkdir|chmod|chown|ln|modprobe|setsebool|restorecon|usermod|touch)\b",
+        output=r"\A\s*\Z",
+    ),
+    VerdictRule(
+        "firewall-success", "resolved", returncode=(0,),
+        command=_SUDO + r"firewall-cmd\b", output=r"^success$",
+    ),
+    # Jednostka nie istnieje – ponowienie tej samej komendy nic nie da
+    VerdictRule(
+        "unit-not-found", "failed", returncode=tuple(range(1, 256)),
+        command=_SUDO + r"systemctl\b", output=r"Unit \S+ not found|Unit \S+ could not be found",
+    ),
+)
+
+
+class VerdictEngine:
+    """Zestaw reguł lokalnych; kolejność ma znaczenie (pierwsza pasująca wygrywa)."""
+
+    def __init__(self, rules: Iterable[VerdictRule] = DEFAULT_RULES, enabled: bool = True):
+        self.rules: list[VerdictRule] = list(rules)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, rule: VerdictRule, first: bool = False) -> None:
+        if first:
+            self.rules.insert(0, rule)
+        else:
+            self.rules.append(rule)
+
+    def evaluate(self, result: ExecutionResult) -> Optional[LocalVerdict]:
+        """Werdykt lokalny albo None, gdy wynik wymaga oceny przez LLM."""
+        if not self.enabled:
+            return None
+        for rule in self.rules:
+            if rule.matches(result):
+                self.hits += 1
+                return LocalVerdict(rule.verdict, rule.confidence, rule.name)
+        self.misses += 1
+        return None
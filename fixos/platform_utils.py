@@ -159,6 +159,15 @@ def install_package_cmd(package: str) -> str:
     return cmds.get(pm, f"# install {package}")
 
 
+def cache_dir() -> Path:
+    """Returns the per-user fixos cache directory (XDG_CACHE_HOME / LOCALAPPDATA)."""
+    if IS_WINDOWS:
+        base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "fixos"
+
+
 def _cmd_exists(cmd: str) -> bool:
     import shutil
     return shutil.which(cmd) is not None
@@ -1,2 +1,3 @@
-from .llm import LLMClient, LLMError
-__all__ = ["LLMClient", "LLMError"]
+from .cache import ResponseCache
+from .llm import AsyncLLMClient, LLMClient, LLMError, LLMUsage
+__all__ = ["AsyncLLMClient", "LLMClient", "LLMError", "LLMUsage", "ResponseCache"]
@@ -0,0 +1,146 @@
+"""
+ResponseCache – pamięć odpowiedzi LLM dla deterministycznych wywołań.
+
+Identyczne zapytania (ta sama zanonimizowana diagnostyka, ten sam
+EVALUATE_PROMPT dla idempotentnej komendy) powtarzają się między
+uruchomieniami. Odpowiedzi wywołań o niskiej temperaturze są zapisywane
+w SQLite w ~/.cache/fixos, kluczowane skrótem providera, modelu,
+wiadomości i parametrów. Wpisy wygasają po `ttl` sekundach; przy
+przekroczeniu limitu liczby wpisów lub rozmiaru usuwane są najdawniej
+używane. Przechowywane są wyłącznie odpowiedzi – treść zapytań tylko
+jako skrót.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+
+class ResponseCache:
+    """
+    Cache odpowiedzi LLM w SQLite.
+
+    Args:
+        path: plik bazy (zwykle ~/.cache/fixos/llm-responses.sqlite)
+        ttl: czas życia wpisu w sekundach
+        max_entries: limit liczby wpisów
+        max_bytes: limit łącznego rozmiaru odpowiedzi
+        max_temperature: wywołania z wyższą temperaturą nie są cache'owane
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = 86400,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_temperature: float = 0.2,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+
+    def cacheable(self, temperature: float) -> bool:
+        return temperature <= self.max_temperature
+
+    @staticmethod
+    def key(provider: str, model: str, messages: list[dict], **params) -> str:
+        payload = json.dumps(
+            {"provider": provider, "model": model, "messages": messages, "params": params},
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+        return hashlib.blake2b(payload.encode("utf-8", "surrogatepass"), digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple[str, int]]:
+        """(odpowiedź, tokeny zużyte przy jej wygenerowaniu) albo None."""
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute(
+                    "SELECT content, tokens FROM responses WHERE key = ? AND created_at > ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        except (sqlite3.Error, OSError):
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tokens_saved += row[1]
+        return row[0], row[1]
+
+    def put(self, key: str, content: str, tokens: int = 0) -> None:
+        now = time.time()
+        size = len(content.encode("utf-8", "surrogatepass"))
+        if size > self.max_bytes:
+            return
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, content, tokens, size, now, now),
+                )
+                self._evict(conn, now)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def clear(self) -> None:
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM responses")
+        except (sqlite3.Error, OSError):
+            pass
+        with self._lock:
+            self.hits = self.misses = self.tokens_saved = 0
+
+    def stats(self) -> dict:
+        """Liczniki do raportów/diagnostyki."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tokens_saved": self.tokens_saved,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, content TEXT NOT NULL, tokens INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        return conn
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM responses WHERE key NOT IN "
+            "(SELECT key FROM responses ORDER BY used_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        # Najdawniej używane ponad limit rozmiaru (suma narastająca od najnowszych)
+        conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM "
+            "(SELECT key, SUM(size) OVER (ORDER BY used_at DESC, key) AS total FROM responses) "
+            "WHERE total > ?)",
+            (self.max_bytes,),
+        )
@@ -0,0 +1,96 @@
+"""
+ProviderHealth – stan zdrowia providera LLM na potrzeby failover i hedgingu.
+
+Śledzi średnią kroczącą (EWMA) czasu odpowiedzi i odsetka błędów oraz
+ostatnie czasy odpowiedzi (do p95). Po kilku błędach z rzędu provider
+jest wyłączany na `cooldown` sekund – klient próbuje wtedy najpierw
+providerów zapasowych. Stan jest współdzielony w procesie per provider
+i base_url, podobnie jak limity w ratelimit.py.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from ..config import FixOsConfig
+
+
+class ProviderHealth:
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        window: int = 64,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self.latency_ewma = latency if self.latency_ewma is None else (
+                self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+            )
+            self.error_rate *= 1 - self.alpha
+            self.consecutive_failures = 0
+            self._down_until = 0.0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self._down_until = time.monotonic() + self.cooldown
+
+    @property
+    def available(self) -> bool:
+        """False w czasie przerwy po serii błędów."""
+        return time.monotonic() >= self._down_until
+
+    def p95(self, default: float, min_samples: int = 5) -> float:
+        """95. percentyl ostatnich czasów odpowiedzi (`default` przy zbyt małej próbce)."""
+        with self._lock:
+            if len(self._latencies) < min_samples:
+                return default
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        """Liczniki do raportów/diagnostyki."""
+        return {
+            "available": self.available,
+            "latency_ewma": self.latency_ewma,
+            "error_rate": round(self.error_rate, 3),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+_HEALTH: dict[tuple[str, Optional[str]], ProviderHealth] = {}
+_HEALTH_LOCK = threading.Lock()
+
+
+def health_for(config: FixOsConfig) -> ProviderHealth:
+    """Stan zdrowia współdzielony przez klienty danego providera i base_url."""
+    key = (config.provider, config.base_url)
+    with _HEALTH_LOCK:
+        health = _HEALTH.get(key)
+        if health is None:
+            health = _HEALTH[key] = ProviderHealth()
+        return health
+
+
+def reset_health() -> None:
+    """Zapomina stan wszystkich providerów (testy, zmiana konfiguracji)."""
+    with _HEALTH_LOCK:
+        _HEALTH.clear()
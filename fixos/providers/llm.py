@@ -1,12 +1,25 @@
 """
 Ujednolicony klient LLM obsługujący wiele providerów przez OpenAI-compatible API.
 Gemini, OpenAI, xAI, OpenRouter, Ollama – wszystkie przez ten sam interfejs.
+
+Poza głównym providerem klient może mieć listę zapasowych
+(LLM_FALLBACK_PROVIDERS): gdy główny nie odpowiada, zapytanie przechodzi
+do kolejnego, a providery wyłączone po serii błędów trafiają na koniec
+kolejki. W trybie hedgingu (LLM_HEDGE) po przekroczeniu p95 czasu odpowiedzi
+to samo zapytanie idzie równolegle do zapasowego providera – wygrywa
+szybsza odpowiedź.
 """
 
 from __future__ import annotations
 
+import asyncio
+import threading
 import time
-from typing import Optional, Iterator
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
 
 try:
     import openai
@@ -15,6 +28,10 @@ except ImportError:
     _HAS_OPENAI = False
 
 from ..config import FixOsConfig
+from ..platform_utils import cache_dir
+from .cache import ResponseCache
+from .health import ProviderHealth, health_for
+from .ratelimit import RateLimiter, backoff_delay, estimate_tokens, limiter_for, retry_after
 
 
 class LLMError(Exception):
@@ -22,24 +39,201 @@ class LLMError(Exception):
     pass
 
 
-class LLMClient:
+_ATTEMPTS = 3
+# Próby u providera, po którym jest jeszcze zapasowy – zamiast czekać na
+# kolejne retry lepiej od razu zapytać następnego
+_FAILOVER_ATTEMPTS = 1
+# Próg hedgingu, dopóki nie ma dość pomiarów do p95
+_HEDGE_AFTER_DEFAULT = 8.0
+
+
+@dataclass
+class LLMUsage:
+    """Liczniki zużycia współdzielone przez klienta sync i async."""
+    total_tokens: int = 0
+    cache_hits: int = 0
+    tokens_saved: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, tokens: int = 0, cache_hits: int = 0, tokens_saved: int = 0) -> None:
+        with self._lock:
+            self.total_tokens += tokens
+            self.cache_hits += cache_hits
+            self.tokens_saved += tokens_saved
+
+
+@dataclass
+class _Backend:
+    """Provider z jego konfiguracją, limitem i stanem zdrowia (współdzielonymi w procesie)."""
+    config: FixOsConfig
+    limiter: RateLimiter
+    health: ProviderHealth
+
+    @classmethod
+    def of(cls, config: FixOsConfig) -> "_Backend":
+        return cls(config, limiter_for(config), health_for(config))
+
+    @property
+    def name(self) -> str:
+        return self.config.provider
+
+
+def _retry_delay(
+    error: Exception, attempt: int, attempts: int, config: FixOsConfig, limiter: RateLimiter
+) -> float:
     """
-    Wrapper nad openai.OpenAI kompatybilny z wieloma providerami.
-    Obsługuje retry, streaming i zbieranie tokenu zużycia.
+    Czas oczekiwania (s) przed kolejną próbą albo LLMError, gdy błąd jest
+    ostateczny lub wyczerpano `attempts` prób. Wspólne mapowanie błędów dla
+    obu klientów. Rate limit wstrzymuje cały limiter providera (kolejka
+    w acquire), więc zwracane jest wtedy 0.
+    """
+    _type = type(error).__name__
+    _mod = type(error).__module__
+    last = attempt >= attempts - 1
+    if _mod.startswith("openai") or _type in (
+        "AuthenticationError", "RateLimitError", "NotFoundError",
+        "APIConnectionError", "APITimeoutError",
+    ):
+        if _type == "AuthenticationError":
+            raise LLMError(f"Błąd autoryzacji – sprawdź klucz API: {error}") from error
+        if _type == "RateLimitError":
+            wait = backoff_delay(attempt + 1, retry_after(error))
+            limiter.penalize(wait)
+            if last:
+                raise LLMError("Rate limit – przekroczono liczbę prób") from error
+            print(f"\n  ⚠️  Rate limit – ponowienie za {wait:.0f}s...")
+            return 0.0
+        if _type == "NotFoundError":
+            raise LLMError(
+                f"Model '{config.model}' nie istnieje dla providera "
+                f"'{config.provider}': {error}"
+            ) from error
+        if _type == "APIConnectionError":
+            if last:
+                raise LLMError(f"Błąd połączenia z {config.base_url}: {error}") from error
+            return backoff_delay(attempt + 1)
+        if _type == "APITimeoutError":
+            if last:
+                raise LLMError("Timeout połączenia z API") from error
+            return backoff_delay(attempt + 1)
+    raise LLMError(f"Nieoczekiwany błąd API: {error}") from error
+
+
+class _ChatClientBase:
+    """
+    Część wspólna klientów: konfiguracja, providery (główny + zapasowe),
+    cache odpowiedzi, limity i liczniki.
     """
 
-    def __init__(self, config: FixOsConfig):
+    def __init__(
+        self,
+        config: FixOsConfig,
+        cache: Optional[ResponseCache] = None,
+        usage: Optional[LLMUsage] = None,
+    ):
         if not _HAS_OPENAI:
             raise LLMError("Zainstaluj openai: pip install openai")
 
         self.config = config
-        self._client = openai.OpenAI(
-            api_key=config.api_key or "ollama",  # ollama nie wymaga klucza
-            base_url=config.base_url,
-            timeout=120.0,
-            max_retries=2,
+        if cache is None and config.llm_cache:
+            cache = ResponseCache(cache_dir() / "llm-responses.sqlite", ttl=config.llm_cache_ttl)
+        self.cache = cache
+        self.usage = usage if usage is not None else LLMUsage()
+        self.backends = [_Backend.of(c) for c in (config, *config.fallback_configs())]
+        self.limiter = self.backends[0].limiter
+        self.health = self.backends[0].health
+
+    def _ordered(self) -> list[_Backend]:
+        """Providery w skonfigurowanej kolejności; wyłączone po serii błędów na końcu."""
+        return sorted(self.backends, key=lambda b: not b.health.available)
+
+    def _hedge_after(self, backend: _Backend) -> float:
+        return self.config.llm_hedge_after or backend.health.p95(_HEDGE_AFTER_DEFAULT)
+
+    @staticmethod
+    def _attempts(order: list[_Backend], index: int) -> int:
+        return _ATTEMPTS if index == len(order) - 1 else _FAILOVER_ATTEMPTS
+
+    def _cache_key(
+        self, messages: list[dict], max_tokens: int, temperature: float, cache: bool
+    ) -> Optional[str]:
+        # Klucz wg głównego providera – odpowiedź zapasowego zastępuje jego odpowiedź
+        if not cache or self.cache is None or not self.cache.cacheable(temperature):
+            return None
+        return self.cache.key(
+            self.config.provider, self.config.model, messages,
+            base_url=self.config.base_url, max_tokens=max_tokens, temperature=temperature,
         )
-        self._total_tokens = 0
+
+    def _lookup(self, key: str) -> Optional[str]:
+        hit = self.cache.get(key)
+        if hit is None:
+            return None
+        self.usage.add(cache_hits=1, tokens_saved=hit[1])
+        return hit[0]
+
+    def _store(self, key: Optional[str], response, backend: _Backend, estimated: int = 0) -> str:
+        """Zlicza tokeny odpowiedzi, zapisuje ją w cache i zwraca treść."""
+        tokens = response.usage.total_tokens if response.usage else 0
+        self.usage.add(tokens=tokens)
+        if estimated and isinstance(tokens, int):
+            backend.limiter.settle(estimated, tokens)
+        content = response.choices[0].message.content or ""
+        if key is not None and content:
+            self.cache.put(key, content, tokens)
+        return content
+
+    @staticmethod
+    def _failover_notice(failed: _Backend, error: LLMError, order: list[_Backend], index: int) -> None:
+        if index < len(order):
+            print(f"\n  ⚠️  {failed.name}: {error} – przełączam na {order[index].name}")
+
+    @property
+    def total_tokens(self) -> int:
+        return self.usage.total_tokens
+
+    @property
+    def cache_hits(self) -> int:
+        return self.usage.cache_hits
+
+    @property
+    def tokens_saved(self) -> int:
+        """Tokeny, których nie trzeba było zużyć dzięki cache odpowiedzi."""
+        return self.usage.tokens_saved
+
+    def usage_summary(self) -> str:
+        """Np. "~1200 tokenów (cache: 3 trafień, ~900 zaoszczędzonych)"."""
+        text = f"~{self.usage.total_tokens} tokenów"
+        if self.usage.cache_hits:
+            text += f" (cache: {self.usage.cache_hits} trafień, ~{self.usage.tokens_saved} zaoszczędzonych)"
+        return text
+
+    def health_report(self) -> dict[str, dict]:
+        """Stan zdrowia każdego skonfigurowanego providera."""
+        return {b.name: b.health.snapshot() for b in self.backends}
+
+
+class LLMClient(_ChatClientBase):
+    """
+    Wrapper nad openai.OpenAI kompatybilny z wieloma providerami.
+    Obsługuje retry, failover i hedging między providerami, limity RPM/TPM,
+    streaming, zbieranie tokenu zużycia i opcjonalny cache odpowiedzi
+    (LLM_CACHE=true lub jawnie przekazany `cache`).
+    """
+
+    def __init__(self, config: FixOsConfig, cache: Optional[ResponseCache] = None):
+        super().__init__(config, cache)
+        self._clients = {
+            b.name: openai.OpenAI(
+                api_key=b.config.api_key or "ollama",  # ollama nie wymaga klucza
+                base_url=b.config.base_url,
+                timeout=120.0,
+                max_retries=2,
+            )
+            for b in self.backends
+        }
+        self._client = self._clients[config.provider]
+        self._async: Optional[AsyncLLMClient] = None
 
     def chat(
         self,
@@ -48,60 +242,118 @@ class LLMClient:
         max_tokens: int = 3000,
         temperature: float = 0.3,
         stream: bool = False,
+        cache: bool = True,
     ) -> str:
         """
         Wysyła wiadomości do LLM i zwraca odpowiedź jako string.
-        Automatycznie retry przy rate limit / timeout.
+        Automatycznie retry przy rate limit / timeout, potem failover do
+        zapasowych providerów. Wywołania o niskiej temperaturze korzystają
+        z cache odpowiedzi (o ile jest włączony).
         """
-        for attempt in range(3):
+        key = self._cache_key(messages, max_tokens, temperature, cache)
+        if key is not None:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+
+        estimated = estimate_tokens(messages, max_tokens)
+        request = (messages, max_tokens, temperature, key, estimated)
+        order = self._ordered()
+        errors: list[LLMError] = []
+        i = 0
+        while i < len(order):
+            backend = order[i]
+            hedge = self.config.llm_hedge and i + 1 < len(order)
             try:
-                response = self._client.chat.completions.create(
-                    model=self.config.model,
+                if hedge:
+                    return self._hedged(
+                        backend, order[i + 1], self._attempts(order, i + 1), *request
+                    )
+                return self._call(backend, self._attempts(order, i), *request)
+            except LLMError as e:
+                errors.append(e)
+                i += 2 if hedge else 1
+                self._failover_notice(backend, e, order, i)
+        raise errors[0]
+
+    def _call(
+        self,
+        backend: _Backend,
+        attempts: int,
+        messages: list[dict],
+        max_tokens: int,
+        temperature: float,
+        key: Optional[str],
+        estimated: int,
+    ) -> str:
+        client = self._clients[backend.name]
+        for attempt in range(attempts):
+            backend.limiter.acquire(estimated)
+            started = time.monotonic()
+            try:
+                response = client.chat.completions.create(
+                    model=backend.config.model,
                     messages=messages,
                     max_tokens=max_tokens,
                     temperature=temperature,
                     stream=False,
                 )
-                if response.usage:
-                    self._total_tokens += response.usage.total_tokens
+                content = self._store(key, response, backend, estimated)
+            except Exception as e:
+                backend.health.record_failure()
+                delay = _retry_delay(e, attempt, attempts, backend.config, backend.limiter)
+                if delay:
+                    time.sleep(delay)
+                continue
+            backend.health.record_success(time.monotonic() - started)
+            return content
 
-                content = response.choices[0].message.content or ""
-                return content
+        raise LLMError(f"Nie udało się uzyskać odpowiedzi po {attempts} próbach")
 
-            except Exception as e:
-                _type = type(e).__name__
-                _mod = type(e).__module__
-                if _mod.startswith("openai") or _type in (
-                    "AuthenticationError", "RateLimitError", "NotFoundError",
-                    "APIConnectionError", "APITimeoutError",
-                ):
-                    if _type == "AuthenticationError":
-                        raise LLMError(f"Błąd autoryzacji – sprawdź klucz API: {e}") from e
-                    if _type == "RateLimitError":
-                        wait = 10 * (attempt + 1)
-                        print(f"\n  ⚠️  Rate limit – czekam {wait}s...")
-                        time.sleep(wait)
-                        if attempt == 2:
-                            raise LLMError("Rate limit – przekroczono liczbę prób")
-                        continue
-                    if _type == "NotFoundError":
-                        raise LLMError(
-                            f"Model '{self.config.model}' nie istnieje dla providera "
-                            f"'{self.config.provider}': {e}"
-                        ) from e
-                    if _type == "APIConnectionError":
-                        if attempt == 2:
-                            raise LLMError(f"Błąd połączenia z {self.config.base_url}: {e}") from e
-                        time.sleep(5)
-                        continue
-                    if _type == "APITimeoutError":
-                        if attempt == 2:
-                            raise LLMError("Timeout połączenia z API")
-                        time.sleep(5)
-                        continue
-                raise LLMError(f"Nieoczekiwany błąd API: {e}") from e
-
-        raise LLMError("Nie udało się uzyskać odpowiedzi po 3 próbach")
+    def _hedged(self, primary: _Backend, alt: _Backend, alt_attempts: int, *request) -> str:
+        """
+        Zapytanie do `primary`; gdy nie odpowie w czasie p95 (lub od razu
+        zawiedzie), to samo idzie do `alt`. Wygrywa pierwsza udana odpowiedź,
+        wątek przegranego kończy się w tle.
+        """
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fixos-hedge")
+        try:
+            first = pool.submit(self._call, primary, _FAILOVER_ATTEMPTS, *request)
+            error: Optional[BaseException] = None
+            try:
+                return first.result(timeout=self._hedge_after(primary))
+            except FutureTimeout:
+                pending = {first}
+            except LLMError as e:
+                error, pending = e, set()
+            pending.add(pool.submit(self._call, alt, alt_attempts, *request))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            pool.shutdown(wait=False)
+
+    async def achat(
+        self,
+        messages: list[dict],
+        *,
+        max_tokens: int = 3000,
+        temperature: float = 0.3,
+        cache: bool = True,
+    ) -> str:
+        """
+        chat() bez blokowania pętli asyncio – przez AsyncLLMClient
+        (współdzielone połączenia, ten sam cache i liczniki tokenów).
+        """
+        if self._async is None:
+            self._async = AsyncLLMClient(self.config, cache=self.cache, usage=self.usage)
+        return await self._async.chat(
+            messages, max_tokens=max_tokens, temperature=temperature, cache=cache
+        )
 
     def chat_stream(
         self,
@@ -110,10 +362,12 @@ class LLMClient:
         max_tokens: int = 3000,
         temperature: float = 0.3,
     ) -> Iterator[str]:
-        """Generator streamujący tokeny odpowiedzi."""
+        """Generator streamujący tokeny odpowiedzi (pierwszy dostępny provider)."""
+        backend = self._ordered()[0]
+        backend.limiter.acquire(estimate_tokens(messages, max_tokens))
         try:
-            stream = self._client.chat.completions.create(
-                model=self.config.model,
+            stream = self._clients[backend.name].chat.completions.create(
+                model=backend.config.model,
                 messages=messages,
                 max_tokens=max_tokens,
                 temperature=temperature,
@@ -126,17 +380,209 @@ class LLMClient:
         except Exception as e:
             raise LLMError(f"Błąd streamingu: {e}") from e
 
-    @property
-    def total_tokens(self) -> int:
-        return self._total_tokens
-
     def ping(self) -> bool:
-        """Sprawdza czy API odpowiada (krótki test)."""
+        """Sprawdza czy API odpowiada (krótki test, z pominięciem cache)."""
         try:
             self.chat(
                 [{"role": "user", "content": "ping"}],
                 max_tokens=5,
+                cache=False,
             )
             return True
         except LLMError:
             return False
+
+
+# ═══════════════════════════════════════════════════════════
+#  KLIENT ASYNCHRONICZNY
+# ═══════════════════════════════════════════════════════════
+
+@dataclass
+class _LoopPools:
+    """Zasoby współdzielone w obrębie jednej pętli asyncio."""
+    http: dict[str, Any] = field(default_factory=dict)              # base_url → klient httpx
+    limits: dict[str, asyncio.Semaphore] = field(default_factory=dict)  # provider → limit
+
+# Klienty httpx i semafory są związane z pętlą, w której powstały
+_POOLS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopPools]" = weakref.WeakKeyDictionary()
+
+
+def _loop_pools() -> _LoopPools:
+    loop = asyncio.get_running_loop()
+    pools = _POOLS.get(loop)
+    if pools is None:
+        pools = _POOLS[loop] = _LoopPools()
+    return pools
+
+
+async def aclose_pools() -> None:
+    """Zamyka połączenia HTTP współdzielone w bieżącej pętli asyncio."""
+    pools = _POOLS.pop(asyncio.get_running_loop(), None)
+    if pools is not None:
+        for http in pools.http.values():
+            await http.aclose()
+
+
+class AsyncLLMClient(_ChatClientBase):
+    """
+    Klient asynchroniczny (openai.AsyncOpenAI) do równoległych zapytań.
+
+    Połączenia HTTP (keep-alive) są współdzielone przez wszystkie klienty
+    z tym samym base_url w danej pętli asyncio. Liczbę zapytań w locie
+    ogranicza semafor per provider (`max_concurrency`, domyślnie
+    LLM_MAX_CONCURRENCY) – rozmiar ustala pierwszy klient danego providera.
+    Retry, failover, hedging i mapowanie błędów na LLMError jak w LLMClient.chat().
+    """
+
+    def __init__(
+        self,
+        config: FixOsConfig,
+        cache: Optional[ResponseCache] = None,
+        max_concurrency: Optional[int] = None,
+        usage: Optional[LLMUsage] = None,
+    ):
+        super().__init__(config, cache, usage)
+        self.max_concurrency = max_concurrency or config.llm_max_concurrency
+        # pętla asyncio → {provider → AsyncOpenAI}
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _client(self, backend: _Backend):
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        client = clients.get(backend.name)
+        if client is None:
+            cfg = backend.config
+            pools = _loop_pools()
+            http = pools.http.get(cfg.base_url)
+            if http is None:
+                http = pools.http[cfg.base_url] = openai.DefaultAsyncHttpxClient()
+            client = clients[backend.name] = openai.AsyncOpenAI(
+                api_key=cfg.api_key or "ollama",
+                base_url=cfg.base_url,
+                timeout=120.0,
+                max_retries=2,
+                http_client=http,
+            )
+        return client
+
+    def _limit(self, backend: _Backend) -> asyncio.Semaphore:
+        limits = _loop_pools().limits
+        sem = limits.get(backend.name)
+        if sem is None:
+            sem = limits[backend.name] = asyncio.Semaphore(self.max_concurrency)
+        return sem
+
+    async def chat(
+        self,
+        messages: list[dict],
+        *,
+        max_tokens: int = 3000,
+        temperature: float = 0.3,
+        cache: bool = True,
+    ) -> str:
+        """Asynchroniczny odpowiednik LLMClient.chat()."""
+        key = self._cache_key(messages, max_tokens, temperature, cache)
+        if key is not None:
+            cached = await asyncio.to_thread(self._lookup, key)
+            if cached is not None:
+                return cached
+
+        estimated = estimate_tokens(messages, max_tokens)
+        request = (messages, max_tokens, temperature, key, estimated)
+        order = self._ordered()
+        errors: list[LLMError] = []
+        i = 0
+        while i < len(order):
+            backend = order[i]
+            hedge = self.config.llm_hedge and i + 1 < len(order)
+            try:
+                if hedge:
+                    return await self._hedged(
+                        backend, order[i + 1], self._attempts(order, i + 1), *request
+                    )
+                return await self._call(backend, self._attempts(order, i), *request)
+            except LLMError as e:
+                errors.append(e)
+                i += 2 if hedge else 1
+                self._failover_notice(backend, e, order, i)
+        raise errors[0]
+
+    async def _call(
+        self,
+        backend: _Backend,
+        attempts: int,
+        messages: list[dict],
+        max_tokens: int,
+        temperature: float,
+        key: Optional[str],
+        estimated: int,
+    ) -> str:
+        client = self._client(backend)
+        for attempt in range(attempts):
+            await backend.limiter.aacquire(estimated)
+            started = time.monotonic()
+            try:
+                async with self._limit(backend):
+                    response = await client.chat.completions.create(
+                        model=backend.config.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stream=False,
+                    )
+                if key is None:
+                    content = self._store(None, response, backend, estimated)
+                else:
+                    content = await asyncio.to_thread(self._store, key, response, backend, estimated)
+            except Exception as e:
+                backend.health.record_failure()
+                delay = _retry_delay(e, attempt, attempts, backend.config, backend.limiter)
+                if delay:
+                    await asyncio.sleep(delay)
+                continue
+            backend.health.record_success(time.monotonic() - started)
+            return content
+
+        raise LLMError(f"Nie udało się uzyskać odpowiedzi po {attempts} próbach")
+
+    async def _hedged(self, primary: _Backend, alt: _Backend, alt_attempts: int, *request) -> str:
+        """Asynchroniczny odpowiednik LLMClient._hedged() – przegrany jest anulowany."""
+        first = asyncio.ensure_future(self._call(primary, _FAILOVER_ATTEMPTS, *request))
+        pending = {first}
+        error: Optional[BaseException] = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self._hedge_after(primary))
+            if done:
+                if first.exception() is None:
+                    return first.result()
+                error = first.exception()
+            pending.add(asyncio.ensure_future(self._call(alt, alt_attempts, *request)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def chat_many(
+        self,
+        requests: list[list[dict]],
+        *,
+        max_tokens: int = 3000,
+        temperature: float = 0.3,
+    ) -> list[str | LLMError]:
+        """
+        Wiele niezależnych zapytań naraz (w granicach limitu providera).
+        Wyniki w kolejności zapytań; nieudane jako LLMError zamiast wyjątku.
+        """
+        async def one(messages: list[dict]) -> str | LLMError:
+            try:
+                return await self.chat(messages, max_tokens=max_tokens, temperature=temperature)
+            except LLMError as e:
+                return e
+
+        return list(await asyncio.gather(*(one(m) for m in requests)))
@@ -0,0 +1,238 @@
+"""
+Pakowanie danych do promptu w budżecie tokenów.
+
+Zamiast obcinać dane na ślepo (`tekst[:6000]`), pola diagnostyki są
+oceniane pod kątem sygnału (linie z błędami, nieudane jednostki, niepuste
+wyniki) i wybierane zachłannie, od najcenniejszych, aż do wyczerpania
+budżetu. Długie teksty są skracane wierszami: najpierw linie z błędami
+i ostrzeżeniami, potem początek i koniec, z zachowaniem kolejności.
+Puste pola nie trafiają do promptu wcale.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from ..config import PROVIDER_DEFAULTS, FixOsConfig
+from ..utils.anonymizer import anonymize
+
+# Przybliżenie dla tokenizerów BPE: ~4 znaki na token
+CHARS_PER_TOKEN = 4
+
+_ERROR_RX = re.compile(
+    r"error|fail|fatal|panic|denied|segfault|oom|out of memory|critical|corrupt|refused|"
+    r"traceback|exception|cannot|unable|błąd|nie udało|odmowa",
+    re.IGNORECASE,
+)
+_WARNING_RX = re.compile(
+    r"warn|missing|not found|no such|inactive|dead|blocked|degraded|timed? ?out|"
+    r"invalid|disabled|brak|ostrzeżenie",
+    re.IGNORECASE,
+)
+# Klucze, których wartości zwykle niosą diagnozę
+_SIGNAL_KEY_RX = re.compile(r"fail|error|err\b|journal|dmesg|log|status|rfkill|blocked", re.IGNORECASE)
+_EMPTY = {"", "(brak)", "(puste)", "(brak outputu)", "n/a", "none", "null", "[]", "{}"}
+
+
+def count_tokens(text: str) -> int:
+    """Szacunkowa liczba tokenów tekstu."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def line_signal(line: str) -> int:
+    """Waga linii: 3 za błąd, 1 za ostrzeżenie, 0 dla zwykłej."""
+    if _ERROR_RX.search(line):
+        return 3
+    if _WARNING_RX.search(line):
+        return 1
+    return 0
+
+
+def condense(text: str, max_tokens: int) -> str:
+    """
+    Skraca tekst do ~`max_tokens` tokenów, zachowując linie o największym
+    sygnale. Kolejność linii jest zachowana, pominięte fragmenty zastępuje
+    znacznik "… (pominięto N linii)".
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens * CHARS_PER_TOKEN
+    lines = text.splitlines()
+    last = len(lines) - 1
+    # Błędy najpierw; wśród równych początek (nagłówki) i koniec (wynik końcowy)
+    ranked = sorted(
+        range(len(lines)),
+        key=lambda i: (-line_signal(lines[i]), 0 if i < 3 or i > last - 3 else 1, i),
+    )
+    reserve = min(budget // 10, 120)  # na znaczniki pominięć
+    chosen: dict[int, str] = {}
+    used = 0
+    for i in ranked:
+        line = lines[i]
+        room = budget - reserve - used
+        if len(line) + 1 > room:
+            # Zwykłą linię skracamy tylko, gdy inaczej nic by nie zostało
+            if room < 40 or (line_signal(line) == 0 and chosen and len(lines) > 1):
+                continue
+            line = line[: room - 2] + "…"
+        chosen[i] = line
+        used += len(line) + 1
+        if budget - reserve - used < 40:
+            break
+    out: list[str] = []
+    skipped = 0
+    for i in range(len(lines)):
+        if i in chosen:
+            if skipped:
+                out.append(f"… (pominięto {skipped} linii)")
+                skipped = 0
+            out.append(chosen[i])
+        else:
+            skipped += 1
+    if skipped:
+        out.append(f"… (pominięto {skipped} linii)")
+    return "\n".join(out)
+
+
+def excerpt(text: str, max_tokens: int, window: int = 8) -> str:
+    """
+    Zanonimizowany wycinek wyniku komendy mieszczący się w `max_tokens`.
+    Anonimizowane jest okno `window` razy większe od budżetu (początek
+    i koniec długiego wyniku, cięte na granicy linii), a potem skracane
+    przez condense() – dzięki temu błędy z końca logu nie giną.
+    """
+    if not text:
+        return ""
+    limit = max_tokens * CHARS_PER_TOKEN * window
+    if len(text) > limit:
+        head = text[: limit // 2].rsplit("\n", 1)[0]
+        tail = text[-(limit // 2):].split("\n", 1)[-1]
+        text = f"{head}\n… (pominięto {len(text) - len(head) - len(tail)} znaków)\n{tail}"
+    anon, _ = anonymize(text)
+    return condense(anon, max_tokens)
+
+
+def context_budget(config: FixOsConfig, reserve: int = 3000) -> int:
+    """
+    Budżet tokenów na dane w prompcie: `config.prompt_tokens`, ale nie
+    więcej niż pozwala okno kontekstu modelu (po odjęciu `reserve` na
+    instrukcje i odpowiedź) ani połowa minutowego limitu TPM providera.
+    """
+    pdef = PROVIDER_DEFAULTS.get(config.provider, {})
+    budget = config.prompt_tokens
+    if pdef.get("context"):
+        budget = min(budget, pdef["context"] - reserve)
+    tpm = config.llm_tpm if config.llm_tpm is not None else pdef.get("tpm")
+    if tpm:
+        budget = min(budget, tpm // 2)
+    return max(256, budget)
+
+
+# ═══════════════════════════════════════════════════════════
+#  PAKOWANIE DIAGNOSTYKI
+# ═══════════════════════════════════════════════════════════
+
+@dataclass
+class PromptField:
+    """Liść drzewa diagnostyki z oceną sygnału."""
+    path: tuple
+    value: Any
+    text: str
+    tokens: int
+    score: float
+
+
+class PromptPacker:
+    """
+    Zachłanne wypełnianie budżetu polami diagnostyki wg ich sygnału.
+
+    Pola o najwyższej ocenie trafiają w całości; gdy pole się nie mieści,
+    a niesie sygnał (błędy/ostrzeżenia), jest skracane przez condense().
+    Po `pack()` dostępne są `used` (tokeny) i `omitted` (pominięte ścieżki).
+    """
+
+    def __init__(self, budget: int, min_field_tokens: int = 32):
+        self.budget = budget
+        self.min_field_tokens = min_field_tokens
+        self.used = 0
+        self.omitted: list[str] = []
+
+    def fields(self, data: Any) -> list[PromptField]:
+        """Niepuste liście drzewa z oceną (kolejność jak w danych)."""
+        out: list[PromptField] = []
+        self._collect(data, (), out)
+        return out
+
+    def pack(self, data: dict) -> dict:
+        """Podzbiór drzewa (ta sama struktura) mieszczący się w budżecie."""
+        fields = self.fields(data)
+        self.used = 0
+        self.omitted = []
+        chosen: dict[tuple, Any] = {}
+        for f in sorted(fields, key=lambda f: (-f.score, f.tokens)):
+            overhead = count_tokens(json.dumps(f.path[-1:], ensure_ascii=False)) + 1
+            room = self.budget - self.used - overhead
+            if f.tokens <= room:
+                chosen[f.path] = f.value
+                self.used += f.tokens + overhead
+            elif isinstance(f.value, str) and f.score > 1 and room >= self.min_field_tokens:
+                chosen[f.path] = condense(f.value, room)
+                self.used += count_tokens(chosen[f.path]) + overhead
+            else:
+                self.omitted.append(".".join(map(str, f.path)))
+        packed = self._select(data, (), chosen)
+        return packed if isinstance(packed, dict) else {}
+
+    def pack_json(self, data: dict) -> str:
+        return json.dumps(self.pack(data), ensure_ascii=False, default=str)
+
+    # ── wewnętrzne ─────────────────────────────────────────
+
+    def _collect(self, node: Any, path: tuple, out: list[PromptField]) -> None:
+        if isinstance(node, dict):
+            for key, value in node.items():
+                self._collect(value, path + (key,), out)
+            return
+        if isinstance(node, list) and any(isinstance(v, (dict, list)) for v in node):
+            for i, value in enumerate(node):
+                self._collect(value, path + (i,), out)
+            return
+        text = node if isinstance(node, str) else json.dumps(node, ensure_ascii=False, default=str)
+        if text.strip().lower() in _EMPTY:
+            return
+        out.append(PromptField(path, node, text, count_tokens(text), _field_score(path, text)))
+
+    def _select(self, node: Any, path: tuple, chosen: dict[tuple, Any]) -> Any:
+        if path in chosen:
+            return chosen[path]
+        if isinstance(node, dict):
+            picked = {}
+            for key, value in node.items():
+                sub = self._select(value, path + (key,), chosen)
+                if sub is not _MISSING:
+                    picked[key] = sub
+            return picked or _MISSING
+        if isinstance(node, list):
+            picked = [
+                sub for i, value in enumerate(node)
+                if (sub := self._select(value, path + (i,), chosen)) is not _MISSING
+            ]
+            return picked or _MISSING
+        return _MISSING
+
+
+_MISSING = object()
+
+
+def _field_score(path: tuple, text: str) -> float:
+    score = 1.0
+    signal = sum(line_signal(line) for line in text.splitlines())
+    score += min(10, signal)
+    names = [p for p in path if isinstance(p, str)]
+    if names and _SIGNAL_KEY_RX.search(names[-1]):
+        score += 2
+    return score
+
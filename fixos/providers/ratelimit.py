@@ -0,0 +1,167 @@
+"""
+RateLimiter – budżet zapytań i tokenów na minutę per provider.
+
+Zamiast czekać "na ślepo" po błędzie 429, klient rezerwuje miejsce w dwóch
+kubełkach tokenów (RPM – zapytania, TPM – tokeny) przed każdym zapytaniem.
+Rezerwacje są kolejkowane: gdy budżet się wyczerpie, kolejni wywołujący
+dostają coraz dalsze terminy startu, a nie wszyscy naraz ten sam.
+Podpowiedź serwera (Retry-After) wstrzymuje cały limiter providera –
+dotyczy to wszystkich klientów w procesie, które go współdzielą.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import Optional
+
+from ..config import PROVIDER_DEFAULTS, FixOsConfig
+from .prompt import count_tokens
+
+
+class TokenBucket:
+    """
+    Kubełek uzupełniany w tempie `per_minute / 60` na sekundę, o pojemności
+    `burst` (domyślnie minutowy budżet). Poziom może spaść poniżej zera –
+    dług to kolejka oczekujących rezerwacji.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None, now: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or per_minute)
+        self._level = self.capacity
+        self._stamp = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Rezerwuje `amount` i zwraca, ile sekund trzeba poczekać na start."""
+        self._refill(now)
+        # Większe niż pojemność nigdy by się nie zmieściło – liczymy jako pełny kubełek
+        self._level -= min(amount, self.capacity)
+        return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def refund(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self._level = min(self.capacity, self._level + amount)
+
+
+class RateLimiter:
+    """Limity RPM/TPM jednego providera (None = bez limitu), bezpieczne wątkowo."""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        now = time.monotonic()
+        self.requests = TokenBucket(rpm, now=now) if rpm else None
+        self.tokens = TokenBucket(tpm, now=now) if tpm else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Rezerwuje jedno zapytanie i `tokens` tokenów; zwraca czas oczekiwania."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Czeka (blokująco) na swoją kolej."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        """Czeka na swoją kolej bez blokowania pętli asyncio."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Koryguje budżet TPM o różnicę między szacunkiem a faktycznym zużyciem."""
+        if self.tokens is None or actual == estimated:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if actual < estimated:
+                self.tokens.refund(estimated - actual, now)
+            else:
+                self.tokens.reserve(actual - estimated, now)
+
+    def penalize(self, delay: float) -> None:
+        """Wstrzymuje wszystkie rezerwacje na `delay` sekund (np. po 429)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+
+def estimate_tokens(messages: list[dict], max_tokens: int) -> int:
+    """Przybliżone zużycie: tokeny promptu + limit odpowiedzi."""
+    return sum(count_tokens(str(m.get("content", ""))) for m in messages) + max_tokens
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Podpowiedź serwera (retry-after-ms / Retry-After: sekundy lub data HTTP)."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if isinstance(value, str):
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+        if not isinstance(value, str):
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def backoff_delay(attempt: int, hint: Optional[float] = None, base: float = 2.0, cap: float = 60.0) -> float:
+    """
+    Opóźnienie przed kolejną próbą: podpowiedź serwera (+ do 10% rozrzutu),
+    a bez niej wykładniczy backoff z rozrzutem (połowa stała, połowa losowa).
+    """
+    if hint is not None:
+        return min(cap, hint) * (1 + random.uniform(0, 0.1))
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+_LIMITERS: dict[tuple[str, Optional[str]], RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def limiter_for(config: FixOsConfig) -> RateLimiter:
+    """
+    Limiter współdzielony przez wszystkie klienty danego providera i base_url
+    w procesie. Budżety z PROVIDER_DEFAULTS (rpm/tpm), nadpisywane przez
+    LLM_RPM / LLM_TPM (0 = bez limitu).
+    """
+    key = (config.provider, config.base_url)
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            pdef = PROVIDER_DEFAULTS.get(config.provider, {})
+            rpm = config.llm_rpm if config.llm_rpm is not None else pdef.get("rpm")
+            tpm = config.llm_tpm if config.llm_tpm is not None else pdef.get("tpm")
+            limiter = _LIMITERS[key] = RateLimiter(rpm or None, tpm or None)
+        return limiter
+
+
+def reset_limiters() -> None:
+    """Zapomina stan wszystkich limiterów (testy, zmiana konfiguracji)."""
+    with _LIMITERS_LOCK:
+        _LIMITERS.clear()
@@ -1,3 +1,9 @@
-from .anonymizer import anonymize, display_anonymized_preview, AnonymizationReport
+from .anonymizer import (
+    anonymize, anonymize_head, anonymize_stream, anonymize_tree, display_anonymized_preview,
+    AnonymizationCache, AnonymizationReport, StreamAnonymizer, anonymization_cache,
+)
 from .web_search import search_all, format_results_for_llm
-__all__ = ["anonymize", "display_anonymized_preview", "AnonymizationReport", "search_all", "format_results_for_llm"]
+__all__ = [
+    "anonymize", "anonymize_head", "anonymize_stream", "anonymize_tree", "display_anonymized_preview",
+    "AnonymizationCache", "AnonymizationReport", "StreamAnonymizer", "anonymization_cache", "search_all", "format_results_for_llm",
+]
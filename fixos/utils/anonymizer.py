@@ -4,13 +4,29 @@ Anonimizacja wrażliwych danych systemowych z podglądem dla użytkownika.
 
 from __future__ import annotations
 
-import re
-import socket
 import getpass
+import hashlib
+import json
 import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
 from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional
+
+from ..platform_utils import cache_dir
 from .terminal import _C
 
+# Linie ramek podglądu (poza f-stringami – backslash w wyrażeniu f-stringa wymaga Pythona 3.12)
+_RULE_HEAVY = "\u2550" * 65
+_RULE_LIGHT = "\u2500" * 65
+
 
 @dataclass
 class AnonymizationReport:
@@ -31,7 +47,61 @@ class AnonymizationReport:
         return "\n".join(lines)
 
 
+# Wersja zestawu reguł – zmiana reguł musi unieważnić zapamiętane wyniki
+RULESET_VERSION = 1
+
+
+@dataclass(frozen=True)
+class _Rule:
+    """
+    Jeden etap anonimizacji: literał (str.replace) albo skompilowany regex.
+    Zastąpienie i zliczenie odbywa się w jednym przebiegu (count+replace / subn).
+    """
+    category: str
+    repl: str
+    pattern: Optional[re.Pattern] = None
+    literal: Optional[str] = None
+
+    def apply(self, text: str) -> tuple[str, int]:
+        if self.literal is not None:
+            if self.literal not in text:
+                return text, 0
+            return text.replace(self.literal, self.repl), text.count(self.literal)
+        return self.pattern.subn(self.repl, text)
+
+
+# Reguły niezależne od hosta – kompilowane raz przy imporcie
+_HOME_PATHS = _Rule("Ścieżki /home", "/home/[USER]/...", re.compile(r"/home/(?!\[USER\])[^\s\"'\\]+"))
+_GENERIC_RULES: tuple[_Rule, ...] = (
+    # Adresy IPv4 (zachowaj 2 pierwsze oktety)
+    _Rule("Adresy IPv4", r"\1.XXX.XXX", re.compile(r"\b(\d{1,3}\.\d{1,3})\.\d{1,3}\.\d{1,3}\b")),
+    _Rule("Adresy MAC", "XX:XX:XX:XX:XX:XX", re.compile(r"\b([0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}\b")),
+    # Tokeny API (sk-, xai-, AIzaSy-, Bearer)
+    _Rule(
+        "Tokeny API", "[API_TOKEN_REDACTED]",
+        re.compile(r"(?<![A-Za-z0-9])(?:sk-|xai-|AIzaSy[A-Za-z0-9_-]+|Bearer\s+)[A-Za-z0-9\-_.]{15,}"),
+    ),
+    # Hasła/sekrety w zmiennych
+    _Rule(
+        "Hasła/sekrety", r"\1=[REDACTED]",
+        re.compile(r"(?i)(password|passwd|secret|token|api_key|apikey|auth)\s*[=:]\s*\S+"),
+    ),
+    # UUIDs (mogą identyfikować sprzęt)
+    _Rule(
+        "UUID (serial/hardware)", "[UUID-REDACTED]",
+        re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"),
+    ),
+    # Serial numbers (typowy format np. PF1234567)
+    _Rule(
+        "Numery seryjne", "Serial: [SERIAL-REDACTED]",
+        re.compile(r"\b(?:S/N|Serial|SN)[\s:]+[A-Z0-9]{6,20}\b", re.IGNORECASE),
+    ),
+)
+
+
+@lru_cache(maxsize=1)
 def _get_sensitive() -> dict:
+    """Hostname/użytkownik/katalog domowy – stałe w obrębie procesu."""
     result = {}
     try:
         result["hostname"] = socket.gethostname()
@@ -48,6 +118,200 @@ def _get_sensitive() -> dict:
     return result
 
 
+@lru_cache(maxsize=1)
+def _rules() -> tuple[_Rule, ...]:
+    """
+    Pełny potok reguł w kolejności stosowania. Kolejność ma znaczenie:
+    katalog domowy przed ścieżkami /home, ścieżki przed username.
+    """
+    sensitive = _get_sensitive()
+    rules: list[_Rule] = []
+    # 1. Hostname
+    if sensitive.get("hostname"):
+        rules.append(_Rule("Hostname", "[HOSTNAME]", literal=sensitive["hostname"]))
+    # 2. Katalog domowy (pełna ścieżka – PRZED zastąpieniem username)
+    if sensitive.get("home"):
+        rules.append(_Rule("Ścieżka domowa", "/home/[USER]", literal=sensitive["home"]))
+    # 3. Ścieżki /home/<user>/... – dowolna głębokość (po literalnym zastąpieniu)
+    rules.append(_HOME_PATHS)
+    # 4. Username (konkretna nazwa) – po zastąpieniu ścieżek
+    if sensitive.get("username"):
+        rules.append(_Rule(
+            "Username", "[USER]", re.compile(rf"\b{re.escape(sensitive['username'])}\b"),
+        ))
+    rules.extend(_GENERIC_RULES)
+    return tuple(rules)
+
+
+# ═══════════════════════════════════════════════════════════
+#  CACHE WYNIKÓW (LRU w pamięci + opcjonalnie SQLite)
+# ═══════════════════════════════════════════════════════════
+
+@lru_cache(maxsize=4)
+def _rules_fingerprint(rules: tuple[_Rule, ...]) -> str:
+    """Stabilny skrót reguł – zmiana hosta/użytkownika/reguł daje inny klucz."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(str(RULESET_VERSION).encode())
+    for rule in rules:
+        h.update(repr((rule.category, rule.repl, rule.literal,
+                       rule.pattern.pattern if rule.pattern else None)).encode())
+    return h.hexdigest()
+
+
+class AnonymizationCache:
+    """
+    Zapamiętane wyniki anonymize() kluczowane skrótem treści i wersji reguł.
+
+    W pamięci: LRU ograniczone liczbą wpisów i łączną długością tekstów.
+    Opcjonalnie na dysku (SQLite w ~/.cache/fixos) – przechowywany jest
+    wyłącznie tekst już zanonimizowany. Krótkie napisy (< `min_chars`)
+    nie są cache'owane – ich anonimizacja jest tańsza niż wpis.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_chars: int = 8_000_000,
+        min_chars: int = 256,
+        disk_path: Optional[Path] = None,
+        max_disk_entries: int = 2048,
+    ):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.disk_path = Path(disk_path) if disk_path else None
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[str, AnonymizationReport]] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def key(self, text: str) -> str:
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+        return f"{_rules_fingerprint(_rules())}:{digest}"
+
+    def get(self, key: str) -> Optional[tuple[str, AnonymizationReport]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], _copy_report(entry[1])
+        entry = self._disk_get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(key, entry)
+        return entry[0], _copy_report(entry[1])
+
+    def put(self, key: str, text: str, report: AnonymizationReport) -> None:
+        entry = (text, _copy_report(report))
+        self._remember(key, entry)
+        self._disk_put(key, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Liczniki do raportów/diagnostyki."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "chars": self._chars,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _remember(self, key: str, entry: tuple[str, AnonymizationReport]) -> None:
+        size = len(entry[0])
+        if size > self.max_chars:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._chars -= len(old[0])
+            self._entries[key] = entry
+            self._chars += size
+            while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted[0])
+
+    # ── dysk ────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.disk_path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, original_length INTEGER NOT NULL, "
+            "replacements TEXT NOT NULL, used_at REAL NOT NULL)"
+        )
+        return conn
+
+    def _disk_get(self, key: str) -> Optional[tuple[str, AnonymizationReport]]:
+        if self.disk_path is None:
+            return None
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute(
+                    "SELECT text, original_length, replacements FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE entries SET used_at = ? WHERE key = ?", (time.time(), key))
+        except (sqlite3.Error, OSError):
+            return None
+        text, original_length, replacements = row
+        return text, AnonymizationReport(original_length, len(text), json.loads(replacements))
+
+    def _disk_put(self, key: str, entry: tuple[str, AnonymizationReport]) -> None:
+        if self.disk_path is None:
+            return
+        text, report = entry
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (key, text, report.original_length, json.dumps(report.replacements), time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM entries WHERE key NOT IN "
+                    "(SELECT key FROM entries ORDER BY used_at DESC LIMIT ?)",
+                    (self.max_disk_entries,),
+                )
+        except (sqlite3.Error, OSError):
+            pass
+
+
+def _copy_report(report: AnonymizationReport) -> AnonymizationReport:
+    return AnonymizationReport(report.original_length, report.anonymized_length, dict(report.replacements))
+
+
+_CACHE: Optional[AnonymizationCache] = None
+
+
+def anonymization_cache() -> AnonymizationCache:
+    """
+    Cache współdzielony w procesie. Cache dyskowy włącza zmienna
+    ANONYMIZER_DISK_CACHE=true (domyślnie tylko pamięć).
+    """
+    global _CACHE
+    if _CACHE is None:
+        disk = os.environ.get("ANONYMIZER_DISK_CACHE", "false").lower() in ("1", "true", "yes")
+        _CACHE = AnonymizationCache(disk_path=cache_dir() / "anonymizer.sqlite" if disk else None)
+    return _CACHE
+
+
 def anonymize(data_str: str) -> tuple[str, AnonymizationReport]:
     """
     Anonimizuje wrażliwe dane.
@@ -58,82 +322,230 @@ def anonymize(data_str: str) -> tuple[str, AnonymizationReport]:
     if not isinstance(data_str, str):
         data_str = str(data_str)
 
-    report = AnonymizationReport(original_length=len(data_str))
-    sensitive = _get_sensitive()
+    cache = anonymization_cache()
+    key = cache.key(data_str) if len(data_str) >= cache.min_chars else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-    # 1. Hostname
-    if sensitive.get("hostname"):
-        count = data_str.count(sensitive["hostname"])
+    report = AnonymizationReport(original_length=len(data_str))
+    for rule in _rules():
+        data_str, count = rule.apply(data_str)
         if count:
-            data_str = data_str.replace(sensitive["hostname"], "[HOSTNAME]")
-            report.add("Hostname", count)
+            report.add(rule.category, count)
 
-    # 2. Katalog domowy (pełna ścieżka – PRZED zastąpieniem username)
-    if sensitive.get("home"):
-        count = data_str.count(sensitive["home"])
-        if count:
-            data_str = data_str.replace(sensitive["home"], "/home/[USER]")
-            report.add("Ścieżka domowa", count)
+    report.anonymized_length = len(data_str)
+    if key is not None:
+        cache.put(key, data_str, report)
+    return data_str, report
 
-    # 3. Ścieżki /home/<user>/... – dowolna głębokość (po literalnym zastąpieniu)
-    home_pattern = r"/home/(?!\[USER\])[^\s\"'\\]+"
-    matches = len(re.findall(home_pattern, data_str))
-    if matches:
-        data_str = re.sub(home_pattern, "/home/[USER]/...", data_str)
-        report.add("Ścieżki /home", matches)
 
-    # 4. Username (konkretna nazwa) – po zastąpieniu ścieżek
-    if sensitive.get("username"):
-        pattern = rf"\b{re.escape(sensitive['username'])}\b"
-        matches = len(re.findall(pattern, data_str))
-        if matches:
-            data_str = re.sub(pattern, "[USER]", data_str)
-            report.add("Username", matches)
-
-    # 5. Adresy IPv4 (zachowaj 2 pierwsze oktety)
-    ipv4_pattern = r"\b(\d{1,3}\.\d{1,3})\.\d{1,3}\.\d{1,3}\b"
-    matches = len(re.findall(ipv4_pattern, data_str))
-    if matches:
-        data_str = re.sub(ipv4_pattern, r"\1.XXX.XXX", data_str)
-        report.add("Adresy IPv4", matches)
-
-    # 6. Adresy MAC
-    mac_pattern = r"\b([0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}\b"
-    matches = len(re.findall(mac_pattern, data_str))
-    if matches:
-        data_str = re.sub(mac_pattern, "XX:XX:XX:XX:XX:XX", data_str)
-        report.add("Adresy MAC", matches)
-
-    # 7. Tokeny API (sk-, xai-, AIzaSy-, Bearer)
-    token_pattern = r"(?<![A-Za-z0-9])(?:sk-|xai-|AIzaSy[A-Za-z0-9_-]+|Bearer\s+)[A-Za-z0-9\-_.]{15,}"
-    matches = len(re.findall(token_pattern, data_str))
-    if matches:
-        data_str = re.sub(token_pattern, "[API_TOKEN_REDACTED]", data_str)
-        report.add("Tokeny API", matches)
-
-    # 8. Hasła/sekrety w zmiennych
-    secret_pattern = r"(?i)(password|passwd|secret|token|api_key|apikey|auth)\s*[=:]\s*\S+"
-    matches = len(re.findall(secret_pattern, data_str))
-    if matches:
-        data_str = re.sub(secret_pattern, r"\1=[REDACTED]", data_str)
-        report.add("Hasła/sekrety", matches)
-
-    # 9. UUIDs (mogą identyfikować sprzęt)
-    uuid_pattern = r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"
-    matches = len(re.findall(uuid_pattern, data_str))
-    if matches:
-        data_str = re.sub(uuid_pattern, "[UUID-REDACTED]", data_str)
-        report.add("UUID (serial/hardware)", matches)
-
-    # 10. Serial numbers (typowy format np. PF1234567)
-    serial_pattern = r"\b(?:S/N|Serial|SN)[\s:]+[A-Z0-9]{6,20}\b"
-    matches = len(re.findall(serial_pattern, data_str, re.IGNORECASE))
-    if matches:
-        data_str = re.sub(serial_pattern, "Serial: [SERIAL-REDACTED]", data_str, flags=re.IGNORECASE)
-        report.add("Numery seryjne", matches)
+# ═══════════════════════════════════════════════════════════
+#  ANONIMIZACJA STRUMIENIOWA
+# ═══════════════════════════════════════════════════════════
 
-    report.anonymized_length = len(data_str)
-    return data_str, report
+# Białe znaki, na których wolno ciąć strumień – żadna reguła nie przechodzi
+# przez nie, chyba że poprzedza je słowo kluczowe lub separator (poniżej)
+_WHITESPACE_RUN = re.compile(r"\s+")
+# Końcówki, po których dopasowanie może ciągnąć się przez białe znaki:
+# "password = x", "token:\n x", "Bearer abc…", "Serial: PF123…"
+_CONTINUES = re.compile(
+    r"(?i)(?:[=:]|bearer|serial|s/n|sn|password|passwd|secret|token|api_key|apikey|auth)$"
+)
+_CONTINUES_LOOKBACK = 16
+
+
+class StreamAnonymizer:
+    """
+    Przyrostowa anonimizacja tekstu podawanego w kawałkach.
+
+    Tekst jest przetwarzany do ostatniego "bezpiecznego" cięcia – serii
+    białych znaków, przez którą nie może przejść żadna reguła – a reszta
+    czeka na kolejny kawałek. Dzięki temu token czy adres IP rozcięty
+    między kawałkami jest maskowany tak samo jak przez anonymize().
+    Wynik jest identyczny z anonymize() na całości, o ile hostname/katalog
+    domowy nie zawierają spacji, a bufor nie przekroczy `max_pending`
+    (wtedy cięcie jest wymuszone).
+
+    Po osiągnięciu `max_chars` znaków wyniku strumień jest zamykany
+    (`done`) i dalsze kawałki nie są już przetwarzane.
+    """
+
+    BLOCK = 8192
+
+    def __init__(self, max_chars: Optional[int] = None, max_pending: int = 64 * 1024):
+        self.max_chars = max_chars
+        self.max_pending = max_pending
+        self.report = AnonymizationReport()
+        self.done = max_chars is not None and max_chars <= 0
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """Dodaje kawałek wejścia; zwraca zanonimizowany tekst gotowy do wysłania."""
+        out = []
+        # Duże kawałki dzielone na bloki – limit znaków przerywa pracę wcześnie
+        for start in range(0, len(chunk), self.BLOCK):
+            if self.done:
+                break
+            self._pending += chunk[start:start + self.BLOCK]
+            cut = _safe_cut(self._pending)
+            if cut is None and len(self._pending) > self.max_pending:
+                cut = len(self._pending)
+            if cut:
+                out.append(self._emit(self._pending[:cut]))
+                self._pending = self._pending[cut:]
+        return "".join(out)
+
+    def close(self) -> str:
+        """Przetwarza resztę bufora i kończy strumień."""
+        tail = "" if self.done else self._emit(self._pending)
+        self._pending = ""
+        self.done = True
+        return tail
+
+    def _emit(self, text: str) -> str:
+        self.report.original_length += len(text)
+        for rule in _rules():
+            text, count = rule.apply(text)
+            if count:
+                self.report.add(rule.category, count)
+        if self.max_chars is not None:
+            remaining = self.max_chars - self.report.anonymized_length
+            if len(text) >= remaining:
+                text = text[:remaining]
+                self.done = True
+        self.report.anonymized_length += len(text)
+        return text
+
+
+def _safe_cut(buf: str) -> Optional[int]:
+    """Pozycja za ostatnią serią białych znaków, przez którą nie przejdzie żadna reguła."""
+    for m in reversed(list(_WHITESPACE_RUN.finditer(buf))):
+        if m.end() == len(buf):
+            continue  # seria może ciągnąć się w następnym kawałku
+        if _CONTINUES.search(buf, max(0, m.start() - _CONTINUES_LOOKBACK), m.start()):
+            continue
+        return m.end()
+    return None
+
+
+def anonymize_stream(
+    chunks: Iterable[str],
+    max_chars: Optional[int] = None,
+    report: Optional[AnonymizationReport] = None,
+) -> Iterator[str]:
+    """
+    Anonimizuje strumień kawałków tekstu (np. linie journala, stdout komendy)
+    w stałej pamięci. Przestaje pobierać wejście po osiągnięciu `max_chars`
+    znaków wyniku. Liczniki trafiają do `report`, jeśli podano.
+    """
+    stream = StreamAnonymizer(max_chars)
+    if report is not None:
+        stream.report = report
+    for chunk in chunks:
+        piece = stream.feed(chunk)
+        if piece:
+            yield piece
+        if stream.done:
+            return
+    tail = stream.close()
+    if tail:
+        yield tail
+
+
+def anonymize_head(data_str: str, max_chars: int) -> tuple[str, AnonymizationReport]:
+    """
+    Pierwsze `max_chars` znaków zanonimizowanego tekstu – odpowiednik
+    `anonymize(data_str)[0][:max_chars]` bez anonimizowania całości.
+    """
+    if not isinstance(data_str, str):
+        data_str = str(data_str)
+    report = AnonymizationReport()
+    text = "".join(anonymize_stream([data_str], max_chars, report))
+    return text, report
+
+
+# ═══════════════════════════════════════════════════════════
+#  ANONIMIZACJA STRUKTUR (dict/list)
+# ═══════════════════════════════════════════════════════════
+
+def _anonymize_leaf(text: str, max_chars: Optional[int]) -> tuple[str, AnonymizationReport]:
+    """
+    Zanonimizowany liść + raport. Powtarzające się outputy sond trafiają do
+    AnonymizationCache (limit rozmiaru, klucz z wersją reguł) – przycięte
+    liście pod kluczem uzupełnionym o limit.
+    """
+    if max_chars is None:
+        return anonymize(text)
+    cache = anonymization_cache()
+    key = f"{cache.key(text)}:head{max_chars}" if len(text) >= cache.min_chars else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    anon, report = anonymize_head(text, max_chars)
+    if key is not None:
+        cache.put(key, anon, report)
+    return anon, report
+
+
+def anonymize_tree(
+    data,
+    max_leaf_chars: Optional[int] = None,
+    budgets: Optional[Mapping[str, int]] = None,
+) -> tuple[object, AnonymizationReport]:
+    """
+    Anonimizuje zagnieżdżone dane diagnostyczne bez budowania repr całości.
+
+    Przechodzi po dict/list i maskuje tylko napisy (wartości i klucze),
+    zapamiętując wyniki dla powtarzających się liści. Wynik nadaje się
+    do json.dumps(): krotki i zbiory stają się listami, nieznane obiekty
+    napisami.
+
+    Args:
+        max_leaf_chars: limit znaków każdego liścia (None = bez limitu)
+        budgets: limity dla liści pod danym kluczem, np. {"journal_errors_24h": 800};
+                 obowiązuje najbliższy klucz na ścieżce
+
+    Returns:
+        Tuple (zanonimizowana_struktura, raport)
+    """
+    report = AnonymizationReport()
+
+    def leaf(text: str, limit: Optional[int]) -> str:
+        anon, leaf_report = _anonymize_leaf(text, limit)
+        report.original_length += len(text)
+        report.anonymized_length += len(anon)
+        for category, count in leaf_report.replacements.items():
+            report.add(category, count)
+        return anon
+
+    def walk(node, limit: Optional[int]):
+        if isinstance(node, str):
+            return leaf(node, limit)
+        if node is None or isinstance(node, (bool, int, float)):
+            return node
+        if isinstance(node, dict):
+            out = {}
+            for key, value in node.items():
+                name = leaf(key if isinstance(key, str) else str(key), None)
+                # Różne ścieżki /home mogą po masce dać ten sam klucz
+                unique, n = name, 2
+                while unique in out:
+                    unique, n = f"{name} [{n}]", n + 1
+                child_limit = budgets.get(key, limit) if budgets and isinstance(key, str) else limit
+                out[unique] = walk(value, child_limit)
+            return out
+        if isinstance(node, (list, tuple)):
+            return [walk(item, limit) for item in node]
+        if isinstance(node, (set, frozenset)):
+            return [walk(item, limit) for item in sorted(node, key=str)]
+        if isinstance(node, bytes):
+            return leaf(node.decode("utf-8", errors="replace"), limit)
+        return leaf(str(node), limit)
+
+    return walk(data, max_leaf_chars), report
 
 
 def display_anonymized_preview(data_str: str, report: AnonymizationReport, max_lines: int = 80):
@@ -141,9 +553,9 @@ def display_anonymized_preview(data_str: str, report: AnonymizationReport, max_l
     Wyświetla użytkownikowi zanonimizowane dane przed wysłaniem do LLM.
     Formatuje jako czytelny markdown z kolorami ANSI.
     """
-    print(f"\n{_C.CYAN}{_C.BOLD}{'\u2550' * 65}{_C.RESET}")
+    print(f"\n{_C.CYAN}{_C.BOLD}{_RULE_HEAVY}{_C.RESET}")
     print(f"{_C.CYAN}{_C.BOLD}  📋 DANE DIAGNOSTYCZNE (zanonimizowane) – wysyłane do LLM{_C.RESET}")
-    print(f"{_C.CYAN}{_C.BOLD}{'\u2550' * 65}{_C.RESET}")
+    print(f"{_C.CYAN}{_C.BOLD}{_RULE_HEAVY}{_C.RESET}")
 
     formatted = _format_diagnostics_markdown(data_str)
 
@@ -170,12 +582,12 @@ def display_anonymized_preview(data_str: str, report: AnonymizationReport, max_l
             rendered = _colorize_md_line(line[:max_width - 3] + "...")
         print(f"  {rendered}")
 
-    print(f"\n{_C.DIM}{'\u2500' * 65}{_C.RESET}")
+    print(f"\n{_C.DIM}{_RULE_LIGHT}{_C.RESET}")
     print(f"{_C.BOLD}  🔒 Anonimizacja – co zostało ukryte:{_C.RESET}")
     for rep_line in report.summary().splitlines():
         print(f"{_C.GREEN}  {rep_line}{_C.RESET}")
     print(f"  {_C.DIM}Rozmiar: {report.original_length:,} → {report.anonymized_length:,} znaków{_C.RESET}")
-    print(f"{_C.DIM}{'\u2500' * 65}{_C.RESET}")
+    print(f"{_C.DIM}{_RULE_LIGHT}{_C.RESET}")
 
 
 def _colorize_md_line(line: str) -> str:
@@ -215,8 +627,17 @@ def _colorize_md_line(line: str) -> str:
 def _format_diagnostics_markdown(data_str: str) -> str:
     """Formatuje dane diagnostyczne jako czytelny markdown."""
     import ast
-    
-    # Próbuj sparsować jako dict
+    import json
+
+    # JSON z anonymize_tree()
+    try:
+        data = json.loads(data_str)
+        if isinstance(data, dict):
+            return _dict_to_markdown(data)
+    except ValueError:
+        pass
+
+    # Próbuj sparsować jako dict (repr)
     try:
         # Usuń 'zanonimizowane' znaczniki jeśli są
         clean = data_str.replace('[HOSTNAME]', 'HOSTNAME').replace('[USER]', 'USER')
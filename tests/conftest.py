@@ -33,6 +33,18 @@ def _has_real_token() -> bool:
 #  FIXTURES
 # ══════════════════════════════════════════════════════════
 
+@pytest.fixture(autouse=True)
+def _fresh_provider_state():
+    """Budżety RPM/TPM i stan zdrowia providerów są współdzielone w procesie."""
+    from fixos.providers.health import reset_health
+    from fixos.providers.ratelimit import reset_limiters
+    reset_limiters()
+    reset_health()
+    yield
+    reset_limiters()
+    reset_health()
+
+
 @pytest.fixture(scope="session")
 def real_api_available() -> bool:
     return _has_real_token()
@@ -275,3 +275,40 @@ class TestConfigCommands:
             assert result.exit_code == 0
             content = Path(".env").read_text()
             assert "AGENT_MODE=autonomous" in content
+
+
+class TestDiskAnalysisOptions:
+    """Testy opcji analizy dysku (--disc, --full-rescan)."""
+
+    def _analyzer(self):
+        from unittest.mock import MagicMock
+
+        analyzer = MagicMock()
+        analyzer.return_value.analyze_disk_usage.return_value = {
+            "usage_percent": 10.0, "used_gb": 1.0, "total_gb": 10.0, "free_gb": 9.0,
+            "status": "ok", "suggestions": [],
+        }
+        return analyzer
+
+    def test_disk_analysis_is_incremental_by_default(self):
+        from fixos.cli import _run_disk_analysis
+
+        analyzer = self._analyzer()
+        with patch("fixos.diagnostics.disk_analyzer.DiskAnalyzer", analyzer):
+            _run_disk_analysis({}, json_output=True)
+        assert analyzer.call_args.kwargs["incremental"] is True
+
+    def test_full_rescan_disables_index_reuse(self):
+        from fixos.cli import _run_disk_analysis
+
+        analyzer = self._analyzer()
+        data = {}
+        with patch("fixos.diagnostics.disk_analyzer.DiskAnalyzer", analyzer):
+            _run_disk_analysis(data, json_output=True, full_rescan=True)
+        assert analyzer.call_args.kwargs["incremental"] is False
+        assert data["disk_analysis"]["status"] == "ok"
+
+    def test_fix_accepts_full_rescan(self, runner):
+        result = runner.invoke(cli, ["fix", "--help"])
+        assert result.exit_code == 0
+        assert "--full-rescan" in result.output
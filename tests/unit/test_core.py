@@ -1,5 +1,5 @@
 """
-Testy jednostkowe – config, anonimizacja, web search.
+Testy jednostkowe – config, anonimizacja, web search, historia rozmowy agenta.
 """
 
 from __future__ import annotations
@@ -46,6 +46,24 @@ class TestConfig:
             cfg = FixOsConfig.load()
         assert cfg.agent_mode == "autonomous"
 
+    def test_llm_cache_off_by_default(self):
+        from fixos.config import FixOsConfig
+        with patch.dict(os.environ, {"LLM_CACHE_TTL": "60"}, clear=False):
+            os.environ.pop("LLM_CACHE", None)
+            cfg = FixOsConfig.load()
+        assert cfg.llm_cache is False
+        assert cfg.llm_cache_ttl == 60
+
+    def test_history_settings_from_env(self):
+        from fixos.config import FixOsConfig
+        env = {"AGENT_HISTORY_TURNS": "3", "AGENT_HISTORY_SUMMARY": "LLM"}
+        with patch.dict(os.environ, env, clear=False):
+            cfg = FixOsConfig.load()
+        assert cfg.history_turns == 3
+        assert cfg.history_summary == "llm"
+        cfg.history_summary = "magic"
+        assert any("AGENT_HISTORY_SUMMARY" in e for e in cfg.validate())
+
     def test_summary_masks_key(self):
         from fixos.config import FixOsConfig
         cfg = FixOsConfig(api_key="AIzaSyABCDEFGHIJKLMNOPQRSTUVWXYZ12345")
@@ -122,3 +140,99 @@ class TestWebSearch:
         from fixos.utils.web_search import _http_get
         result = _http_get("http://240.0.0.1/nonexistent", timeout=1)
         assert result is None
+
+
+class TestConversationHistory:
+    def _session(self, history, turns: int) -> list[int]:
+        sizes = []
+        for i in range(turns):
+            sizes.append(history.tokens())
+            history.add_assistant(f'{{"action": "EXEC", "command": "systemctl restart svc{i}", '
+                                  f'"analysis": "krok {i}"}}')
+            history.add_user(f"Wykonano: `systemctl restart svc{i}`\nSukces: True\n" + "log line\n" * 80)
+        return sizes
+
+    def test_context_replaced_by_digest_after_first_reply(self):
+        from fixos.agent.history import ConversationHistory
+        history = ConversationHistory("sys", context="FULL " * 1000, digest="DIGEST")
+        assert history.messages[1]["content"].startswith("FULL")
+        history.add_assistant("odpowiedź")
+        assert history.messages[0] == {"role": "system", "content": "sys"}
+        assert history.messages[1]["content"] == "DIGEST"
+        assert history.messages[2] == {"role": "assistant", "content": "odpowiedź"}
+
+    def test_prompt_size_stays_bounded(self):
+        from fixos.agent.history import ConversationHistory
+        history = ConversationHistory("sys", context="diag " * 2000, digest="skrót", keep_turns=3)
+        sizes = self._session(history, 30)
+        assert history.turns == 30
+        # Kompakcja partiami: rozmiar waha się w stałym przedziale, nie rośnie
+        assert max(sizes[20:]) < 1.2 * max(sizes[5:15])
+        assert max(sizes[1:]) < sizes[0]
+        # Ostatnie tury dosłownie, starsze w podsumowaniu
+        messages = history.messages
+        assert messages[-2]["content"].endswith('"analysis": "krok 29"}')
+        assert "systemctl restart svc0" not in " ".join(m["content"] for m in messages[2:])
+        assert "Podsumowanie wcześniejszej części sesji" in messages[1]["content"]
+        assert messages[2]["role"] == "assistant"
+
+    def test_local_summary_lines(self):
+        from fixos.agent.history import local_summary
+        summary = local_summary("", [
+            {"role": "assistant", "content": '{"action": "EXEC", "command": "dnf install sof-firmware", '
+                                             '"analysis": "brak firmware"}'},
+            {"role": "user", "content": "Wykonano: `dnf install sof-firmware`\nSukces: False"},
+        ])
+        assert summary.splitlines() == [
+            "- asystent: EXEC | dnf install sof-firmware | brak firmware",
+            "- użytkownik: Wykonano: `dnf install sof-firmware` Sukces: False",
+        ]
+        capped = local_summary(summary, [{"role": "user", "content": "x" * 150}] * 20, max_tokens=100)
+        assert capped.startswith("- … (")
+        assert len(capped) <= 100 * 4 + 60
+
+    def test_llm_summarizer_called_once_per_compaction(self):
+        from unittest.mock import MagicMock
+        from fixos.agent.history import ConversationHistory, llm_summarizer
+        from fixos.providers.llm import LLMError
+        llm = MagicMock()
+        llm.chat.return_value = "- zrestartowano usługi"
+        history = ConversationHistory("sys", context="diag", keep_turns=2, compact_every=2,
+                                      summarizer=llm_summarizer(llm))
+        self._session(history, 5)
+        assert llm.chat.call_count == 1
+        assert history.summary == "- zrestartowano usługi"
+
+        llm.chat.side_effect = LLMError("down")
+        self._session(history, 3)
+        assert llm.chat.call_count == 2
+        assert "svc" in history.summary  # podsumowanie lokalne jako fallback
+
+    def test_hitl_first_turn_within_prompt_budget(self, mock_config):
+        from unittest.mock import MagicMock
+        from fixos.agent.hitl import run_hitl_session
+        from fixos.providers.prompt import count_tokens
+
+        prompts = []
+
+        def capture(**kwargs):
+            prompts.append(kwargs["messages"][1]["content"])
+            resp = MagicMock()
+            resp.choices[0].message.content = "ok"
+            resp.usage.total_tokens = 10
+            return resp
+
+        mock_config.prompt_tokens = 300
+        diagnostics = {
+            "system": {"os_release": "NAME=Fedora", "packages": "pkg " * 20000},
+            "audio": {"journal": "\n".join(["routine"] * 3000 + ["pipewire: segfault in libspa"])},
+        }
+        with patch("fixos.providers.llm.openai") as mock_openai, \
+                patch("builtins.input", side_effect=["hello", "q"]):
+            mock_openai.OpenAI.return_value.chat.completions.create.side_effect = capture
+            run_hitl_session(diagnostics=diagnostics, config=mock_config, show_data=False)
+
+        assert len(prompts) == 2
+        assert "segfault in libspa" in prompts[0]
+        assert count_tokens(prompts[0]) < 300 + 100  # + instrukcje wokół danych
+        assert count_tokens(prompts[1]) < count_tokens(prompts[0])
@@ -0,0 +1,462 @@
+"""
+Testy jednostkowe – silnik sond diagnostycznych.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from unittest.mock import patch
+
+from fixos.diagnostics.engine import DEADLINE_MARKER, ProbeEngine
+from fixos.diagnostics.probes import PROBES, Probe, select_probes
+
+
+def _slow_runner(cmd: str, timeout: int) -> str:
+    time.sleep(0.2)
+    return f"out:{cmd}"
+
+
+class TestProbeEngine:
+    def test_run_registered_keeps_probe_order(self):
+        probes = [Probe("b", "two"), Probe("a", "one"), Probe("c", "three", timeout=5)]
+        with ProbeEngine(lambda c, t: c.upper()) as engine:
+            out = engine.run_registered(probes)
+        assert list(out) == ["b", "a", "c"]
+        assert out["c"] == "THREE"
+
+    def test_probes_run_concurrently(self):
+        probes = [Probe(f"k{i}", f"cmd{i}") for i in range(6)]
+        start = time.monotonic()
+        with ProbeEngine(_slow_runner, max_workers=6) as engine:
+            out = engine.run_registered(probes)
+        assert time.monotonic() - start < 0.6
+        assert out["k3"] == "out:cmd3"
+
+    def test_deadline_marks_unfinished_probes(self):
+        def runner(cmd, timeout):
+            time.sleep(2 if cmd == "slow" else 0)
+            return "ok"
+
+        with ProbeEngine(runner, deadline=0.3) as engine:
+            out = engine.run_registered([Probe("fast", "fast"), Probe("slow", "slow")])
+        assert out["fast"] == "ok"
+        assert out["slow"] == DEADLINE_MARKER
+
+    def test_probe_timeout_clamped_to_deadline(self):
+        seen = []
+        with ProbeEngine(lambda c, t: seen.append(t) or "", deadline=3) as engine:
+            engine.run_registered([Probe("x", "cmd", timeout=60)])
+        assert seen and seen[0] <= 3
+
+    def test_identical_commands_run_once(self):
+        calls = []
+        with ProbeEngine(lambda c, t: calls.append(c) or "ok") as engine:
+            engine.prefetch([Probe("a", "lsmod")])
+            out = engine.run_registered([Probe("b", "lsmod"), Probe("c", "uname -r")])
+        assert calls.count("lsmod") == 1
+        assert out == {"b": "ok", "c": "ok"}
+
+    def test_run_registered_respects_max_cost(self):
+        probes = [
+            Probe("cheap", "echo a", cost="cheap"),
+            Probe("heavy", "rpm -qa", cost="expensive"),
+        ]
+        with ProbeEngine(lambda c, t: c, max_cost="normal") as engine:
+            out = engine.run_registered(probes)
+        assert out == {"cheap": "echo a"}
+
+
+class TestProbeRegistry:
+    def test_every_probe_has_module(self):
+        assert all(p.module for p in PROBES)
+
+    def test_keys_unique_per_module_and_platform(self):
+        idents = [(p.module, p.key, p.platforms) for p in PROBES]
+        assert len(idents) == len(set(idents))
+
+    def test_select_by_module_and_platform(self):
+        probes = select_probes(["audio"], platform="Linux")
+        assert probes and all(p.module == "audio" for p in probes)
+        assert select_probes(["audio"], platform="Windows") == []
+
+    def test_platform_variants_share_key(self):
+        linux = {p.key for p in select_probes(["system"], platform="Linux")}
+        windows = {p.key for p in select_probes(["system"], platform="Windows")}
+        assert {"kernel", "os_release", "uptime"} <= linux & windows
+
+    def test_max_cost_filters_expensive(self):
+        probes = select_probes(["resources"], platform="Linux", max_cost="normal")
+        assert "large_files" not in {p.key for p in probes}
+        assert all(p.cost != "expensive" for p in probes)
+
+
+class TestFullDiagnostics:
+    def test_modules_run_concurrently_same_shape(self):
+        from fixos.diagnostics import system_checks
+
+        def slow_module():
+            time.sleep(0.3)
+            return {"value": "ok"}
+
+        modules = {
+            "a": ("A", slow_module),
+            "b": ("B", slow_module),
+            "c": ("C", slow_module),
+        }
+        calls = []
+        with patch.dict(system_checks.DIAGNOSTIC_MODULES, modules, clear=True):
+            start = time.monotonic()
+            data = system_checks.get_full_diagnostics(
+                progress_callback=lambda name, desc: calls.append(name)
+            )
+        assert time.monotonic() - start < 0.8
+        assert list(data) == ["a", "b", "c"]
+        assert data["b"] == {"value": "ok"}
+        assert calls == ["a", "b", "c"]
+
+    def test_module_error_captured(self):
+        from fixos.diagnostics import system_checks
+
+        def broken():
+            raise RuntimeError("boom")
+
+        with patch.dict(system_checks.DIAGNOSTIC_MODULES, {"x": ("X", broken)}, clear=True):
+            data = system_checks.get_full_diagnostics(progress_callback=lambda n, d: None)
+        assert data == {"x": {"error": "boom"}}
+
+    def test_module_probes_share_scan_engine(self):
+        from fixos.diagnostics import system_checks
+        from fixos.diagnostics.probes import Probe
+
+        def module():
+            return system_checks._run_registered("m")
+
+        probes = [Probe(key="echo", command="echo fixos_probe", module="m")]
+        with patch.dict(system_checks.DIAGNOSTIC_MODULES, {"m": ("M", module)}, clear=True), \
+                patch.object(system_checks, "select_probes", return_value=probes):
+            data = system_checks.get_full_diagnostics(progress_callback=lambda n, d: None)
+        assert data["m"]["echo"] == "fixos_probe"
+
+
+class TestSharedProbes:
+    def test_filters_match_shell_semantics(self):
+        from fixos.diagnostics.probes import fields, grep, head, skip, sort_lines, tail
+
+        lines = ["State Local Process", "LISTEN 127.0.0.1:631 cupsd", "LISTEN 0.0.0.0:22 sshd"]
+        assert grep("sshd")(lines) == ["LISTEN 0.0.0.0:22 sshd"]
+        assert grep(r"127\.0\.0\.1", invert=True)(lines)[1:] == ["LISTEN 0.0.0.0:22 sshd"]
+        assert grep("LISTEN", ignore_case=True)(["listen x", "y"]) == ["listen x"]
+        assert head(1)(lines) == lines[:1]
+        assert tail(1)(lines) == lines[-1:]
+        assert skip(1)(lines) == lines[1:]
+        assert sort_lines()(["b", "a"]) == ["a", "b"]
+        assert fields(1, 3)(["a b c", "d"]) == ["a c", "d"]
+
+    def test_refine_empty_and_error_outputs(self):
+        from fixos.diagnostics.probes import grep
+
+        probe = Probe("snd", "lsmod", filters=(grep("snd"),))
+        assert probe.refine("snd_hda 1\nkvm 2") == "snd_hda 1"
+        assert probe.refine("kvm 2") == "(brak outputu)"
+        assert probe.refine("(brak outputu)") == "(brak outputu)"
+        assert probe.refine("[TIMEOUT po 5s]") == "[TIMEOUT po 5s]"
+
+    def test_base_command_runs_once_for_all_filters(self):
+        from fixos.diagnostics.probes import LSMOD, grep
+
+        calls = []
+
+        def runner(cmd, timeout):
+            calls.append(cmd)
+            return "snd_hda_intel 1\nideapad_laptop 2\nthinkpad_acpi 3"
+
+        probes = [
+            Probe("snd", LSMOD, filters=(grep("snd"),)),
+            Probe("ideapad", LSMOD, filters=(grep("ideapad"),)),
+            Probe("thinkpad", LSMOD, filters=(grep("thinkpad"),)),
+        ]
+        with ProbeEngine(runner) as engine:
+            out = engine.run_registered(probes)
+        assert calls == [LSMOD]
+        assert out == {"snd": "snd_hda_intel 1", "ideapad": "ideapad_laptop 2", "thinkpad": "thinkpad_acpi 3"}
+
+    def test_registry_shares_base_commands(self):
+        commands = [p.command for p in select_probes(platform="Linux")]
+        assert len(commands) - len(set(commands)) >= 8
+
+
+class TestProcfs:
+    def _proc(self, tmp_path, monkeypatch):
+        from fixos.diagnostics import procfs
+
+        (tmp_path / "net").mkdir()
+        (tmp_path / "bus" / "input").mkdir(parents=True)
+        (tmp_path / "modules").write_text(
+            "snd_hda_intel 61440 3 - Live 0x0\n"
+            "snd_hda_codec 200704 2 snd_hda_intel,snd_hda_codec_realtek, Live 0x0\n"
+        )
+        (tmp_path / "cpuinfo").write_text(
+            "processor\t: 0\nmodel name\t: Intel(R) Core(TM) i7\n\nprocessor\t: 1\nmodel name\t: other\n"
+        )
+        (tmp_path / "net" / "dev").write_text(
+            "Inter-|   Receive\n face |bytes packets\n"
+            "    lo: 100 2 0 0 0 0 0 0 300 4 0 0 0 0 0 0\n"
+        )
+        (tmp_path / "bus" / "input" / "devices").write_text(
+            'I: Bus=0018\nN: Name="ELAN Touchpad"\nH: Handlers=mouse0 event5\n\n'
+        )
+        (tmp_path / "uptime").write_text("97260.5 1000.0\n")
+        monkeypatch.setattr(procfs, "PROC", tmp_path)
+        return procfs
+
+    def test_structured_parsers(self, tmp_path, monkeypatch):
+        procfs = self._proc(tmp_path, monkeypatch)
+        mods = procfs.loaded_modules()
+        assert mods[1]["used_by"] == ["snd_hda_intel", "snd_hda_codec_realtek"]
+        assert procfs.cpu_info()["model name"] == "Intel(R) Core(TM) i7"
+        assert procfs.net_dev() == {"lo": {"rx_bytes": 100, "rx_packets": 2, "tx_bytes": 300, "tx_packets": 4}}
+        assert procfs.input_devices()[0] == {"name": "ELAN Touchpad", "handlers": "mouse0 event5"}
+
+    def test_text_renderers_match_shell_output(self, tmp_path, monkeypatch):
+        procfs = self._proc(tmp_path, monkeypatch)
+        assert procfs.cpu_model_text() == "Intel(R) Core(TM) i7"
+        assert procfs.net_dev_text() == "lo: RX: 100 TX: 300"
+        assert procfs.input_devices_text() == 'N: Name="ELAN Touchpad"\nH: Handlers=mouse0 event5'
+        assert procfs.uptime_text() == "up 1 day, 3 hours, 1 minute"
+        assert "snd_hda_codec" in procfs.lsmod_text().splitlines()[2]
+
+    def test_reader_skips_shell_and_falls_back(self):
+        calls = []
+        probes = [
+            Probe("native", "cat /x", reader=lambda: "value"),
+            Probe("missing", "cat /y", reader=lambda: None),
+        ]
+        with ProbeEngine(lambda c, t: calls.append(c) or "shell") as engine:
+            out = engine.run_registered(probes)
+        assert out == {"native": "value", "missing": "shell"}
+        assert calls == ["cat /y"]
+
+    def test_malformed_proc_modules_falls_back_to_shell(self, tmp_path, monkeypatch):
+        from fixos.diagnostics.probes import LSMOD
+
+        procfs = self._proc(tmp_path, monkeypatch)
+        (tmp_path / "modules").write_text("snd_hda_intel 61440 3 - Live 0x0\nbroken ?? 1 - Live\n")
+        calls = []
+        probe = Probe("modules", LSMOD, reader=procfs.lsmod_text)
+        with ProbeEngine(lambda c, t: calls.append(c) or "Module Size Used by") as engine:
+            out = engine.run_registered([probe])
+        assert out == {"modules": "Module Size Used by"}
+        assert calls == [LSMOD]
+
+
+class TestPackageIndex:
+    RPM_OUT = "alsa-lib\t1.2.10\t1.fc39\tx86_64\npipewire\t1.0.0\t2.fc39\tx86_64\nkernel\t6.7\t1.fc39\tx86_64\n"
+
+    def _index(self):
+        from fixos.diagnostics.packages import PackageIndex, _parse
+
+        return PackageIndex(_parse(self.RPM_OUT, "rpm"), "rpm", 1.0)
+
+    def test_lookups(self):
+        index = self._index()
+        assert "pipewire" in index and not index.installed("pulseaudio")
+        assert [p.nvra for p in index.with_prefix("alsa")] == ["alsa-lib-1.2.10-1.fc39.x86_64"]
+        assert len(index.search(r"(alsa|pipewire)")) == 2
+
+    def test_dpkg_parse_skips_removed(self):
+        from fixos.diagnostics.packages import _parse
+
+        out = "ii \tlibasound2\t1.2.8-1\tamd64\nrc \told\t1.0\tamd64\n"
+        assert [p.name for p in _parse(out, "dpkg")] == ["libasound2"]
+
+    def test_disk_cache_invalidated_by_mtime(self, tmp_path):
+        from fixos.diagnostics import packages
+
+        path = tmp_path / "packages-rpm.json"
+        self._index().save(path)
+        with patch.object(packages, "source_mtime", return_value=1.0):
+            assert len(packages.PackageIndex.load_cached(path, "rpm")) == 3
+        with patch.object(packages, "source_mtime", return_value=2.0):
+            assert packages.PackageIndex.load_cached(path, "rpm") is None
+
+    def test_rpm_q_text_format(self):
+        from fixos.diagnostics import packages
+
+        with patch.object(packages, "package_index", return_value=self._index()):
+            out = packages.rpm_q_text("pipewire", "jack")
+        assert out == "pipewire-1.0.0-2.fc39.x86_64\npackage jack is not installed"
+
+
+class TestDiskScanner:
+    def _tree(self, tmp_path):
+        (tmp_path / "app" / ".cache" / "pip").mkdir(parents=True)
+        (tmp_path / "app" / "logs").mkdir()
+        (tmp_path / "big.iso").write_bytes(b"x" * 4096)
+        (tmp_path / "app" / ".cache" / "pip" / "wheel").write_bytes(b"x" * 2048)
+        (tmp_path / "app" / ".cache" / "idx").write_bytes(b"x" * 1024)
+        (tmp_path / "app" / "logs" / "a.log").write_bytes(b"x" * 100)
+        return tmp_path
+
+    def test_cumulative_sizes_and_counts(self, tmp_path):
+        from fixos.diagnostics.disk_scanner import DiskScanner
+
+        root = self._tree(tmp_path)
+        scan = DiskScanner(min_file_size=3000).scan(str(root))
+        assert scan.stats(str(root / "app" / ".cache")).size == 3072
+        assert scan.stats(str(root / "app")).files == 3
+        assert scan.stats(str(root)).size == 4096 + 3072 + 100
+        assert [f.path for f in scan.large_files] == [str(root / "big.iso")]
+
+    def test_analyzer_walks_tree_once(self, tmp_path):
+        from fixos.diagnostics import disk_analyzer
+
+        root = self._tree(tmp_path)
+        analyzer = disk_analyzer.DiskAnalyzer(str(root), use_index=False)
+        with patch.object(disk_analyzer.DiskScanner, "scan", wraps=disk_analyzer.DiskScanner(min_file_size=0).scan) as scan:
+            with patch.object(disk_analyzer, "MB", 1):
+                result = analyzer.analyze_disk_usage()
+        assert scan.call_count == 1
+        assert result["cache_dirs"][0]["path"] == str(root / "app" / ".cache")
+        assert result["cache_dirs"][0]["files_count"] == 2
+        assert result["log_dirs"][0]["oldest_log"] != "unknown"
+
+    def test_incremental_rescan_reuses_unchanged_dirs(self, tmp_path):
+        from fixos.diagnostics.disk_index import DiskIndex
+        from fixos.diagnostics.disk_scanner import DiskScanner
+
+        root = self._tree(tmp_path / "tree")
+        index = DiskIndex(tmp_path / "index.sqlite")
+        first = DiskScanner(min_file_size=3000, index=index).scan(str(root))
+        assert first.reused == 0
+
+        (root / "app" / "logs" / "b.log").write_bytes(b"x" * 50)
+        second = DiskScanner(min_file_size=3000, index=index).scan(str(root))
+        assert second.reused == len(second.dirs) - 1
+        assert second.stats(str(root)).size == first.stats(str(root)).size + 50
+        assert [f.path for f in second.large_files] == [str(root / "big.iso")]
+        assert len(index.growth(str(root))) == 2
+
+    def test_large_file_grown_in_place_is_remeasured(self, tmp_path):
+        from fixos.diagnostics.disk_index import DiskIndex
+        from fixos.diagnostics.disk_scanner import DiskScanner
+
+        root = self._tree(tmp_path / "tree")
+        index = DiskIndex(tmp_path / "index.sqlite")
+        first = DiskScanner(min_file_size=3000, index=index).scan(str(root))
+
+        # Appending to an existing file leaves the directory mtime unchanged
+        st = os.stat(root)
+        with open(root / "big.iso", "ab") as f:
+            f.write(b"x" * 1000)
+        os.utime(root, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        second = DiskScanner(min_file_size=3000, index=index).scan(str(root))
+        assert second.reused == len(second.dirs) - 1
+        assert second.stats(str(root)).size == first.stats(str(root)).size + 1000
+        assert second.large_files[0].size == 5096
+
+    def test_stale_index_forces_full_rescan(self, tmp_path):
+        from fixos.diagnostics.disk_index import DiskIndex
+        from fixos.diagnostics.disk_scanner import DiskScanner
+
+        root = self._tree(tmp_path / "tree")
+        index = DiskIndex(tmp_path / "index.sqlite")
+        DiskScanner(min_file_size=3000, index=index).scan(str(root))
+        assert DiskScanner(min_file_size=3000, index=index).scan(str(root)).reused > 0
+
+        # Small file grown in place – only a full rescan sees it
+        st = os.stat(root / "app" / "logs")
+        with open(root / "app" / "logs" / "a.log", "ab") as f:
+            f.write(b"x" * 10)
+        os.utime(root / "app" / "logs", ns=(st.st_atime_ns, st.st_mtime_ns))
+        stale = DiskScanner(min_file_size=3000, index=index, full_rescan_after=0)
+        with patch("fixos.diagnostics.disk_index.time.time", return_value=time.time() + 1):
+            rescan = stale.scan(str(root))
+        assert rescan.reused == 0
+        assert rescan.stats(str(root / "app" / "logs")).size == 110
+
+    def test_incremental_disabled_ignores_index(self, tmp_path):
+        from fixos.diagnostics.disk_index import DiskIndex
+        from fixos.diagnostics.disk_scanner import DiskScanner
+
+        root = self._tree(tmp_path / "tree")
+        index = DiskIndex(tmp_path / "index.sqlite")
+        DiskScanner(min_file_size=3000, index=index).scan(str(root))
+        rescan = DiskScanner(min_file_size=3000, index=index, incremental=False).scan(str(root))
+        assert rescan.reused == 0
+
+    def test_higher_threshold_index_not_reused(self, tmp_path):
+        from fixos.diagnostics.disk_index import DiskIndex
+        from fixos.diagnostics.disk_scanner import DiskScanner
+
+        root = self._tree(tmp_path / "tree")
+        index = DiskIndex(tmp_path / "index.sqlite")
+        DiskScanner(min_file_size=3000, index=index).scan(str(root))
+        rescan = DiskScanner(min_file_size=1000, index=index).scan(str(root))
+        assert rescan.reused == 0
+        assert len(rescan.large_files) == 3
+
+    def test_top_k_keeps_largest_regardless_of_order(self):
+        from fixos.diagnostics.disk_scanner import FileEntry, TopK
+
+        top = TopK(3)
+        for size in [5, 1, 9, 7, 3, 8, 2]:
+            top.push(FileEntry(f"f{size}", size, 0.0, disk=size))
+        assert [f.size for f in top.snapshot()] == [9, 8, 7]
+
+    def test_scan_returns_true_top_k_and_streams_snapshots(self, tmp_path):
+        from fixos.diagnostics.disk_scanner import DiskScanner
+
+        for i, kb in enumerate([10, 500, 30, 400, 20]):
+            d = tmp_path / f"d{i}"
+            d.mkdir()
+            (d / "f").write_bytes(b"x" * kb * 1024)
+        snapshots = []
+        scan = DiskScanner(min_file_size=0, top_k=2, on_snapshot=snapshots.append, snapshot_interval=0).scan(str(tmp_path))
+        assert [f.size // 1024 for f in scan.large_files] == [500, 400]
+        assert snapshots and all(len(s) <= 2 for s in snapshots)
+
+    def test_hard_links_counted_once_and_sparse_by_blocks(self, tmp_path):
+        from fixos.diagnostics.disk_scanner import DiskScanner
+
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        (tmp_path / "a" / "layer").write_bytes(b"x" * 64 * 1024)
+        os.link(tmp_path / "a" / "layer", tmp_path / "b" / "layer")
+        with open(tmp_path / "vm.qcow2", "wb") as f:
+            f.truncate(50 * 1024**2)
+
+        root = DiskScanner(min_file_size=0).scan(str(tmp_path)).stats(str(tmp_path))
+        assert root.files == 2
+        assert root.size == 64 * 1024 + 50 * 1024**2
+        assert root.disk < 1024**2
+
+    def test_pseudo_fs_and_foreign_mounts_pruned(self, tmp_path):
+        from fixos.diagnostics import disk_scanner
+
+        root = self._tree(tmp_path)
+        (root / "proc").mkdir()
+        (root / "proc" / "kcore").write_bytes(b"x" * 8192)
+        (root / "share").mkdir()
+        (root / "share" / "f").write_bytes(b"x" * 8192)
+        mounts = [{"mountpoint": str(root / "share"), "fstype": "nfs4"}]
+        with patch.object(disk_scanner.procfs, "mounts", return_value=mounts):
+            scan = disk_scanner.DiskScanner(
+                min_file_size=0, skip_paths=frozenset({str(root / "proc")})
+            ).scan(str(root))
+        assert set(scan.skipped) == {str(root / "proc"), str(root / "share")}
+        assert scan.stats(str(root)).files == 4
+
+    def test_unresponsive_mount_skipped(self, tmp_path):
+        from fixos.diagnostics import disk_scanner
+
+        root = self._tree(tmp_path)
+        mounts = [{"mountpoint": str(root / "app"), "fstype": "ext4"}]
+        scanner = disk_scanner.DiskScanner(min_file_size=0, one_filesystem=False, mount_timeout=0.1)
+        real = scanner._responsive
+        with patch.object(disk_scanner.procfs, "mounts", return_value=mounts), \
+                patch.object(scanner, "_responsive", side_effect=lambda p: p == str(root) and real(p)):
+            scan = scanner.scan(str(root))
+        assert scan.skipped == [str(root / "app")]
+        assert scan.stats(str(root)).files == 1
@@ -236,3 +236,28 @@ class TestExecuteSyncDryRun:
             check_idempotent=False,
         )
         assert not result.command.startswith("sudo")
+
+
+class TestIdempotentPackageIndex:
+    """Stan `dnf install` rozstrzygany z indeksu pakietów, bez `rpm -q`."""
+
+    def test_installed_package_skipped_without_subprocess(self):
+        from unittest.mock import MagicMock, patch
+
+        index = MagicMock()
+        index.installed.side_effect = lambda name: name == "sof-firmware"
+        ex = CommandExecutor(dry_run=False)
+        with patch("fixos.orchestrator.executor.package_index", return_value=index), \
+                patch("fixos.orchestrator.executor.subprocess.run") as run:
+            result = ex.execute_sync("dnf install sof-firmware", add_sudo=False)
+        assert result.executed is False
+        run.assert_not_called()
+
+    def test_missing_package_not_satisfied(self):
+        from unittest.mock import MagicMock, patch
+
+        index = MagicMock()
+        index.installed.return_value = False
+        ex = CommandExecutor()
+        with patch("fixos.orchestrator.executor.package_index", return_value=index):
+            assert ex._state_satisfied("rpm -q foo bar &>/dev/null") is False
@@ -0,0 +1,496 @@
+"""
+Testy jednostkowe – klient LLM (cache, klient asynchroniczny, limity, failover,
+pakowanie promptu).
+"""
+
+from __future__ import annotations
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+def _response(content: str, tokens: int = 100) -> MagicMock:
+    resp = MagicMock()
+    resp.choices[0].message.content = content
+    resp.usage.total_tokens = tokens
+    return resp
+
+
+class TestResponseCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        from fixos.providers import ResponseCache
+        return ResponseCache(tmp_path / "llm.sqlite")
+
+    def test_roundtrip_and_stats(self, cache):
+        key = cache.key("gemini", "m", [{"role": "user", "content": "x"}], temperature=0.1)
+        assert cache.get(key) is None
+        cache.put(key, "odpowiedź", tokens=42)
+        assert cache.get(key) == ("odpowiedź", 42)
+        assert cache.stats() == {"hits": 1, "misses": 1, "tokens_saved": 42, "hit_rate": 0.5}
+
+    def test_key_covers_all_parameters(self):
+        from fixos.providers import ResponseCache
+
+        msgs = [{"role": "user", "content": "x"}]
+        base = ResponseCache.key("gemini", "m", msgs, temperature=0.1, max_tokens=10)
+        assert base == ResponseCache.key("gemini", "m", list(msgs), max_tokens=10, temperature=0.1)
+        assert base != ResponseCache.key("openai", "m", msgs, temperature=0.1, max_tokens=10)
+        assert base != ResponseCache.key("gemini", "m2", msgs, temperature=0.1, max_tokens=10)
+        assert base != ResponseCache.key("gemini", "m", msgs, temperature=0.1, max_tokens=20)
+        assert base != ResponseCache.key(
+            "gemini", "m", [{"role": "user", "content": "y"}], temperature=0.1, max_tokens=10,
+        )
+
+    def test_ttl_expiry(self, cache):
+        cache.put("k", "v")
+        with patch("fixos.providers.cache.time.time", return_value=cache.ttl + 1e10):
+            assert cache.get("k") is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        from fixos.providers import ResponseCache
+
+        cache = ResponseCache(tmp_path / "llm.sqlite", max_entries=2)
+        clock = iter(range(1000, 2000))
+        with patch("fixos.providers.cache.time.time", side_effect=lambda: next(clock)):
+            cache.put("a", "1")
+            cache.put("b", "2")
+            cache.get("a")
+            cache.put("c", "3")
+            assert cache.get("b") is None
+            assert cache.get("a") == ("1", 0)
+            assert cache.get("c") == ("3", 0)
+
+    def test_evicts_over_size_limit(self, tmp_path):
+        from fixos.providers import ResponseCache
+
+        cache = ResponseCache(tmp_path / "llm.sqlite", max_bytes=10)
+        clock = iter(range(1000, 2000))
+        with patch("fixos.providers.cache.time.time", side_effect=lambda: next(clock)):
+            cache.put("a", "x" * 6)
+            cache.put("b", "y" * 6)
+            cache.put("too-big", "z" * 11)
+            assert cache.get("a") is None
+            assert cache.get("b") == ("y" * 6, 0)
+            assert cache.get("too-big") is None
+
+
+class TestLLMClientCache:
+    @pytest.fixture
+    def client(self, mock_config, tmp_path):
+        from fixos.providers import LLMClient, ResponseCache
+
+        with patch("fixos.providers.llm.openai") as mock_openai:
+            client = LLMClient(mock_config, cache=ResponseCache(tmp_path / "llm.sqlite"))
+            self.create = mock_openai.OpenAI.return_value.chat.completions.create
+            self.create.return_value = _response("OK", tokens=120)
+            yield client
+
+    def test_cache_disabled_by_default(self, mock_config):
+        from fixos.providers import LLMClient
+
+        with patch("fixos.providers.llm.openai"):
+            assert LLMClient(mock_config).cache is None
+
+    def test_repeated_deterministic_call_served_from_cache(self, client):
+        msgs = [{"role": "user", "content": "oceń wynik"}]
+        assert client.chat(msgs, temperature=0.1) == "OK"
+        assert client.chat(msgs, temperature=0.1) == "OK"
+        assert self.create.call_count == 1
+        assert client.total_tokens == 120
+        assert client.cache_hits == 1 and client.tokens_saved == 120
+        assert "zaoszczędzonych" in client.usage_summary()
+
+    def test_high_temperature_and_ping_bypass_cache(self, client):
+        msgs = [{"role": "user", "content": "kreatywnie"}]
+        client.chat(msgs, temperature=0.7)
+        client.chat(msgs, temperature=0.7)
+        assert client.ping() and client.ping()
+        assert self.create.call_count == 4
+        assert client.cache_hits == 0
+
+    def test_different_parameters_miss(self, client):
+        msgs = [{"role": "user", "content": "x"}]
+        client.chat(msgs, temperature=0.1, max_tokens=100)
+        client.chat(msgs, temperature=0.1, max_tokens=200)
+        assert self.create.call_count == 2
+
+
+class TestAsyncLLMClient:
+    @pytest.fixture
+    def openai_mock(self):
+        with patch("fixos.providers.llm.openai") as mock_openai:
+            yield mock_openai
+
+    def test_concurrency_limited_per_provider(self, openai_mock, mock_config):
+        import asyncio
+
+        from fixos.providers import AsyncLLMClient
+
+        in_flight = [0, 0]  # bieżące, maksimum
+
+        async def create(**kwargs):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            return _response(kwargs["messages"][0]["content"], tokens=10)
+
+        openai_mock.AsyncOpenAI.return_value.chat.completions.create.side_effect = create
+        client = AsyncLLMClient(mock_config, max_concurrency=2)
+        replies = asyncio.run(client.chat_many([[{"role": "user", "content": str(i)}] for i in range(6)]))
+
+        assert replies == [str(i) for i in range(6)]
+        assert in_flight[1] == 2
+        assert client.total_tokens == 60
+
+    def test_http_pool_shared_per_base_url(self, openai_mock, mock_config):
+        import asyncio
+
+        from fixos.providers import AsyncLLMClient
+
+        openai_mock.AsyncOpenAI.return_value.chat.completions.create = AsyncMock(
+            return_value=_response("OK")
+        )
+
+        async def main():
+            await AsyncLLMClient(mock_config).chat([{"role": "user", "content": "a"}])
+            await AsyncLLMClient(mock_config).chat([{"role": "user", "content": "b"}])
+
+        asyncio.run(main())
+        assert openai_mock.DefaultAsyncHttpxClient.call_count == 1
+        assert openai_mock.AsyncOpenAI.call_count == 2
+        http = openai_mock.DefaultAsyncHttpxClient.return_value
+        assert all(c.kwargs["http_client"] is http for c in openai_mock.AsyncOpenAI.call_args_list)
+
+    def test_retry_and_error_mapping(self, openai_mock, mock_config):
+        import asyncio
+
+        import openai as real_openai
+
+        from fixos.providers import AsyncLLMClient, LLMError
+        from fixos.providers.ratelimit import reset_limiters
+
+        rate_limit = real_openai.RateLimitError("rate limit", response=MagicMock(status_code=429), body={})
+        create = openai_mock.AsyncOpenAI.return_value.chat.completions.create = AsyncMock(
+            side_effect=[rate_limit, _response("po retry")]
+        )
+        client = AsyncLLMClient(mock_config)
+        with patch("fixos.providers.llm.asyncio.sleep", new=AsyncMock()) as sleep:
+            assert asyncio.run(client.chat([{"role": "user", "content": "x"}])) == "po retry"
+        # Bez Retry-After: backoff z rozrzutem, odczekany w kolejce limitera
+        sleep.assert_awaited_once()
+        assert 1.0 <= sleep.await_args.args[0] <= 4.0
+
+        reset_limiters()  # nowy klient bez wstrzymania po 429
+        client = AsyncLLMClient(mock_config)
+        create.side_effect = RuntimeError("boom")
+        with pytest.raises(LLMError, match="Nieoczekiwany"):
+            asyncio.run(client.chat([{"role": "user", "content": "x"}]))
+        results = asyncio.run(client.chat_many([[{"role": "user", "content": "x"}]]))
+        assert isinstance(results[0], LLMError)
+
+    def test_sync_client_achat_shares_cache_and_usage(self, openai_mock, mock_config, tmp_path):
+        import asyncio
+
+        from fixos.providers import LLMClient, ResponseCache
+
+        openai_mock.OpenAI.return_value.chat.completions.create.return_value = _response("OK", 30)
+        acreate = openai_mock.AsyncOpenAI.return_value.chat.completions.create = AsyncMock(
+            return_value=_response("OK", 30)
+        )
+        client = LLMClient(mock_config, cache=ResponseCache(tmp_path / "llm.sqlite"))
+        msgs = [{"role": "user", "content": "x"}]
+
+        assert asyncio.run(client.achat(msgs, temperature=0.1)) == "OK"
+        assert client.chat(msgs, temperature=0.1) == "OK"
+        assert acreate.await_count == 1
+        assert not openai_mock.OpenAI.return_value.chat.completions.create.called
+        assert client.total_tokens == 30 and client.cache_hits == 1
+
+
+class TestRateLimiter:
+    def test_bucket_queues_reservations(self):
+        from fixos.providers.ratelimit import TokenBucket
+
+        bucket = TokenBucket(60, burst=2, now=0.0)  # 1 na sekundę
+        waits = [bucket.reserve(1, now=0.0) for _ in range(4)]
+        assert waits == [0.0, 0.0, 1.0, 2.0]
+        assert bucket.reserve(1, now=10.0) == 0.0
+
+    def test_oversized_request_waits_for_full_bucket_only(self):
+        from fixos.providers.ratelimit import TokenBucket
+
+        bucket = TokenBucket(600, now=0.0)
+        assert bucket.reserve(10_000, now=0.0) == 0.0
+        assert bucket.reserve(600, now=0.0) == 60.0
+
+    def test_settle_refunds_overestimate(self):
+        from fixos.providers.ratelimit import RateLimiter
+
+        limiter = RateLimiter(tpm=1000)
+        assert limiter.reserve(1000) == 0.0
+        assert limiter.reserve(500) > 0
+        limiter.settle(estimated=1500, actual=100)
+        assert limiter.reserve(900) == 0.0
+
+    def test_penalize_blocks_all_callers(self):
+        from fixos.providers.ratelimit import RateLimiter
+
+        limiter = RateLimiter()
+        assert limiter.reserve() == 0.0
+        limiter.penalize(5)
+        assert 4.0 < limiter.reserve() <= 5.0
+        with patch("fixos.providers.ratelimit.time.sleep") as sleep:
+            limiter.acquire()
+        assert sleep.call_args.args[0] > 4.0
+
+    @pytest.mark.parametrize("headers,expected", [
+        ({"retry-after": "7"}, 7.0),
+        ({"retry-after-ms": "1500"}, 1.5),
+        ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+        ({"retry-after": "soon"}, None),
+        ({}, None),
+    ])
+    def test_retry_after_header(self, headers, expected):
+        from fixos.providers.ratelimit import retry_after
+
+        error = MagicMock()
+        error.response.headers = headers
+        assert retry_after(error) == expected
+
+    def test_backoff_delay_bounds(self):
+        from fixos.providers.ratelimit import backoff_delay
+
+        for attempt in range(6):
+            full = min(60.0, 2.0 * 2 ** attempt)
+            assert full / 2 <= backoff_delay(attempt) <= full
+        assert 7.0 <= backoff_delay(1, hint=7.0) <= 7.7
+        assert backoff_delay(1, hint=600) <= 66.0
+
+    def test_limiter_shared_per_provider_with_defaults(self, mock_config):
+        from dataclasses import replace
+
+        from fixos.providers.ratelimit import limiter_for
+
+        limiter = limiter_for(mock_config)
+        assert limiter is limiter_for(replace(mock_config, api_key="other"))
+        assert limiter.requests.capacity == 10  # gemini: 10 RPM
+        unlimited = limiter_for(replace(mock_config, provider="ollama", base_url="http://x"))
+        assert unlimited.requests is None and unlimited.tokens is None
+        override = limiter_for(replace(mock_config, base_url="http://y", llm_rpm=0, llm_tpm=100))
+        assert override.requests is None and override.tokens.capacity == 100
+
+    def test_server_hint_pauses_shared_limiter(self, mock_config):
+        import openai as real_openai
+
+        from fixos.providers import LLMClient
+
+        response = MagicMock(status_code=429, headers={"retry-after": "3"})
+        rate_limit = real_openai.RateLimitError("rate limit", response=response, body={})
+        with patch("fixos.providers.llm.openai") as mock_openai, \
+                patch("fixos.providers.ratelimit.time.sleep") as sleep:
+            mock_openai.OpenAI.return_value.chat.completions.create.side_effect = [
+                rate_limit, _response("OK"),
+            ]
+            client = LLMClient(mock_config)
+            assert client.chat([{"role": "user", "content": "x"}]) == "OK"
+            # Drugi klient tego providera też czeka na koniec wstrzymania
+            assert LLMClient(mock_config).limiter.reserve() > 2.5
+        assert 2.5 < sleep.call_args.args[0] <= 3.3
+
+
+class TestProviderFailover:
+    @pytest.fixture
+    def config(self, mock_config):
+        from dataclasses import replace
+
+        with patch.dict("os.environ", {"OPENAI_API_KEY": "sk-fake-openai", "GROQ_API_KEY": ""}):
+            yield replace(mock_config, fallback_providers=["openai", "groq"])
+
+    @pytest.fixture
+    def backends(self):
+        """Osobny mock klienta openai dla każdego base_url."""
+        clients: dict[str, MagicMock] = {}
+
+        def make(**kwargs):
+            return clients.setdefault(kwargs["base_url"], MagicMock())
+
+        with patch("fixos.providers.llm.openai") as mock_openai:
+            mock_openai.OpenAI.side_effect = make
+            mock_openai.AsyncOpenAI.side_effect = make
+            yield clients
+
+    @staticmethod
+    def _create(clients, provider):
+        from fixos.config import PROVIDER_DEFAULTS
+        url = PROVIDER_DEFAULTS[provider]["base_url"]
+        return clients.setdefault(url, MagicMock()).chat.completions.create
+
+    def test_fallback_configs_need_keys(self, config):
+        fallbacks = config.fallback_configs()
+        assert [c.provider for c in fallbacks] == ["openai"]  # groq bez klucza
+        assert fallbacks[0].api_key == "sk-fake-openai"
+        assert fallbacks[0].model == "gpt-4o-mini"
+        assert config.for_provider("nope") is None
+
+    def test_fails_over_and_demotes_unhealthy_provider(self, config, backends):
+        from fixos.providers import LLMClient
+
+        client = LLMClient(config)
+        primary = self._create(backends, "gemini")
+        fallback = self._create(backends, "openai")
+        primary.side_effect = RuntimeError("503")
+        fallback.return_value = _response("z zapasowego")
+
+        for _ in range(3):
+            assert client.chat([{"role": "user", "content": "x"}]) == "z zapasowego"
+        assert primary.call_count == 3  # jedna próba przed przełączeniem
+        assert not client.health.available
+
+        client.chat([{"role": "user", "content": "x"}])
+        assert primary.call_count == 3  # wyłączony – zapasowy pytany pierwszy
+        assert client.health_report()["openai"]["error_rate"] == 0.0
+
+    def test_all_providers_failing_raises_primary_error(self, config, backends):
+        from fixos.providers import LLMClient, LLMError
+
+        self._create(backends, "gemini").side_effect = RuntimeError("primary down")
+        self._create(backends, "openai").side_effect = RuntimeError("fallback down")
+        with pytest.raises(LLMError, match="primary down"):
+            LLMClient(config).chat([{"role": "user", "content": "x"}])
+
+    def test_hedged_request_takes_faster_provider(self, config, backends):
+        import threading
+        import time as _time
+        from dataclasses import replace
+
+        from fixos.providers import LLMClient
+
+        release = threading.Event()
+
+        def slow(**kwargs):
+            release.wait(2)
+            return _response("wolny")
+
+        self._create(backends, "gemini").side_effect = slow
+        self._create(backends, "openai").return_value = _response("szybki")
+        client = LLMClient(replace(config, llm_hedge=True, llm_hedge_after=0.05))
+
+        started = _time.monotonic()
+        assert client.chat([{"role": "user", "content": "x"}]) == "szybki"
+        assert _time.monotonic() - started < 1.0
+        release.set()
+
+    def test_async_hedged_request_cancels_loser(self, config, backends):
+        import asyncio
+        from dataclasses import replace
+
+        from fixos.providers import AsyncLLMClient
+
+        cancelled = []
+
+        async def slow(**kwargs):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return _response("wolny")
+
+        self._create(backends, "gemini").side_effect = slow
+        self._create(backends, "openai").side_effect = AsyncMock(return_value=_response("szybki"))
+        client = AsyncLLMClient(replace(config, llm_hedge=True, llm_hedge_after=0.05))
+
+        async def main():
+            reply = await client.chat([{"role": "user", "content": "x"}])
+            await asyncio.sleep(0)
+            return reply
+
+        assert asyncio.run(main()) == "szybki"
+        assert cancelled == [True]
+
+    def test_health_statistics(self):
+        from fixos.providers.health import ProviderHealth
+
+        health = ProviderHealth(alpha=0.5, failure_threshold=2, cooldown=60)
+        assert health.p95(default=8.0) == 8.0
+        for latency in [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0,
+                        1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 9.0]:
+            health.record_success(latency)
+        assert health.p95(default=8.0) == 9.0
+        assert 1.0 < health.latency_ewma < 9.0
+
+        health.record_failure()
+        assert health.available and health.error_rate == 0.5
+        health.record_failure()
+        assert not health.available
+        health.record_success(1.0)
+        assert health.available and health.consecutive_failures == 0
+
+
+class TestPromptPacker:
+    def test_condense_keeps_error_lines_in_order(self):
+        from fixos.providers.prompt import condense, count_tokens
+        lines = [f"info line {i} " + "x" * 40 for i in range(200)]
+        lines[150] = "kernel: snd_hda_intel: probe failed with error -2"
+        text = "\n".join(lines)
+        out = condense(text, 200)
+        assert count_tokens(out) <= 200
+        assert "probe failed with error -2" in out
+        assert "pominięto" in out
+        assert out.index("info line 0") < out.index("probe failed")
+
+    def test_condense_single_long_line_truncated(self):
+        from fixos.providers.prompt import condense, count_tokens
+        out = condense("x" * 5000, 500)
+        assert out.startswith("x" * 1000) and out.endswith("…")
+        assert count_tokens(out) <= 500
+        out = condense("ok line " * 600, 100)
+        assert out.startswith("ok line ok line") and "pominięto" not in out
+        assert count_tokens(out) <= 100
+
+    def test_condense_long_plain_lines_keep_first(self):
+        from fixos.providers.prompt import condense, count_tokens
+        out = condense("a" * 3000 + "\n" + "b" * 3000, 200)
+        assert out.startswith("a" * 500)
+        assert "… (pominięto 1 linii)" in out
+        assert count_tokens(out) <= 200
+
+    def test_condense_short_text_unchanged(self):
+        from fixos.providers.prompt import condense
+        assert condense("ok\nok", 100) == "ok\nok"
+
+    def test_excerpt_anonymizes_and_keeps_tail_error(self):
+        from fixos.providers.prompt import count_tokens, excerpt
+        text = "\n".join(["noise " * 10] * 500 + ["Error: /home/jan/.config broken"])
+        out = excerpt(text, 100)
+        assert count_tokens(out) <= 100
+        assert "Error:" in out and "/home/jan" not in out
+        assert excerpt("", 100) == ""
+
+    def test_pack_prioritises_signal_and_drops_empty(self):
+        from fixos.providers.prompt import PromptPacker, count_tokens
+        data = {
+            "system": {"hostname_info": "a" * 2000, "empty": "", "none": None},
+            "services": {"failed_units": "pipewire.service loaded failed failed"},
+            "audio": {"journal": "\n".join(["ok"] * 50 + ["sof: firmware load error"])},
+        }
+        packer = PromptPacker(budget=120)
+        packed = packer.pack(data)
+        assert packed["services"]["failed_units"].startswith("pipewire")
+        assert "firmware load error" in packed["audio"]["journal"]
+        assert "system" not in packed
+        assert packer.omitted == ["system.hostname_info"]
+        assert packer.used <= 120
+        assert count_tokens(packer.pack_json(data)) <= 120 + 40  # klucze i nawiasy
+
+    def test_context_budget_respects_window_and_tpm(self):
+        from fixos.config import FixOsConfig
+        from fixos.providers.prompt import context_budget
+        cfg = FixOsConfig(provider="gemini", prompt_tokens=1500)
+        assert context_budget(cfg) == 1500
+        cfg.llm_tpm = 1000
+        assert context_budget(cfg) == 500
+        cfg = FixOsConfig(provider="cerebras", prompt_tokens=50_000, llm_tpm=0)
+        assert context_budget(cfg) == 8192 - 3000
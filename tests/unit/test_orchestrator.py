@@ -5,7 +5,7 @@ Testy jednostkowe – Problem Graph, CommandExecutor, FixOrchestrator.
 from __future__ import annotations
 
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from fixos.orchestrator.graph import Problem, ProblemGraph
 from fixos.orchestrator.executor import (
@@ -111,6 +111,184 @@ class TestProblemGraph:
         g.add(child)
         assert "p1" in child.caused_by
 
+    def test_ready_lists_all_independent_roots(self):
+        g = ProblemGraph()
+        g.add(Problem(id="a", description="a", severity="warning", fix_commands=[]))
+        g.add(Problem(id="b", description="b", severity="critical", fix_commands=[]))
+        g.add(Problem(id="c", description="c", severity="info", fix_commands=[], caused_by=["a"]))
+        assert [p.id for p in g.ready()] == ["b", "a"]
+        g.get("a").status = "resolved"
+        assert [p.id for p in g.ready()] == ["b", "c"]
+
+    def test_status_counters_follow_transitions(self):
+        g = ProblemGraph()
+        a = Problem(id="a", description="a", severity="info", fix_commands=[])
+        b = Problem(id="b", description="b", severity="info", fix_commands=[])
+        g.add(a)
+        g.add(b)
+        assert g.pending_count() == 2
+        a.status = "in_progress"
+        assert g.pending_count() == 1
+        a.status = "resolved"
+        b.status = "failed"
+        assert g.pending_count() == 0
+        assert g.all_done()
+
+    def test_child_unblocked_when_parent_resolved(self):
+        g = ProblemGraph()
+        parent = Problem(id="p", description="p", severity="info", fix_commands=[])
+        child = Problem(id="c", description="c", severity="critical", fix_commands=[], caused_by=["p"])
+        g.add(parent)
+        g.add(child)
+        assert g.next_actionable() is parent
+        parent.status = "in_progress"
+        assert g.next_actionable() is None
+        parent.status = "resolved"
+        assert g.next_actionable() is child
+
+    def test_retry_returns_problem_to_queue(self):
+        g = ProblemGraph()
+        p = Problem(id="p", description="p", severity="info", fix_commands=[])
+        g.add(p)
+        p.status = "in_progress"
+        p.attempts += 1
+        assert g.next_actionable() is None
+        p.status = "pending"
+        assert g.next_actionable() is p
+
+    def test_dependency_added_after_child_blocks_it(self):
+        g = ProblemGraph()
+        child = Problem(id="c", description="c", severity="info", fix_commands=[], caused_by=["p"])
+        g.add(child)
+        assert g.next_actionable() is child
+        g.add(Problem(id="p", description="p", severity="info", fix_commands=[]))
+        assert g.next_actionable().id == "p"
+        g.get("p").status = "resolved"
+        assert g.next_actionable() is child
+
+    def test_readding_same_id_replaces_node(self):
+        g = ProblemGraph()
+        g.add(Problem(id="p", description="old", severity="info", fix_commands=[]))
+        g.add(Problem(id="c", description="c", severity="info", fix_commands=[], caused_by=["p"]))
+        g.add(Problem(id="p", description="new", severity="info", fix_commands=[], status="resolved"))
+        assert g.pending_count() == 1
+        assert g.next_actionable().id == "c"
+
+    def test_readding_pending_id_listed_once(self):
+        g = ProblemGraph()
+        g.add(Problem(id="a", description="old", severity="info", fix_commands=[]))
+        g.add(Problem(id="b", description="b", severity="critical", fix_commands=[]))
+        new = Problem(id="a", description="new", severity="info", fix_commands=[])
+        g.add(new)
+        assert [p.id for p in g.ready()] == ["b", "a"]
+        assert g.ready()[1] is new
+        g.get("b").status = "resolved"
+        assert g.next_actionable() is new
+        new.status = "resolved"
+        assert g.next_actionable() is None
+        assert g.ready() == []
+
+    def test_status_changes_from_threads_keep_counts(self):
+        import threading
+
+        g = ProblemGraph()
+        for i in range(400):
+            g.add(Problem(id=f"p{i}", description="x", severity="info", fix_commands=[],
+                          caused_by=[f"p{i - 1}"] if i % 4 else []))
+
+        def worker(offset):
+            for i in range(offset, 400, 4):
+                g.get(f"p{i}").status = "resolved"
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            g.ready()
+        for t in threads:
+            t.join()
+        assert g.pending_count() == 0
+        assert g.all_done()
+        assert g.ready() == [] and g.next_actionable() is None
+
+    def test_matches_full_scan_on_random_graph(self):
+        import random
+
+        rng = random.Random(7)
+        g = ProblemGraph()
+        for i in range(200):
+            deps = rng.sample(range(i), k=min(i, rng.randint(0, 2)))
+            g.add(Problem(
+                id=f"p{i}", description="x", fix_commands=[],
+                severity=rng.choice(["critical", "warning", "info"]),
+                caused_by=[f"p{d}" for d in deps],
+            ))
+
+        def naive():
+            return {
+                p.id for p in g.nodes.values()
+                if p.is_actionable() and all(
+                    g.nodes[d].status == "resolved" for d in p.caused_by if d in g.nodes
+                )
+            }
+
+        steps = 0
+        while (p := g.next_actionable()) is not None:
+            assert {r.id for r in g.ready()} == naive()
+            p.status = rng.choice(["resolved", "resolved", "failed"])
+            steps += 1
+        assert naive() == set()
+        assert steps > 0
+
+    def test_bulk_import_scales(self):
+        import time
+
+        g = ProblemGraph()
+        start = time.monotonic()
+        for i in range(5000):
+            g.add(Problem(id=f"p{i}", description="x", severity="info", fix_commands=[],
+                          caused_by=[f"p{i - 1}"] if i % 10 else []))
+        resolved = 0
+        while (p := g.next_actionable()) is not None:
+            p.status = "resolved"
+            resolved += 1
+        assert resolved == 5000
+        assert time.monotonic() - start < 2.0
+
+
+    def test_parallel_scheduling_scales(self):
+        import time
+
+        # Jak run_parallel: co krok ready(wolne sloty), start, zakończenie najstarszego
+        g = ProblemGraph()
+        start = time.monotonic()
+        for i in range(5000):
+            g.add(Problem(id=f"p{i}", description="x", severity="info", fix_commands=[],
+                          caused_by=[f"p{i - 1}"] if i % 10 else []))
+        running: list[Problem] = []
+        finished = 0
+        while True:
+            for p in g.ready(4 - len(running)):
+                p.status = "in_progress"
+                running.append(p)
+            if not running:
+                break
+            running.pop(0).status = "resolved"
+            finished += 1
+        assert finished == 5000
+        assert g.all_done()
+        assert time.monotonic() - start < 2.0
+
+    def test_ready_limit_keeps_order(self):
+        g = ProblemGraph()
+        for sev, pid in [("info", "i"), ("critical", "c"), ("warning", "w")]:
+            g.add(Problem(id=pid, description=pid, severity=sev, fix_commands=[]))
+        assert [p.id for p in g.ready(2)] == ["c", "w"]
+        g.get("c").status = "in_progress"
+        assert [p.id for p in g.ready(1)] == ["w"]
+        assert [p.id for p in g.ready()] == ["w", "i"]
+        g.get("c").status = "pending"
+        assert [p.id for p in g.ready()] == ["c", "w", "i"]
 
 # ══════════════════════════════════════════════════════════
 #  CommandExecutor
@@ -230,6 +408,35 @@ class TestFixOrchestrator:
         assert orch.graph.get("p1") is not None
         assert orch.graph.get("p2") is not None
 
+    def test_diagnose_prompt_within_budget(self, mock_cfg):
+        from fixos.orchestrator import FixOrchestrator
+        from fixos.providers.prompt import count_tokens
+        mock_cfg.prompt_tokens = 400
+        orch = FixOrchestrator(config=mock_cfg)
+        journal = "\n".join(["routine message"] * 2000 + ["pipewire: segfault in libspa"])
+        prompt = orch._diagnose_prompt({
+            "system": {"os_release": "Fedora 41", "packages": "x " * 5000},
+            "audio": {"journal": journal, "cards": ""},
+        })
+        assert "segfault in libspa" in prompt
+        baseline = orch._diagnose_prompt({"system": {"os_release": "Fedora 41"}})
+        assert count_tokens(prompt) - count_tokens(baseline) <= 450
+
+    def test_diagnose_prompt_never_sends_partial_secrets(self, mock_cfg):
+        import re
+
+        from fixos.orchestrator import FixOrchestrator
+        orch = FixOrchestrator(config=mock_cfg)
+        # Jedna długa linia z błędem – condense() ją przycina; różne budżety
+        # przesuwają miejsce cięcia przez kolejne sekrety i adresy
+        line = "error: upload failed" + " key=sk-ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 peer 83.21.10.20" * 60
+        for budget in range(256, 300):
+            mock_cfg.prompt_tokens = budget
+            prompt = orch._diagnose_prompt({"system": {"os_release": "Fedora 41"}, "net": {"journal": line}})
+            assert "upload failed" in prompt
+            assert not re.search(r"sk-[A-Z]", prompt), budget
+            assert not re.search(r"\d+\.\d+\.\d", prompt), budget  # co najwyżej dwa oktety + XXX
+
     def test_graph_render_after_load(self, mock_cfg):
         from fixos.orchestrator import FixOrchestrator
         orch = FixOrchestrator(config=mock_cfg)
@@ -311,3 +518,514 @@ class TestFixOrchestrator:
         orch = FixOrchestrator(config=mock_cfg)
         with pytest.raises(ValueError):
             orch._parse_json("not json at all")
+
+
+# ══════════════════════════════════════════════════════════
+#  ResourceLocks + równoległa pętla napraw
+# ══════════════════════════════════════════════════════════
+
+class TestResourceLocks:
+    @pytest.mark.parametrize("command, expected", [
+        ("sudo dnf install -y sof-firmware", {"pkg"}),
+        ("rpm -q pipewire && apt-get update", {"pkg"}),
+        ("systemctl restart pipewire", {"unit:pipewire.service"}),
+        ("systemctl --user restart pipewire wireplumber.service",
+         {"unit:user:pipewire.service", "unit:user:wireplumber.service"}),
+        ("sudo systemctl daemon-reload", {"systemd"}),
+        ("systemctl status sshd", set()),
+        ("firewall-cmd --reload; sudo grub2-mkconfig -o /boot/grub2/grub.cfg", {"firewall", "bootloader"}),
+        ("echo hello | tee /tmp/x", set()),
+    ])
+    def test_resources_for(self, command, expected):
+        from fixos.orchestrator.locks import resources_for
+        assert resources_for(command) == expected
+
+    def test_hold_serializes_same_resource(self):
+        import threading
+        import time
+
+        from fixos.orchestrator.locks import ResourceLocks
+
+        locks = ResourceLocks()
+        inside, peak = [0], [0]
+        guard = threading.Lock()
+
+        def work(cmd):
+            with locks.for_command(cmd):
+                with guard:
+                    inside[0] += 1
+                    peak[0] = max(peak[0], inside[0])
+                time.sleep(0.05)
+                with guard:
+                    inside[0] -= 1
+
+        threads = [threading.Thread(target=work, args=(f"dnf install pkg{i}",)) for i in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert peak[0] == 1
+
+
+class TestParallelRun:
+    @pytest.fixture
+    def orch(self):
+        from fixos.config import FixOsConfig
+        from fixos.orchestrator import FixOrchestrator
+
+        cfg = FixOsConfig(provider="gemini", api_key="AIzaSy_FAKE_TOKEN_FOR_TESTING_1234567890",
+                          agent_mode="autonomous", show_anonymized_data=False)
+        orch = FixOrchestrator(config=cfg)
+
+        def fake_eval(problem, result):
+            problem.status = "resolved" if result.success else "failed"
+            return []
+
+        orch._evaluate_and_rediagnose = fake_eval
+        return orch
+
+    @staticmethod
+    def _timed_executor(orch, delay=0.2):
+        import threading
+        import time
+
+        state = {"inside": 0, "peak": 0, "order": []}
+        guard = threading.Lock()
+
+        def execute_sync(cmd):
+            with guard:
+                state["inside"] += 1
+                state["peak"] = max(state["peak"], state["inside"])
+                state["order"].append(cmd)
+            time.sleep(delay)
+            with guard:
+                state["inside"] -= 1
+            return ExecutionResult(command=cmd)
+
+        orch.executor.execute_sync = execute_sync
+        return state
+
+    def test_independent_roots_run_concurrently(self, orch):
+        import time
+
+        state = self._timed_executor(orch)
+        orch.load_from_dict([
+            {"id": f"p{i}", "description": str(i), "fix_commands": [f"echo {i}"]} for i in range(4)
+        ])
+        start = time.monotonic()
+        summary = orch.run_parallel(confirm_fn=lambda p, c: True, progress_fn=lambda p, r: None)
+        assert time.monotonic() - start < 0.6
+        assert state["peak"] == 4
+        assert sorted(summary["by_status"]["resolved"]) == ["p0", "p1", "p2", "p3"]
+
+    def test_dependencies_and_resource_conflicts_respected(self, orch):
+        state = self._timed_executor(orch, delay=0.05)
+        orch.load_from_dict([
+            {"id": "root", "description": "r", "fix_commands": ["echo root"]},
+            {"id": "child", "description": "c", "fix_commands": ["echo child"], "caused_by": ["root"]},
+            {"id": "pkg1", "description": "1", "fix_commands": ["dnf install a"]},
+            {"id": "pkg2", "description": "2", "fix_commands": ["dnf install b"]},
+        ])
+        orch.graph.get("root").may_cause.append("child")
+        orch.run_parallel(confirm_fn=lambda p, c: True, progress_fn=lambda p, r: None)
+        order = state["order"]
+        assert order.index("echo root") < order.index("echo child")
+        assert orch.graph.all_done()
+        assert state["peak"] <= 2  # dnf a / dnf b nigdy naraz
+
+    def test_failed_problem_retried_not_duplicated(self, orch):
+        calls = []
+
+        def execute_sync(cmd):
+            calls.append(cmd)
+            return ExecutionResult(command=cmd, returncode=1)
+
+        def fake_eval(problem, result):
+            problem.status = "failed" if problem.attempts >= problem.max_attempts else "pending"
+            return []
+
+        orch.executor.execute_sync = execute_sync
+        orch._evaluate_and_rediagnose = fake_eval
+        orch.load_from_dict([{"id": "p", "description": "x", "fix_commands": ["false"]}])
+        summary = orch.run_parallel(confirm_fn=lambda p, c: True, progress_fn=lambda p, r: None)
+        assert calls == ["false"] * 3
+        assert summary["by_status"] == {"failed": ["p"]}
+
+
+    def test_shared_resource_with_rediagnosis(self, orch):
+        import threading
+
+        from fixos.orchestrator.graph import Problem
+
+        state = self._timed_executor(orch, delay=0.05)
+        pkg = {"inside": 0, "peak": 0}
+        guard = threading.Lock()
+        timed = orch.executor.execute_sync
+
+        def execute_sync(cmd):
+            shared = cmd.startswith("dnf")
+            with guard:
+                pkg["inside"] += shared
+                pkg["peak"] = max(pkg["peak"], pkg["inside"])
+            try:
+                return timed(cmd)
+            finally:
+                with guard:
+                    pkg["inside"] -= shared
+
+        def fake_eval(problem, result):
+            problem.status = "resolved"
+            if problem.id == "pkg1":
+                return [
+                    Problem(id="pkg3", description="3", severity="warning", fix_commands=["dnf install c"]),
+                    Problem(id="svc", description="s", severity="info", fix_commands=["echo svc"]),
+                ]
+            if problem.id == "pkg2":
+                # Ten sam problem odkryty drugi raz
+                return [Problem(id="svc", description="s", severity="info", fix_commands=["echo svc"])]
+            return []
+
+        orch.executor.execute_sync = execute_sync
+        orch._evaluate_and_rediagnose = fake_eval
+        orch.load_from_dict([
+            {"id": "pkg1", "description": "1", "fix_commands": ["dnf install a"]},
+            {"id": "pkg2", "description": "2", "fix_commands": ["dnf install b"]},
+            {"id": "other", "description": "o", "fix_commands": ["echo other"]},
+        ])
+        summary = orch.run_parallel(confirm_fn=lambda p, c: True, progress_fn=lambda p, r: None)
+
+        assert pkg["peak"] == 1  # komendy dnf nigdy naraz
+        assert state["peak"] >= 2  # ale echo równolegle z dnf
+        assert sorted(summary["by_status"]["resolved"]) == ["other", "pkg1", "pkg2", "pkg3", "svc"]
+        # Każdy problem raz; "svc" odkryty ponownie po naprawie może wrócić jeden raz
+        assert sorted(c for c in state["order"] if c != "echo svc") == [
+            "dnf install a", "dnf install b", "dnf install c", "echo other",
+        ]
+        assert 1 <= state["order"].count("echo svc") <= 2
+        assert orch.graph.all_done()
+
+    def test_readded_problem_dispatched_once(self, orch):
+        import threading
+
+        from fixos.orchestrator.graph import Problem
+
+        confirmed, guard = [], threading.Lock()
+
+        def confirm(problem, cmd):
+            with guard:
+                confirmed.append(problem.id)
+            return True
+
+        def fake_eval(problem, result):
+            problem.status = "resolved"
+            if problem.id == "x":
+                # Ponowna diagnoza zwraca problem o istniejącym id
+                return [Problem(id="a", description="a v2", severity="info", fix_commands=["echo a2"])]
+            return []
+
+        self._timed_executor(orch, delay=0.01)
+        orch._evaluate_and_rediagnose = fake_eval
+        orch.load_from_dict([
+            {"id": "x", "description": "x", "fix_commands": ["echo x"]},
+            {"id": "a", "description": "a", "fix_commands": ["echo a"], "caused_by": ["x"]},
+        ])
+        orch.run_parallel(confirm_fn=confirm, progress_fn=lambda p, r: None)
+        assert confirmed == ["x", "a"]
+        assert orch.graph.all_done()
+
+
+class TestAsyncRun:
+    @pytest.fixture
+    def orch(self):
+        from fixos.config import FixOsConfig
+        from fixos.orchestrator import FixOrchestrator
+
+        cfg = FixOsConfig(provider="gemini", api_key="AIzaSy_FAKE_TOKEN_FOR_TESTING_1234567890",
+                          agent_mode="autonomous", show_anonymized_data=False)
+        orch = FixOrchestrator(config=cfg)
+
+        async def fake_eval(problem, result):
+            problem.status = "resolved" if result.success else "failed"
+            return []
+
+        orch._aevaluate_and_rediagnose = fake_eval
+        return orch
+
+    def test_commands_run_through_async_executor(self, orch):
+        import asyncio
+
+        orch.load_from_dict([{"id": "p1", "description": "x", "fix_commands": ["echo async-ok"]}])
+        seen = []
+
+        async def confirm(problem, cmd):
+            return True
+
+        async def progress(problem, result):
+            seen.append(result.stdout)
+
+        summary = asyncio.run(orch.run_async(confirm_fn=confirm, progress_fn=progress))
+        assert seen == ["async-ok"]
+        assert summary["by_status"] == {"resolved": ["p1"]}
+
+    def test_event_stream_order(self, orch):
+        import asyncio
+
+        orch.load_from_dict([
+            {"id": "root", "description": "r", "fix_commands": ["true"]},
+            {"id": "child", "description": "c", "fix_commands": ["true"], "caused_by": ["root"]},
+        ])
+        orch.graph.get("root").may_cause.append("child")
+
+        async def collect():
+            return [(e.kind, e.problem.id if e.problem else None)
+                    async for e in orch.events(confirm_fn=lambda p, c: True)]
+
+        events = asyncio.run(collect())
+        assert events[0] == ("started", "root")
+        assert events.index(("finished", "root")) < events.index(("started", "child"))
+        assert ("evaluated", "child") in events
+        assert events[-1] == ("done", None)
+
+    def test_several_orchestrations_share_one_loop(self, orch):
+        import asyncio
+        import time
+
+        from fixos.orchestrator import FixOrchestrator
+
+        other = FixOrchestrator(config=orch.config)
+        other._aevaluate_and_rediagnose = orch._aevaluate_and_rediagnose
+        for o in (orch, other):
+            o.load_from_dict([
+                {"id": f"p{i}", "description": str(i), "fix_commands": ["sleep 0.3"]} for i in range(2)
+            ])
+
+        async def both():
+            kwargs = dict(confirm_fn=lambda p, c: True, progress_fn=lambda p, r: None, max_concurrency=2)
+            return await asyncio.gather(orch.run_async(**kwargs), other.run_async(**kwargs))
+
+        start = time.monotonic()
+        summaries = asyncio.run(both())
+        assert time.monotonic() - start < 0.9
+        assert all(len(s["by_status"]["resolved"]) == 2 for s in summaries)
+
+    def test_dangerous_command_blocked_event(self, orch):
+        import asyncio
+
+        orch.load_from_dict([{"id": "p", "description": "x", "fix_commands": ["rm -rf /"]}])
+
+        async def collect():
+            return [e async for e in orch.events(confirm_fn=lambda p, c: True)]
+
+        events = asyncio.run(collect())
+        assert any(e.kind == "blocked" for e in events)
+        assert orch.graph.get("p").status == "failed"
+
+
+class TestBatchedEvaluation:
+    @pytest.fixture
+    def orch(self):
+        from fixos.config import FixOsConfig
+        from fixos.orchestrator import FixOrchestrator
+
+        cfg = FixOsConfig(provider="gemini", api_key="AIzaSy_FAKE_TOKEN_FOR_TESTING_1234567890",
+                          agent_mode="autonomous", show_anonymized_data=False)
+        return FixOrchestrator(config=cfg)
+
+    def test_thread_batcher_groups_concurrent_submissions(self):
+        import threading
+
+        from fixos.orchestrator.batching import EvaluationBatcher
+
+        calls = []
+
+        def evaluate(items):
+            calls.append(list(items))
+            return [i * 10 for i in items]
+
+        batcher = EvaluationBatcher(evaluate, max_size=3, window=1.0)
+        results = {}
+        threads = [
+            threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.submit(i)))
+            for i in range(3)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == {0: 0, 1: 10, 2: 20}
+        assert len(calls) == 1 and sorted(calls[0]) == [0, 1, 2]
+
+    def test_thread_batcher_flushes_after_window(self):
+        from fixos.orchestrator.batching import EvaluationBatcher
+
+        batcher = EvaluationBatcher(lambda items: [x + 1 for x in items], max_size=5, window=0.05)
+        assert batcher.submit(1) == 2
+
+    def test_async_batcher_groups_and_propagates_errors(self):
+        import asyncio
+
+        from fixos.orchestrator.batching import AsyncEvaluationBatcher
+
+        calls = []
+
+        async def evaluate(items):
+            calls.append(list(items))
+            if "boom" in items:
+                raise RuntimeError("boom")
+            return [x.upper() for x in items]
+
+        async def main():
+            batcher = AsyncEvaluationBatcher(evaluate, max_size=4, window=0.05)
+            ok = await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+            bad = await asyncio.gather(batcher.submit("boom"), return_exceptions=True)
+            return ok, bad
+
+        ok, bad = asyncio.run(main())
+        assert ok == ["A", "B"]
+        assert calls[0] == ["a", "b"]
+        assert isinstance(bad[0], RuntimeError)
+
+    def test_batch_verdicts_demultiplexed(self, orch):
+        import json
+
+        p1, p2 = orch.load_from_dict([
+            {"id": "p1", "description": "a", "fix_commands": ["true"]},
+            {"id": "p2", "description": "b", "fix_commands": ["true"]},
+        ])
+        for p in (p1, p2):
+            p.attempts = 1
+        orch.llm.chat = MagicMock(return_value=json.dumps({"results": [
+            {"problem_id": "p2", "verdict": "failed", "confidence": 0.9},
+            {"problem_id": "p1", "verdict": "resolved", "confidence": 0.9, "new_problems": [
+                {"id": "p_new", "description": "n", "severity": "info", "fix_commands": []},
+            ]},
+        ]}))
+        out = orch._evaluate_batch([(p1, ExecutionResult("true")), (p2, ExecutionResult("true"))])
+        assert orch.llm.chat.call_count == 1
+        assert [p.id for p in out[0]] == ["p_new"] and out[1] == []
+        assert (p1.status, p2.status) == ("resolved", "pending")
+
+    def test_missing_verdict_falls_back_to_single_call(self, orch):
+        import json
+
+        p1, p2 = orch.load_from_dict([
+            {"id": "p1", "description": "a", "fix_commands": ["true"]},
+            {"id": "p2", "description": "b", "fix_commands": ["true"]},
+        ])
+        orch.llm.chat = MagicMock(side_effect=[
+            json.dumps({"results": [{"problem_id": "p1", "verdict": "resolved"}]}),
+            json.dumps({"verdict": "resolved", "confidence": 1.0}),
+        ])
+        orch._evaluate_batch([(p1, ExecutionResult("true")), (p2, ExecutionResult("true"))])
+        assert orch.llm.chat.call_count == 2
+        assert p2.status == "resolved"
+        assert "p2" in orch.llm.chat.call_args_list[1].args[0][0]["content"]
+
+    def test_parallel_run_uses_one_call_for_concurrent_results(self, orch):
+        import json
+
+        orch.load_from_dict([
+            {"id": f"p{i}", "description": str(i), "fix_commands": ["true"]} for i in range(3)
+        ])
+        orch.llm.chat = MagicMock(return_value=json.dumps({"results": [
+            {"problem_id": f"p{i}", "verdict": "resolved", "confidence": 1.0} for i in range(3)
+        ]}))
+        summary = orch.run_parallel(confirm_fn=lambda p, c: True, progress_fn=lambda p, r: None,
+                                    max_workers=3, batch_size=3, batch_window=2.0)
+        assert orch.llm.chat.call_count == 1
+        assert sorted(summary["by_status"]["resolved"]) == ["p0", "p1", "p2"]
+
+
+class TestLocalVerdicts:
+    @pytest.fixture
+    def orch(self):
+        from fixos.config import FixOsConfig
+        from fixos.orchestrator import FixOrchestrator
+
+        cfg = FixOsConfig(provider="gemini", api_key="AIzaSy_FAKE_TOKEN_FOR_TESTING_1234567890",
+                          agent_mode="autonomous", show_anonymized_data=False)
+        return FixOrchestrator(config=cfg)
+
+    @pytest.mark.parametrize("result,verdict", [
+        (ExecutionResult("sudo systemctl restart sshd", returncode=0), "resolved"),
+        (ExecutionResult("sudo dnf install -y vim", stdout="Package vim is already installed.\nNothing to do."),
+         "resolved"),
+        (ExecutionResult("sudo dnf install -y vim", stdout="Installed:\n  vim\n\nComplete!"), "resolved"),
+        (ExecutionResult("firewall-cmd --reload", stdout="success"), "resolved"),
+        (ExecutionResult("sudo mkdir -p /opt/x"), "resolved"),
+        (ExecutionResult("systemctl restart foo", returncode=5, stderr="Unit foo.service not found."),
+         "failed"),
+        (ExecutionResult("systemctl restart x", executed=False, stdout="(już wykonane – stan aktualny)"),
+         "resolved"),
+    ])
+    def test_default_rules_resolve_obvious_results(self, result, verdict):
+        from fixos.orchestrator import VerdictEngine
+
+        local = VerdictEngine().evaluate(result)
+        assert local is not None and local.verdict == verdict
+
+    @pytest.mark.parametrize("result", [
+        ExecutionResult("true"),
+        ExecutionResult("echo ok", stdout="ok"),
+        ExecutionResult("sudo systemctl restart sshd", returncode=1, stderr="Job failed"),
+        ExecutionResult("sudo dnf install -y nope", stdout="No match for argument: nope\nNothing to do."),
+        ExecutionResult("sudo mkdir /opt/x", stderr="warning"),
+        ExecutionResult("systemctl restart sshd", timed_out=True),
+    ])
+    def test_ambiguous_results_left_for_llm(self, result):
+        from fixos.orchestrator import VerdictEngine
+
+        assert VerdictEngine().evaluate(result) is None
+
+    def test_local_verdict_skips_llm(self, orch):
+        p = orch.load_from_dict([{"id": "p1", "description": "d", "fix_commands": []}])[0]
+        p.attempts = 1
+        orch.llm.chat = MagicMock()
+        assert orch._evaluate_and_rediagnose(p, ExecutionResult("systemctl restart sshd")) == []
+        orch.llm.chat.assert_not_called()
+        assert p.status == "resolved"
+        assert orch.session_log[-1]["explanation"] == "reguła lokalna: systemctl-ok"
+
+    def test_ambiguous_result_goes_to_llm(self, orch):
+        import json
+
+        p = orch.load_from_dict([{"id": "p1", "description": "d", "fix_commands": []}])[0]
+        p.attempts = 1
+        orch.llm.chat = MagicMock(return_value=json.dumps({"verdict": "resolved", "confidence": 0.8}))
+        orch._evaluate_and_rediagnose(p, ExecutionResult("true"))
+        orch.llm.chat.assert_called_once()
+
+    def test_custom_rule_and_disabled_engine(self, orch):
+        from fixos.orchestrator import VerdictEngine, VerdictRule
+
+        engine = VerdictEngine()
+        engine.add(VerdictRule("custom", "failed", command=r"^true$"), first=True)
+        local = engine.evaluate(ExecutionResult("true"))
+        assert local.verdict == "failed" and local.rule == "custom"
+        assert engine.hits == 1
+
+        orch.verdicts = VerdictEngine(enabled=False)
+        p = orch.load_from_dict([{"id": "p1", "description": "d", "fix_commands": []}])[0]
+        orch.llm.chat = MagicMock(return_value='{"verdict": "resolved", "confidence": 0.9}')
+        orch._evaluate_and_rediagnose(p, ExecutionResult("systemctl restart sshd"))
+        orch.llm.chat.assert_called_once()
+
+    def test_batch_sends_only_ambiguous_items(self, orch):
+        import asyncio
+
+        p1, p2 = orch.load_from_dict([
+            {"id": "p1", "description": "a", "fix_commands": []},
+            {"id": "p2", "description": "b", "fix_commands": []},
+        ])
+        orch.llm.chat = MagicMock(return_value='{"verdict": "failed", "confidence": 0.9}')
+        orch.llm.achat = AsyncMock(return_value='{"verdict": "failed", "confidence": 0.9}')
+        items = [(p1, ExecutionResult("systemctl restart sshd")), (p2, ExecutionResult("true"))]
+
+        assert orch._evaluate_batch(items) == [[], []]
+        assert orch.llm.chat.call_count == 1
+        assert p1.status == "resolved"
+
+        p1.status = p2.status = "pending"
+        asyncio.run(orch._aevaluate_batch(items))
+        assert orch.llm.achat.await_count == 1
+        assert p1.status == "resolved"